@@ -1,4 +1,9 @@
 from django.contrib import admin
+from django.contrib import messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
+
+from app.commissions import recalculate_commissions
 from app.models import *
 # Register your models here.
 
@@ -12,9 +17,47 @@ admin.site.register(Transaction)
 admin.site.register(TransactionType)
 admin.site.register(Payment)
 admin.site.register(PersonnelUser)
-admin.site.register(PersonnelCommission)
 admin.site.register(Pay)
 admin.site.register(Receipt)
 admin.site.register(PayType)
 admin.site.register(ReceiptType)
-admin.site.register(SaleImage)
\ No newline at end of file
+admin.site.register(SaleImage)
+admin.site.register(BalanceSnapshot)
+
+
+@admin.register(PersonnelCommission)
+class PersonnelCommissionAdmin(admin.ModelAdmin):
+    list_display = ("personnel", "work", "percentage", "start_date", "end_date")
+    list_filter = ("personnel", "work")
+    actions = ["recalculate_sales"]
+
+    @admin.action(description="محاسبه دوباره کمیسیون فروش‌های این بازه‌ها")
+    def recalculate_sales(self, request, queryset):
+        apply = "apply" in request.POST
+        results = [
+            (commission, recalculate_commissions(
+                personnel_id=commission.personnel_id,
+                work_id=commission.work_id,
+                start_date=commission.start_date,
+                end_date=commission.end_date,
+                dry_run=not apply,
+            ))
+            for commission in queryset.select_related("personnel", "work")
+        ]
+
+        if apply:
+            changed = sum(result.changed for _, result in results)
+            self.message_user(request, f"کمیسیون {changed} فروش به‌روز شد.", messages.SUCCESS)
+            return None
+
+        # ابتدا اختلاف‌ها نمایش داده می‌شود و با تأیید کاربر اعمال می‌شود
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "محاسبه دوباره کمیسیون فروش‌ها",
+            "opts": self.model._meta,
+            "results": results,
+            "changed": sum(result.changed for _, result in results),
+            "queryset": queryset,
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, "admin/app/personnelcommission/recalculate_sales.html", context)
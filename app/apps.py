@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from app import signals
+        from app.log_utils import install_queue_logging
+
+        # نوشتن لاگ در thread پس‌زمینه تا درخواست‌ها پشت I/O فایل نمانند
+        if getattr(settings, "LOG_QUEUE", True):
+            install_queue_logging(getattr(settings, "LOGGING", {}).get("loggers", {}))
@@ -0,0 +1,175 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from app.models import Appointment, Personnel, PersonnelDayAvailability
+from app.slots import working_intervals
+
+# هر بیت یک بازه ۵ دقیقه‌ای از روز؛ ۲۸۸ بیت = ۳۶ بایت برای هر (پرسنل، روز)
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BITMAP_BYTES = SLOTS_PER_DAY // 8
+_SLOT = timedelta(minutes=SLOT_MINUTES)
+
+
+def _local(value):
+    return timezone.localtime(value).replace(tzinfo=None) if timezone.is_aware(value) else value
+
+
+def to_bytes(mask):
+    return mask.to_bytes(BITMAP_BYTES, "little")
+
+
+def from_bytes(data):
+    # بعضی درایورها memoryview برمی‌گردانند
+    return int.from_bytes(bytes(data), "little")
+
+
+def day_mask(day, start, end):
+    """بیت‌های بازه [start, end) در روز day؛ بازه‌های ناقص به کل ۵ دقیقه گسترش می‌یابند"""
+    day_start = datetime.combine(day, time.min)
+    start, end = _local(start), _local(end)
+    first = max(0, (start - day_start) // _SLOT)
+    last = min(SLOTS_PER_DAY, -((day_start - end) // _SLOT))
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def interval_days(start, end):
+    start, end = _local(start), _local(end)
+    day = start.date()
+    last = (end - timedelta(microseconds=1)).date() if end > start else day
+    days = []
+    while day <= last:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _appointment_masks(appointments, wanted=None):
+    masks = defaultdict(int)
+    for personnel_id, start, end in appointments:
+        if not end or end <= start:
+            continue
+        for day in interval_days(start, end):
+            if wanted is None or (personnel_id, day) in wanted:
+                masks[(personnel_id, day)] |= day_mask(day, start, end)
+    return masks
+
+
+def _day_bounds(days):
+    start = datetime.combine(min(days), time.min)
+    end = datetime.combine(max(days) + timedelta(days=1), time.min)
+    if settings.USE_TZ:
+        start, end = timezone.make_aware(start), timezone.make_aware(end)
+    return start, end
+
+
+def appointment_days(personnel_id, start, end):
+    if not personnel_id or not start or not end:
+        return set()
+    return {(int(personnel_id), day) for day in interval_days(start, end)}
+
+
+def refresh_days(pairs):
+    """
+    ساخت دوباره نقشه روزهای تغییرکرده از روی رزروها؛ برای هر دسته یک SELECT روی رزروها
+    و یک SELECT/UPDATE روی نقشه‌ها. روزهای خالی حذف می‌شوند.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    personnel_ids = {personnel_id for personnel_id, _ in pairs}
+    days = {day for _, day in pairs}
+    window_start, window_end = _day_bounds(days)
+    masks = _appointment_masks(
+        Appointment.objects.filter(
+            personnel_id__in=personnel_ids, start_time__lt=window_end, end_time__gt=window_start,
+        ).values_list("personnel_id", "start_time", "end_time"),
+        wanted=pairs,
+    )
+
+    with transaction.atomic():
+        existing = {
+            (row.personnel_id, row.day): row
+            for row in PersonnelDayAvailability.objects.select_for_update().filter(
+                personnel_id__in=personnel_ids, day__in=days,
+            )
+        }
+        created, updated, empty = [], [], []
+        for key in pairs:
+            mask = masks.get(key, 0)
+            row = existing.get(key)
+            if not mask:
+                if row is not None:
+                    empty.append(row.pk)
+            elif row is None:
+                created.append(PersonnelDayAvailability(personnel_id=key[0], day=key[1], busy=to_bytes(mask)))
+            elif from_bytes(row.busy) != mask:
+                row.busy = to_bytes(mask)
+                updated.append(row)
+        if empty:
+            PersonnelDayAvailability.objects.filter(pk__in=empty).delete()
+        if updated:
+            PersonnelDayAvailability.objects.bulk_update(updated, ["busy"])
+        if created:
+            PersonnelDayAvailability.objects.bulk_create(created)
+
+
+def rebuild_availability(batch_size=1000):
+    """ساخت دوباره کل جدول نقشه‌ها از روی همه رزروها"""
+    masks = _appointment_masks(
+        Appointment.objects.values_list("personnel_id", "start_time", "end_time").iterator(chunk_size=batch_size)
+    )
+    rows = [
+        PersonnelDayAvailability(personnel_id=personnel_id, day=day, busy=to_bytes(mask))
+        for (personnel_id, day), mask in masks.items() if mask
+    ]
+    with transaction.atomic():
+        PersonnelDayAvailability.objects.all().delete()
+        PersonnelDayAvailability.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def required_masks(start, duration_minutes):
+    """بیت‌های لازم هر روز برای خدمتی که از start به مدت duration دقیقه طول می‌کشد"""
+    end = start + timedelta(minutes=duration_minutes)
+    return {day: day_mask(day, start, end) for day in interval_days(start, end)}
+
+
+def within_working_hours(masks):
+    for day, mask in masks.items():
+        open_mask = 0
+        for open_start, open_end in working_intervals(day):
+            open_mask |= day_mask(day, open_start, open_end)
+        if mask & ~open_mask:
+            return False
+    return True
+
+
+def free_personnel(start, duration_minutes, personnel_ids=None):
+    """
+    شناسه پرسنل فعالی که از start به مدت duration دقیقه آزادند؛
+    فقط نقشه روزهای همان بازه خوانده و با AND بیتی بررسی می‌شود.
+    """
+    masks = required_masks(start, duration_minutes)
+    if not within_working_hours(masks):
+        return []
+
+    candidates = Personnel.objects.filter(is_active=True)
+    if personnel_ids is not None:
+        candidates = candidates.filter(id__in=personnel_ids)
+    candidate_ids = list(candidates.order_by("id").values_list("id", flat=True))
+
+    busy = {
+        personnel_id
+        for personnel_id, day, bitmap in PersonnelDayAvailability.objects.filter(
+            personnel_id__in=candidate_ids, day__in=list(masks),
+        ).values_list("personnel_id", "day", "busy")
+        if from_bytes(bitmap) & masks[day]
+    }
+    return [personnel_id for personnel_id in candidate_ids if personnel_id not in busy]
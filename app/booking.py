@@ -0,0 +1,28 @@
+from django.db import transaction
+
+from app.models import Appointment, Personnel
+
+
+class BookingConflict(Exception):
+    pass
+
+
+def overlapping(personnel_id, start_time, end_time, exclude_pk=None):
+    conflicts = Appointment.objects.filter(personnel_id=personnel_id, start_time__lt=end_time, end_time__gt=start_time)
+    if exclude_pk:
+        conflicts = conflicts.exclude(pk=exclude_pk)
+    return conflicts
+
+
+def save_appointment(appointment):
+    """
+    بررسی تداخل و ذخیره رزرو در یک تراکنش، زیر قفل ردیف همان پرسنل (select_for_update)؛
+    رزروهای هم‌زمان یک پرسنل پشت سر هم اجرا می‌شوند و پرسنل دیگر منتظر نمی‌مانند.
+    """
+    with transaction.atomic():
+        # Personnel.DoesNotExist برای پرسنل نامعتبر
+        Personnel.objects.select_for_update().only("id").get(pk=appointment.personnel_id)
+        if overlapping(appointment.personnel_id, appointment.start_time, appointment.end_time, appointment.pk).exists():
+            raise BookingConflict("این بازه زمانی قبلاً برای این پرسنل رزرو شده است.")
+        appointment.save()
+    return appointment
@@ -0,0 +1,206 @@
+import logging
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Min, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Ceil, Coalesce, Floor, TruncDate
+from django.utils import timezone
+
+from app import refdata
+from app.models import PersonnelCommission, Sale
+from app.utils import day_start
+
+logger = logging.getLogger("app")
+
+
+def sale_day(value):
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            return timezone.localtime(value).date()
+        return value.date()
+    return value
+
+
+class CommissionIndex:
+    """
+    بازه‌های اعتبار کمیسیون هر (پرسنل، خدمت) مرتب بر اساس تاریخ شروع؛
+    جستجوی درصد یک تاریخ با bisect و بدون کوئری انجام می‌شود.
+    """
+
+    def __init__(self, commissions):
+        grouped = {}
+        for row in sorted(commissions, key=lambda c: (c["start_date"], c["id"])):
+            grouped.setdefault((row["personnel_id"], row["work_id"]), []).append(row)
+
+        self._intervals = {}
+        for key, rows in grouped.items():
+            max_end = None
+            max_ends = []
+            for row in rows:
+                max_end = row["end_date"] if max_end is None else max(max_end, row["end_date"])
+                max_ends.append(max_end)
+            starts = [row["start_date"] for row in rows]
+            self._intervals[key] = (starts, max_ends, rows)
+
+    @classmethod
+    def load(cls, personnel_ids=None, work_ids=None):
+        qs = PersonnelCommission.objects.all()
+        if personnel_ids is not None:
+            qs = qs.filter(personnel_id__in=personnel_ids)
+        if work_ids is not None:
+            qs = qs.filter(work_id__in=work_ids)
+        return cls(qs.values("id", "personnel_id", "work_id", "percentage", "start_date", "end_date"))
+
+    def lookup(self, personnel_id, work_id, day):
+        """درصد کمیسیون معتبر در روز day یا None"""
+        intervals = self._intervals.get((personnel_id, work_id))
+        if intervals is None:
+            return None
+        starts, max_ends, rows = intervals
+
+        # مثل .first() قبلی: اگر چند بازه هم‌پوشان باشند، رکورد با کوچک‌ترین شناسه انتخاب می‌شود
+        found = None
+        position = bisect_right(starts, day) - 1
+        while position >= 0 and max_ends[position] >= day:
+            row = rows[position]
+            if row["end_date"] >= day and (found is None or row["id"] < found["id"]):
+                found = row
+            position -= 1
+        return found["percentage"] if found else None
+
+
+_shared_index = None
+_shared_version = None
+
+
+def commission_index():
+    """
+    ایندکس مشترک پروسس. سیگنال‌های post_save/post_delete کمیسیون ایندکس را پاک می‌کنند و نسخه داده‌های پایه
+    (app/refdata.py) را بالا می‌برند؛ تغییر پروسس‌های دیگر با همان نسخه دیده می‌شود که حداکثر هر
+    REFDATA_CHECK_INTERVAL ثانیه یک بار از کش مشترک خوانده می‌شود.
+    """
+    global _shared_index, _shared_version
+    version = refdata.current_version()
+    if _shared_index is None or version != _shared_version:
+        _shared_index = CommissionIndex.load()
+        _shared_version = version
+    return _shared_index
+
+
+def invalidate_commission_index():
+    global _shared_index
+    _shared_index = None
+
+
+def apply_commission(sale, percentage):
+    if percentage is None:
+        sale.commission_percentage = 0
+        sale.commission_amount = 0
+    else:
+        sale.commission_percentage = percentage
+        sale.commission_amount = int(sale.price * percentage / 100)
+    return sale
+
+
+RecalculationResult = namedtuple(
+    "RecalculationResult", ["matched", "changed", "old_total", "new_total", "sample", "applied"]
+)
+
+
+def commission_scope(personnel_id=None, work_id=None, start_date=None, end_date=None):
+    sales = Sale.objects.all()
+    if personnel_id:
+        sales = sales.filter(personnel_id=personnel_id)
+    if work_id:
+        sales = sales.filter(work_id=work_id)
+    if start_date:
+        sales = sales.filter(date__gte=day_start(start_date))
+    if end_date:
+        sales = sales.filter(date__lt=day_start(end_date + timedelta(days=1)))
+    return sales
+
+
+def _expected_percentage():
+    # روی کوئری بیرونی sale_day=TruncDate("date") لازم است
+    # همان قاعده Sale.save: کمیسیون معتبر در روز فروش با کوچک‌ترین شناسه، در غیر این صورت صفر
+    sale_day = OuterRef("sale_day")
+    commission = PersonnelCommission.objects.filter(
+        personnel_id=OuterRef("personnel_id"),
+        work_id=OuterRef("work_id"),
+        start_date__lte=sale_day,
+        end_date__gte=sale_day,
+    ).order_by("id").values("percentage")[:1]
+    return Coalesce(Subquery(commission), Value(0))
+
+
+def _expected_amount(percentage):
+    # مثل int(price * percentage / 100) در پایتون: گرد کردن به سمت صفر
+    raw = F("price") * percentage / Value(100.0)
+    return Case(
+        When(price__gte=0, then=Floor(raw)),
+        default=Ceil(raw),
+        output_field=IntegerField(),
+    )
+
+
+def recalculate_commissions(personnel_id=None, work_id=None, start_date=None, end_date=None,
+                            dry_run=True, chunk_size=1000, sample_size=20):
+    """
+    محاسبه دوباره کمیسیون فروش‌های ثبت‌شده با UPDATE مجموعه‌ای در بازه‌های شناسه.
+    در حالت dry_run فقط اختلاف‌ها شمرده و نمونه‌ای از آن‌ها برگردانده می‌شود.
+    """
+    scope = commission_scope(personnel_id, work_id, start_date, end_date)
+    bounds = scope.aggregate(first=Min("id"), last=Max("id"), count=Count("id"))
+
+    matched = bounds["count"]
+    changed = 0
+    old_total = new_total = 0
+    sample = []
+    if bounds["first"] is None:
+        return RecalculationResult(matched, changed, old_total, new_total, sample, not dry_run)
+
+    lower = bounds["first"]
+    while lower <= bounds["last"]:
+        chunk = scope.filter(id__gte=lower, id__lt=lower + chunk_size)
+        with transaction.atomic():
+            diff = chunk.annotate(
+                sale_day=TruncDate("date"),
+                expected_percentage=_expected_percentage(),
+            ).annotate(
+                expected_amount=_expected_amount(F("expected_percentage")),
+            ).exclude(
+                commission_percentage=F("expected_percentage"),
+                commission_amount=F("expected_amount"),
+            )
+            totals = diff.aggregate(
+                count=Count("id"),
+                old=Sum("commission_amount"),
+                new=Sum("expected_amount"),
+            )
+            if totals["count"]:
+                changed += totals["count"]
+                old_total += totals["old"] or 0
+                new_total += totals["new"] or 0
+                if len(sample) < sample_size:
+                    sample.extend(diff.order_by("id").values(
+                        "id", "date", "price", "commission_percentage", "commission_amount",
+                        "expected_percentage", "expected_amount",
+                    )[:sample_size - len(sample)])
+                if not dry_run:
+                    percentage = _expected_percentage()
+                    chunk.annotate(sale_day=TruncDate("date")).update(
+                        commission_percentage=percentage,
+                        commission_amount=_expected_amount(percentage),
+                    )
+        lower += chunk_size
+
+    logger.info(
+        "Commission recalculation",
+        extra={
+            "personnel_id": personnel_id, "work_id": work_id, "dry_run": dry_run,
+            "matched": matched, "changed": changed, "old_total": old_total, "new_total": new_total,
+        },
+    )
+    return RecalculationResult(matched, changed, old_total, new_total, sample, not dry_run)
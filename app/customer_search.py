@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models import Q
+
+from app.models import Customer, CustomerSearchKey
+from app.normalize import name_tokens, normalize_mobile
+
+KEY_MAX_LENGTH = 200
+
+
+def build_keys(fname, lname, mobile):
+    """کلیدهای (kind, key) یک مشتری: هر بخش نام، موبایل و موبایل معکوس برای جستجوی انتهای شماره"""
+    keys = {(CustomerSearchKey.NAME, token[:KEY_MAX_LENGTH]) for token in name_tokens(f"{fname} {lname}")}
+    mobile = normalize_mobile(mobile)
+    if mobile:
+        keys.add((CustomerSearchKey.MOBILE, mobile))
+        keys.add((CustomerSearchKey.MOBILE_REVERSED, mobile[::-1]))
+    return keys
+
+
+def update_customer_keys(customer):
+    keys = build_keys(customer.fname, customer.lname, customer.mobile)
+    existing = set(CustomerSearchKey.objects.filter(customer=customer).values_list("kind", "key"))
+    if keys == existing:
+        return
+    with transaction.atomic():
+        CustomerSearchKey.objects.filter(customer=customer).delete()
+        CustomerSearchKey.objects.bulk_create([
+            CustomerSearchKey(customer=customer, kind=kind, key=key) for kind, key in keys
+        ])
+
+
+def rebuild_search_keys(batch_size=2000):
+    """ساخت دوباره همه کلیدها؛ برای مشتریانی که با bulk_create یا update ثبت شده‌اند"""
+    count = 0
+    with transaction.atomic():
+        CustomerSearchKey.objects.all().delete()
+        rows = []
+        customers = Customer.objects.order_by("id").values_list("id", "fname", "lname", "mobile")
+        for customer_id, fname, lname, mobile in customers.iterator(chunk_size=batch_size):
+            rows.extend(
+                CustomerSearchKey(customer_id=customer_id, kind=kind, key=key)
+                for kind, key in build_keys(fname, lname, mobile)
+            )
+            count += 1
+            if len(rows) >= batch_size:
+                CustomerSearchKey.objects.bulk_create(rows, batch_size=batch_size)
+                rows = []
+        CustomerSearchKey.objects.bulk_create(rows, batch_size=batch_size)
+    return count
+
+
+def _term_condition(term):
+    # کلیدها از قبل کوچک و نرمال شده‌اند؛ istartswith در MySQL به LIKE 'x%' بدون BINARY تبدیل می‌شود و از ایندکس استفاده می‌کند
+    if term.isdigit():
+        mobile = "0" + term if term.startswith("9") else term
+        return (
+            Q(kind=CustomerSearchKey.MOBILE, key__istartswith=mobile)
+            | Q(kind=CustomerSearchKey.MOBILE_REVERSED, key__istartswith=term[::-1])
+        )
+    return Q(kind=CustomerSearchKey.NAME, key__istartswith=term)
+
+
+def _term_filter(term):
+    return CustomerSearchKey.objects.filter(_term_condition(term)).values("customer_id")
+
+
+def search_customers(query, queryset=None):
+    """
+    مشتریانی که همه بخش‌های query با پیشوند یکی از نام‌ها، پیشوند موبایل یا انتهای موبایل آن‌ها می‌خواند.
+    هر بخش یک جستجوی پیشوندی روی ایندکس (kind, key) است.
+    """
+    queryset = Customer.objects.all() if queryset is None else queryset
+    terms = name_tokens(query)
+    if not terms:
+        return queryset.none()
+    for term in terms:
+        queryset = queryset.filter(id__in=_term_filter(term))
+    return queryset
+
+
+def search_page(query, limit):
+    """
+    حداکثر limit مشتری برای select2، مرتب به نام.
+    کلیدها به ترتیب ایندکس (kind, key, customer) خوانده می‌شوند تا پیشوند کوتاه کل جدول را مرتب (filesort) نکند؛
+    فقط همین صفحه در پایتون به ترتیب نام مرتب می‌شود.
+    """
+    terms = name_tokens(query)
+    if not terms:
+        return []
+    keys = CustomerSearchKey.objects.filter(_term_condition(terms[0]))
+    for term in terms[1:]:
+        keys = keys.filter(customer_id__in=_term_filter(term))
+    rows = keys.order_by("kind", "key", "customer_id").values_list(
+        "customer_id", "customer__fname", "customer__lname", "customer__mobile",
+    )
+
+    page = {}
+    offset = 0
+    while len(page) < limit:
+        chunk = list(rows[offset:offset + limit])
+        # یک مشتری ممکن است با چند کلید (مثلاً نام و نام خانوادگی) پیدا شود
+        for row in chunk:
+            page.setdefault(row[0], row)
+        if len(chunk) < limit:
+            break
+        offset += limit
+    customers = sorted(page.values(), key=lambda row: (row[1], row[2], row[0]))[:limit]
+    return [
+        {"id": customer_id, "fname": fname, "lname": lname, "mobile": mobile}
+        for customer_id, fname, lname, mobile in customers
+    ]
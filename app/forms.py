@@ -11,6 +11,31 @@ import datetime
 from django.forms.widgets import Select
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from django.urls import reverse_lazy
+
+
+class CustomerSelect(forms.Select):
+    """
+    انتخاب مشتری با select2 و جستجوی سمت سرور (data-ajax-url در static/js/main.js)؛
+    به جای همه مشتریان فقط گزینه انتخاب‌شده رندر می‌شود.
+    """
+
+    def __init__(self, attrs=None):
+        attrs = {"class": "select2 border p-2 rounded w-full", **(attrs or {})}
+        attrs.setdefault("data-ajax-url", reverse_lazy("customer_search"))
+        super().__init__(attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        # مقدار دستکاری‌شده (غیرعددی) فیلتر pk را با ValueError و خطای ۵۰۰ متوقف نکند
+        selected = [v for v in value if str(v).isdigit()]
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, "", field.empty_label or "", False, 0))
+        objects = field.queryset.filter(pk__in=selected) if selected else []
+        for index, obj in enumerate(objects, start=len(options)):
+            options.append(self.create_option(name, field.prepare_value(obj), field.label_from_instance(obj), True, index))
+        return [(None, options, 0)]
 
 
 class SaleForm(forms.ModelForm):
@@ -39,7 +64,7 @@ class SaleForm(forms.ModelForm):
             
         }
         widgets = {
-            'customer': forms.Select(attrs={'class': 'select2 border p-2 rounded w-full'}),
+            'customer': CustomerSelect(),
             'personnel': forms.Select(attrs={'class': 'select2 border p-2 rounded w-full'}),
             'work': forms.Select(attrs={'class': 'select2 border p-2 rounded w-full'}),
             'price': forms.NumberInput(attrs={'class': 'border p-2 rounded w-full'}),
@@ -176,14 +201,14 @@ class ReceiptForm(forms.ModelForm):
         widgets = {
             'date': AdminJalaliDateWidget(attrs={'class': 'border p-2 rounded w-full'}),
             'receipt_type': forms.Select(attrs={'class': 'select2 border p-2 rounded w-full'}),
-            'customer': forms.Select(attrs={'class': 'select2 border p-2 rounded w-full'}),
+            'customer': CustomerSelect(),
             'source_type': forms.Select(attrs={'class': 'select2 border p-2 rounded w-full'}),
             'bank': forms.Select(attrs={'class': 'select2 border p-2 rounded w-full'}),
             'amount': forms.NumberInput(attrs={'class': 'border p-2 rounded w-full'}),
             'description': forms.Textarea(attrs={'class': 'border p-2 rounded w-full'}),
         }
 
-    customer = forms.ModelChoiceField(queryset=Customer.objects.all(), required=False)
+    customer = forms.ModelChoiceField(queryset=Customer.objects.all(), required=False, widget=CustomerSelect())
     bank = forms.ModelChoiceField(queryset=Bank.objects.all(), required=False)
 
 
@@ -213,8 +238,16 @@ class CustomerForm(forms.ModelForm):
             'mobile': forms.TextInput(attrs={'class': 'input'}),
             'birth_day': AdminJalaliDateWidget(attrs={'class': 'border p-2 rounded w-full'}),
             'region': forms.TextInput(attrs={'class': 'input'}),
-            'referrer': forms.Select(attrs={'class': 'select2 border p-2 rounded w-full'}),
+            'referrer': CustomerSelect(),
         }
         referrer = forms.ModelChoiceField(queryset=Customer.objects.all(), required=False)
 
 
+
+
+class SaleImportForm(forms.Form):
+    file = forms.FileField(
+        label="فایل فروش (xlsx یا csv)",
+        widget=forms.ClearableFileInput(attrs={"accept": ".xlsx,.csv", "class": "border p-2 rounded w-full"}),
+    )
+    dry_run = forms.BooleanField(label="فقط بررسی، بدون ثبت", required=False)
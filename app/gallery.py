@@ -0,0 +1,54 @@
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+from app.models import SaleImage
+
+GALLERY_PAGE_SIZE = 24
+
+# موقعیت آخرین تصویر صفحه قبل؛ زمان به صورت میکروثانیه از مبدأ یونیکس
+GalleryCursor = namedtuple("GalleryCursor", ["uploaded_at", "id"])
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(cursor):
+    uploaded_at = cursor.uploaded_at
+    if uploaded_at.tzinfo is None:
+        uploaded_at = uploaded_at.replace(tzinfo=dt_timezone.utc)
+    micros = (uploaded_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}_{cursor.id}"
+
+
+def decode_cursor(value, aware=True):
+    if not value:
+        return None
+    try:
+        micros, pk = value.split("_")
+        uploaded_at = _EPOCH + timedelta(microseconds=int(micros))
+    except (ValueError, OverflowError):
+        return None
+    if not aware:
+        uploaded_at = uploaded_at.replace(tzinfo=None)
+    return GalleryCursor(uploaded_at, int(pk))
+
+
+def gallery_page(images, after=None, limit=GALLERY_PAGE_SIZE):
+    """
+    یک صفحه از تصاویر به ترتیب جدیدترین، با کرسر (uploaded_at, id) به جای OFFSET.
+    خروجی: (تصاویر، کرسر صفحه بعد یا None)
+    """
+    if after is not None:
+        images = images.filter(
+            Q(uploaded_at__lt=after.uploaded_at) | Q(uploaded_at=after.uploaded_at, id__lt=after.id)
+        )
+    page = list(
+        images.select_related("sale__customer", "sale__personnel")
+        .prefetch_related("variants")
+        .order_by("-uploaded_at", "-id")[:limit + 1]
+    )
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    return page, encode_cursor(GalleryCursor(page[-1].uploaded_at, page[-1].id))
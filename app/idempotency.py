@@ -0,0 +1,147 @@
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+from app.models import IdempotencyKey
+
+# کلید صریح: هدر Idempotency-Key یا فیلد idempotency_key فرم (static/js/main.js به فرم‌های POST اضافه می‌کند)
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_FIELD = "idempotency_key"
+IDEMPOTENCY_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+# نگهداری پاسخ درخواست‌هایی که کلید صریح دارند (ثانیه)
+IDEMPOTENCY_TTL = getattr(settings, "IDEMPOTENCY_TTL", 24 * 60 * 60)
+# درخواست‌های بدون کلید: ارسال دوباره همان داده در این چند ثانیه تکراری حساب می‌شود (مثل رفتار قبلی)
+IDEMPOTENCY_WINDOW = getattr(settings, "IDEMPOTENCY_WINDOW", 3)
+# حداکثر عمر علامت «در حال اجرا» و مدت انتظار درخواست تکراری برای پاسخ اولی
+IDEMPOTENCY_LOCK_TIMEOUT = getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 60)
+IDEMPOTENCY_WAIT = getattr(settings, "IDEMPOTENCY_WAIT", 5)
+# فاصله اولین بررسی دوباره؛ هر بار دو برابر می‌شود
+IDEMPOTENCY_POLL = 0.25
+
+PENDING = "pending"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def client_key(request):
+    return request.headers.get(IDEMPOTENCY_HEADER) or request.POST.get(IDEMPOTENCY_FIELD) or None
+
+
+def fingerprint(request):
+    """هش داده ارسالی؛ فایل‌های آپلودی با نام، اندازه و محتوا حساب می‌شوند"""
+    digest = hashlib.sha256()
+    content_type = request.content_type or ""
+    if content_type.startswith(("multipart/form-data", "application/x-www-form-urlencoded")):
+        for key in sorted(request.POST):
+            if key == IDEMPOTENCY_FIELD:
+                continue
+            for value in request.POST.getlist(key):
+                digest.update(f"{key}={value}\n".encode())
+        for key in sorted(request.FILES):
+            for upload in request.FILES.getlist(key):
+                digest.update(f"{key}:{upload.name}:{upload.size}\n".encode())
+                for chunk in upload.chunks():
+                    digest.update(chunk)
+                upload.seek(0)
+    else:
+        digest.update(request.body)
+    return digest.hexdigest()
+
+
+def scope(request):
+    """کاربر، و برای کاربر ناشناس session یا IP؛ پاسخ یک کاربر هرگز برای دیگری بازپخش نمی‌شود"""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    session_key = getattr(getattr(request, "session", None), "session_key", None)
+    if session_key:
+        return f"session:{session_key}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def request_key(request, key):
+    # داده هم جزو کلید است: همان کلید با داده متفاوت (مثلاً فرم ویرایش‌شده بعد از برگشت) درخواست تازه است
+    parts = [scope(request), request.method, request.path, key or "", fingerprint(request)]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def claim(key):
+    """True اگر این درخواست اولین است؛ یک INSERT و کلید تکراری با IntegrityError شناخته می‌شود"""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT)
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key, expires_at=expires_at)
+        return True
+    except IntegrityError:
+        pass
+    # ردیف منقضی (پایان پنجره، یا درخواستی که هرگز تمام نشد) به این درخواست می‌رسد؛ UPDATE فقط برای یکی موفق است
+    return IdempotencyKey.objects.filter(key=key, expires_at__lte=now).update(
+        status=None, headers=[], cookies={}, content=b"", expires_at=expires_at,
+    ) == 1
+
+
+def release(key):
+    IdempotencyKey.objects.filter(key=key).delete()
+
+
+def stored_response(key):
+    """پاسخ ذخیره‌شده؛ PENDING اگر درخواست اول هنوز تمام نشده و None اگر ردیفی نیست یا منقضی شده"""
+    row = IdempotencyKey.objects.filter(key=key, expires_at__gt=timezone.now()).first()
+    if row is None:
+        return None
+    if row.status is None:
+        return PENDING
+    return {"status": row.status, "headers": row.headers, "cookies": row.cookies, "content": bytes(row.content)}
+
+
+def wait_for_response(key, timeout=None):
+    """
+    انتظار درخواست تکراری برای پاسخ اولی؛ فاصله بررسی‌ها هر بار دو برابر می‌شود
+    تا در تمام مدت انتظار فقط چند کوئری اجرا شود.
+    """
+    deadline = time.monotonic() + (IDEMPOTENCY_WAIT if timeout is None else timeout)
+    delay = IDEMPOTENCY_POLL
+    while True:
+        stored = stored_response(key)
+        remaining = deadline - time.monotonic()
+        if stored != PENDING or remaining <= 0:
+            return stored
+        time.sleep(min(delay, remaining))
+        delay *= 2
+
+
+def store_response(key, response, ttl):
+    cookies = {
+        name: (morsel.value, {attr: morsel[attr] for attr in morsel.keys() if morsel[attr]})
+        for name, morsel in response.cookies.items()
+    }
+    IdempotencyKey.objects.filter(key=key).update(
+        status=response.status_code,
+        headers=list(response.items()),
+        cookies=cookies,
+        content=response.content,
+        expires_at=timezone.now() + timedelta(seconds=ttl),
+    )
+
+
+def purge_expired():
+    """حذف ردیف‌های منقضی؛ خروجی تعداد حذف‌شده"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def replay_response(stored):
+    response = HttpResponse(stored["content"], status=stored["status"])
+    for header, value in stored["headers"]:
+        response[header] = value
+    for name, (value, attrs) in stored["cookies"].items():
+        response.cookies[name] = value
+        response.cookies[name].update(attrs)
+    response[REPLAYED_HEADER] = "true"
+    return response
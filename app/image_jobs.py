@@ -0,0 +1,171 @@
+import logging
+import os
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from app.models import SaleImage, SaleImageVariant
+from app.utils import build_image_variants
+
+logger = logging.getLogger("app")
+
+# کاری که بیش از این مدت در وضعیت processing مانده (worker از کار افتاده) دوباره برداشته می‌شود
+STALE_PROCESSING_AFTER = timedelta(minutes=10)
+
+
+def queue_sale_image(sale, upload, image_type):
+    """ذخیره سریع فایل خام؛ فشرده‌سازی به صف پردازش سپرده می‌شود"""
+    return SaleImage.objects.create(
+        sale=sale,
+        image=upload,
+        image_type=image_type,
+        status=SaleImage.PENDING,
+        status_updated_at=timezone.now(),
+    )
+
+
+def claim_pending_images(limit):
+    """برداشتن تعدادی کار از صف؛ با skip_locked چند worker هم‌زمان کار تکراری برنمی‌دارند"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            SaleImage.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=SaleImage.PENDING)
+                | Q(status=SaleImage.PROCESSING, status_updated_at__lt=now - STALE_PROCESSING_AFTER)
+            )
+            .order_by("id")
+            .values_list("id", flat=True)[:limit]
+        )
+        SaleImage.objects.filter(id__in=ids).update(status=SaleImage.PROCESSING, status_updated_at=now)
+    return list(SaleImage.objects.filter(id__in=ids).order_by("id"))
+
+
+def _compress_job(image_id, data):
+    # ساخت همه نسخه‌ها در پروسس worker اجرا می‌شود؛ به دیتابیس دسترسی ندارد
+    try:
+        return image_id, build_image_variants(data), ""
+    except Exception as e:
+        return image_id, None, f"{type(e).__name__}: {e}"
+
+
+def save_variants(image, variants):
+    """ذخیره نسخه‌های کوچک/متوسط/کامل به جز full/jpeg که خود فایل اصلی است"""
+    base = os.path.splitext(os.path.basename(image.image.name))[0]
+    # فایل نسخه‌های قبلی با سیگنال post_delete پاک می‌شود
+    image.variants.all().delete()
+
+    rows = []
+    for size, fmt, data, width, height in variants:
+        if (size, fmt) == (SaleImageVariant.FULL, SaleImageVariant.JPEG):
+            continue
+        variant = SaleImageVariant(image=image, size=size, format=fmt, width=width, height=height)
+        variant.file.save(f"{base}_{size}.{fmt}", ContentFile(data), save=False)
+        rows.append(variant)
+    SaleImageVariant.objects.bulk_create(rows)
+
+
+def _finish(image, variants, error):
+    image.status_updated_at = timezone.now()
+    if variants is None:
+        image.status = SaleImage.FAILED
+        image.error = error
+        image.save(update_fields=["status", "error", "status_updated_at"])
+        logger.error("Sale image processing failed", extra={"image_id": image.id, "error": error})
+        return
+
+    full = next(
+        data for size, fmt, data, _, _ in variants
+        if (size, fmt) == (SaleImageVariant.FULL, SaleImageVariant.JPEG)
+    )
+    raw_name = image.image.name
+    storage = image.image.storage
+    name = os.path.splitext(os.path.basename(raw_name))[0] + ".jpg"
+    with transaction.atomic():
+        image.image.save(name, ContentFile(full), save=False)
+        save_variants(image, variants)
+        image.status = SaleImage.READY
+        image.error = ""
+        image.save(update_fields=["image", "status", "error", "status_updated_at"])
+    if raw_name != image.image.name:
+        storage.delete(raw_name)
+
+
+def process_pending_images(executor=None, batch_size=20):
+    """
+    یک دور پردازش صف تصاویر: فشرده‌سازی و ساخت نسخه‌های srcset. فایل‌ها در پروسس اصلی خوانده و نوشته می‌شوند و
+    فقط decode/resize/encode در executor (معمولاً ProcessPoolExecutor) انجام می‌شود؛
+    بدون executor همه چیز در همین پروسس اجرا می‌شود.
+    خروجی: تعداد تصاویر پردازش‌شده
+    """
+    images = claim_pending_images(batch_size)
+    if not images:
+        return 0
+
+    by_id = {image.id: image for image in images}
+    jobs = []
+    for image in images:
+        try:
+            with image.image.open("rb") as handle:
+                jobs.append((image.id, handle.read()))
+        except Exception as e:
+            _finish(image, None, f"{type(e).__name__}: {e}")
+
+    if executor is not None and jobs:
+        results = executor.map(_compress_job, *zip(*jobs))
+    else:
+        results = [_compress_job(image_id, data) for image_id, data in jobs]
+
+    for image_id, variants, error in results:
+        _finish(by_id[image_id], variants, error)
+
+    logger.info("Sale images processed", extra={"count": len(images)})
+    return len(images)
+
+
+def backfill_variants(executor=None, batch_size=50, force=False):
+    """
+    ساخت نسخه‌های srcset برای تصاویر آماده‌ای که قبل از این قابلیت ذخیره شده‌اند.
+    فایل اصلی دست نمی‌خورد. خروجی: (تعداد ساخته‌شده، تعداد خطا)
+    """
+    images = SaleImage.objects.filter(status=SaleImage.READY).order_by("id")
+    if not force:
+        images = images.filter(variants__isnull=True)
+
+    built = failed = 0
+    last_id = 0
+    while True:
+        batch = list(images.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        by_id = {image.id: image for image in batch}
+        jobs = []
+        for image in batch:
+            try:
+                with image.image.open("rb") as handle:
+                    jobs.append((image.id, handle.read()))
+            except Exception as e:
+                failed += 1
+                logger.error("Sale image file missing", extra={"image_id": image.id, "error": str(e)})
+
+        if executor is not None and jobs:
+            results = executor.map(_compress_job, *zip(*jobs))
+        else:
+            results = [_compress_job(image_id, data) for image_id, data in jobs]
+
+        for image_id, variants, error in results:
+            if variants is None:
+                failed += 1
+                logger.error("Sale image variant build failed", extra={"image_id": image_id, "error": error})
+                continue
+            with transaction.atomic():
+                save_variants(by_id[image_id], variants)
+            built += 1
+
+    logger.info("Sale image variants backfilled", extra={"built": built, "failed": failed})
+    return built, failed
@@ -0,0 +1,145 @@
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import CharField, Count, DecimalField, F, Sum, Value
+from django.utils.dateparse import parse_date
+
+from app import treasury
+from app.models import Pay, Receipt
+
+LEDGER_PAGE_SIZE = 50
+
+# موقعیت آخرین ردیف صفحه قبل؛ مانده در آدرس نمی‌آید و در سرور دوباره حساب می‌شود
+LedgerCursor = namedtuple("LedgerCursor", ["date", "id", "kind"])
+
+LEDGER_COLUMNS = [
+    "kind", "id", "date", "amount", "signed_amount",
+    "description", "type_name", "source_name", "bank_name",
+]
+
+
+def encode_cursor(cursor):
+    return f"{cursor.date.isoformat()}_{cursor.id}_{cursor.kind}"
+
+
+def decode_cursor(value):
+    if not value:
+        return None
+    try:
+        day, pk, kind = value.split("_")
+        if kind not in ("pay", "receipt"):
+            return None
+        return LedgerCursor(date.fromisoformat(day), int(pk), kind)
+    except ValueError:
+        return None
+
+
+def _branch(model, kind, type_field, filters, after, limit):
+    sign = -1 if kind == "pay" else 1
+    qs = model.objects.filter(**filters)
+
+    # ترتیب کلی دفتر (date, id, kind) است و در روز و شناسه برابر، پرداخت قبل از دریافت می‌آید
+    if after is not None:
+        if kind == "receipt" and after.kind == "pay":
+            qs = qs.filter(date__gte=after.date).exclude(date=after.date, id__lt=after.id)
+        else:
+            qs = qs.filter(date__gte=after.date).exclude(date=after.date, id__lte=after.id)
+
+    qs = (
+        qs.annotate(
+            kind=Value(kind, output_field=CharField()),
+            signed_amount=F("amount") * Value(sign, output_field=DecimalField()),
+            type_name=F(f"{type_field}__name"),
+            source_name=F("source_type__name"),
+            bank_name=F("bank__name"),
+        )
+        .values(*LEDGER_COLUMNS)
+        .order_by("date", "id")[:limit]
+    )
+    return qs.query.sql_with_params()
+
+
+def _ledger_filters(start_date, end_date, bank_id, payment_method_id):
+    filters = {"date__gte": start_date, "date__lte": end_date}
+    if bank_id:
+        filters["bank_id"] = bank_id
+    if payment_method_id:
+        filters["source_type_id"] = payment_method_id
+    return filters
+
+
+def cursor_balance(after, bank_id=None, payment_method_id=None):
+    """
+    مانده بعد از ردیف کرسر: مانده ابتدای روز کرسر (از نقطه کنترل) به‌علاوه ردیف‌های همان روز تا خود کرسر.
+    ویرایش ردیف‌های قبل از کرسر بین دو صفحه هم در مانده دیده می‌شود.
+    """
+    balance = treasury.opening_balance(after.date, bank_id=bank_id, payment_method_id=payment_method_id)
+    filters = _ledger_filters(after.date, after.date, bank_id, payment_method_id)
+    for model, kind in ((Pay, "pay"), (Receipt, "receipt")):
+        # همان ترتیب (date, id, kind) که _branch برای ردیف‌های بعد از کرسر استفاده می‌کند
+        id_lookup = "id__lt" if kind == "receipt" and after.kind == "pay" else "id__lte"
+        total = model.objects.filter(**filters, **{id_lookup: after.id}).aggregate(total=Sum("amount"))["total"]
+        balance += treasury.LEDGER_SIGN[model] * Decimal(str(total or 0))
+    return balance
+
+
+def ledger_totals(start_date, end_date, bank_id=None, payment_method_id=None):
+    """جمع و تعداد پرداخت‌ها و دریافت‌های کل بازه (نه فقط صفحه جاری)"""
+    filters = _ledger_filters(start_date, end_date, bank_id, payment_method_id)
+    totals = {}
+    for model, kind in ((Pay, "pay"), (Receipt, "receipt")):
+        result = model.objects.filter(**filters).aggregate(total=Sum("amount"), count=Count("id"))
+        totals[f"{kind}_total"] = result["total"] or Decimal(0)
+        totals[f"{kind}_count"] = result["count"]
+    return totals
+
+
+def ledger_page(start_date, end_date, bank_id=None, payment_method_id=None, after=None, opening=0, limit=LEDGER_PAGE_SIZE):
+    """
+    یک صفحه از کاردکس با یک کوئری UNION ALL روی پرداخت‌ها و دریافت‌ها.
+    مانده تجمعی با SUM() OVER روی همان ردیف‌های صفحه حساب می‌شود و به مانده کرسر (cursor_balance)
+    یا برای صفحه اول به opening اضافه می‌شود؛ بنابراین هزینه هر صفحه فقط به اندازه صفحه بستگی دارد.
+    خروجی: (ردیف‌ها، کرسر صفحه بعد یا None)
+    """
+    filters = _ledger_filters(start_date, end_date, bank_id, payment_method_id)
+    if after is not None and not start_date <= after.date <= end_date:
+        after = None
+
+    # یک ردیف اضافه برای فهمیدن وجود صفحه بعد
+    fetch = limit + 1
+    pay_sql, pay_params = _branch(Pay, "pay", "pay_type", filters, after, fetch)
+    receipt_sql, receipt_params = _branch(Receipt, "receipt", "receipt_type", filters, after, fetch)
+
+    columns = ", ".join(LEDGER_COLUMNS)
+    sql = (
+        f"SELECT {columns}, SUM(signed_amount) OVER (ORDER BY date, id, kind) AS running_total "
+        f"FROM ("
+        f"SELECT {columns} FROM ({pay_sql}) AS pays "
+        f"UNION ALL "
+        f"SELECT {columns} FROM ({receipt_sql}) AS receipts"
+        f") AS ledger "
+        f"ORDER BY date, id, kind "
+        f"LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*pay_params, *receipt_params, fetch])
+        records = cursor.fetchall()
+
+    opening = cursor_balance(after, bank_id, payment_method_id) if after else Decimal(str(opening))
+    rows = []
+    for record in records[:limit]:
+        row = dict(zip(LEDGER_COLUMNS + ["running_total"], record))
+        if isinstance(row["date"], str):
+            row["date"] = parse_date(row["date"][:10])
+        row["amount"] = Decimal(str(row["amount"]))
+        row["signed_amount"] = Decimal(str(row["signed_amount"]))
+        row["balance"] = opening + Decimal(str(row["running_total"]))
+        rows.append(row)
+
+    next_cursor = None
+    if len(records) > limit and rows:
+        last = rows[-1]
+        next_cursor = LedgerCursor(last["date"], last["id"], last["kind"])
+    return rows, next_cursor
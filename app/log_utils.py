@@ -0,0 +1,101 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class LazyValue:
+    """
+    مقدار لاگی که فقط وقتی رکورد واقعاً ثبت می‌شود محاسبه می‌گردد؛
+    مثلاً extra={"count": lazy(qs.count)} در سطح غیرفعال هیچ کوئری‌ای اجرا نمی‌کند.
+    """
+
+    __slots__ = ("func", "args", "kwargs", "_value", "_resolved")
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self._value = None
+        self._resolved = False
+
+    def resolve(self):
+        if not self._resolved:
+            self._value = self.func(*self.args, **self.kwargs)
+            self._resolved = True
+        return self._value
+
+    def __str__(self):
+        return str(self.resolve())
+
+    def __repr__(self):
+        return repr(self.resolve())
+
+
+def lazy(func, *args, **kwargs):
+    return LazyValue(func, *args, **kwargs)
+
+
+def resolve_lazy(value):
+    if isinstance(value, LazyValue):
+        return value.resolve()
+    if isinstance(value, tuple):
+        return tuple(resolve_lazy(item) for item in value)
+    if isinstance(value, dict):
+        return {key: resolve_lazy(item) for key, item in value.items()}
+    return value
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    رکورد را در همان thread درخواست آماده می‌کند (مقادیر lazy همین‌جا و با اتصال دیتابیس همین thread
+    محاسبه می‌شوند) و نوشتن فایل/کنسول را به thread پس‌زمینه QueueListener می‌سپارد.
+    """
+
+    def prepare(self, record):
+        if record.args:
+            record.args = resolve_lazy(record.args)
+        for key, value in list(record.__dict__.items()):
+            if isinstance(value, LazyValue):
+                setattr(record, key, value.resolve())
+        return super().prepare(record)
+
+
+_listeners = []
+_installed = False
+
+
+def install_queue_logging(logger_names):
+    """
+    هندلرهای لاگرهای داده‌شده پشت صف قرار می‌گیرند؛ لاگرهایی که هندلرهای یکسان دارند یک صف و یک
+    listener مشترک دارند تا مسیر رکوردها عوض نشود. فراخوانی دوباره اثری ندارد.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    groups = {}
+    for name in logger_names:
+        logger = logging.getLogger(name)
+        handlers = [handler for handler in logger.handlers if not isinstance(handler, QueueHandler)]
+        if handlers:
+            groups.setdefault(tuple(handlers), []).append(logger)
+
+    for handlers, loggers in groups.items():
+        records = queue.SimpleQueue()
+        queue_handler = LazyQueueHandler(records)
+        for logger in loggers:
+            for handler in handlers:
+                logger.removeHandler(handler)
+            logger.addHandler(queue_handler)
+        listener = QueueListener(records, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+
+    atexit.register(stop_queue_logging)
+
+
+def stop_queue_logging():
+    # رکوردهای باقی‌مانده در صف نوشته می‌شوند
+    while _listeners:
+        _listeners.pop().stop()
@@ -0,0 +1,29 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from app.image_jobs import backfill_variants
+
+
+class Command(BaseCommand):
+    help = (
+        "ساخت نسخه‌های کوچک/متوسط/کامل (WebP و JPEG) برای تصاویر فاکتوری که "
+        "قبلاً در media/sale_images ذخیره شده‌اند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--force", action="store_true", help="ساخت دوباره نسخه‌های موجود")
+
+    def handle(self, *args, **options):
+        executor = ProcessPoolExecutor(max_workers=options["workers"]) if options["workers"] > 1 else None
+        try:
+            built, failed = backfill_variants(
+                executor=executor, batch_size=options["batch_size"], force=options["force"]
+            )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"{built} images backfilled, {failed} failed"))
@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from app.booking import BookingConflict, overlapping, save_appointment
+from app.models import Appointment, Customer, Personnel, Work
+
+
+class Command(BaseCommand):
+    help = (
+        "تست فشار رزرو هم‌زمان: چند صد رزرو روی تعداد کمی پرسنل و بازه از چند thread ارسال می‌شود "
+        "و در پایان تعداد رزروهای هم‌پوشان و توان عملیاتی گزارش می‌شود. داده‌های ساخته‌شده پاک می‌شوند. "
+        "روی دیتابیس واقعی (MySQL) اجرا شود؛ SQLite قفل ردیفی ندارد."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bookings", type=int, default=500)
+        parser.add_argument("--threads", type=int, default=20)
+        parser.add_argument("--personnel", type=int, default=5)
+        parser.add_argument("--slots", type=int, default=20, help="تعداد بازه‌های یک ساعته قابل رزرو")
+        parser.add_argument("--unsafe", action="store_true",
+                            help="روش قبلی (exists و سپس create بدون قفل) برای مقایسه")
+
+    def handle(self, *args, **options):
+        suffix = timezone.now().strftime("%Y%m%d%H%M%S%f")
+        personnel = [
+            Personnel.objects.create(fname="bench", lname=f"{suffix}-{index}", mobile="09000000000")
+            for index in range(options["personnel"])
+        ]
+        customer = Customer.objects.create(fname="bench", lname=suffix, mobile="09000000000")
+        work = Work.objects.create(work_name=f"bench-{suffix}")
+        try:
+            self.run(options, [p.id for p in personnel], customer.id, work.id)
+        finally:
+            Appointment.objects.filter(personnel__in=personnel).delete()
+            customer.delete()
+            work.delete()
+            for person in personnel:
+                person.delete()
+
+    def run(self, options, personnel_ids, customer_id, work_id):
+        day = timezone.localdate() + timedelta(days=365)
+        first = datetime.combine(day, datetime.min.time()) + timedelta(hours=8)
+        if settings.USE_TZ:
+            first = timezone.make_aware(first)
+        slots = [first + timedelta(minutes=30 * index) for index in range(options["slots"])]
+
+        rng = random.Random(1404)
+        jobs = [
+            (rng.choice(personnel_ids), rng.choice(slots))
+            for _ in range(options["bookings"])
+        ]
+        outcome = {"created": 0, "conflicts": 0, "errors": 0}
+        lock = threading.Lock()
+        book = self.book_unsafe if options["unsafe"] else self.book
+
+        def worker(job):
+            personnel_id, start = job
+            appointment = Appointment(
+                customer_id=customer_id, work_id=work_id, personnel_id=personnel_id,
+                start_time=start, end_time=start + timedelta(hours=1),
+            )
+            try:
+                result = book(appointment)
+            except OperationalError:
+                result = "errors"
+            finally:
+                connection.close()
+            with lock:
+                outcome[result] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+            list(executor.map(worker, jobs))
+        elapsed = time.perf_counter() - started
+
+        booked = Appointment.objects.filter(personnel_id__in=personnel_ids)
+        double_booked = booked.filter(Exists(
+            Appointment.objects.filter(
+                personnel_id=OuterRef("personnel_id"),
+                start_time__lt=OuterRef("end_time"),
+                end_time__gt=OuterRef("start_time"),
+            ).exclude(pk=OuterRef("pk"))
+        )).count()
+
+        self.stdout.write(f"mode: {'unsafe' if options['unsafe'] else 'locked'} ({connection.vendor})")
+        self.stdout.write(
+            f"bookings: {len(jobs)}  created: {outcome['created']}  conflicts: {outcome['conflicts']}  "
+            f"errors: {outcome['errors']}"
+        )
+        self.stdout.write(f"throughput: {len(jobs) / elapsed:.1f} bookings/s ({elapsed:.2f}s)")
+        style = self.style.SUCCESS if not double_booked else self.style.ERROR
+        self.stdout.write(style(f"double booked appointments: {double_booked}"))
+
+    def book(self, appointment):
+        try:
+            save_appointment(appointment)
+        except BookingConflict:
+            return "conflicts"
+        return "created"
+
+    def book_unsafe(self, appointment):
+        if overlapping(appointment.personnel_id, appointment.start_time, appointment.end_time).exists():
+            return "conflicts"
+        appointment.save()
+        return "created"
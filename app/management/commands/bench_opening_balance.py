@@ -0,0 +1,102 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app.models import BalanceCheckpoint, Bank, Pay, PaymentMethod, PayType, Receipt, ReceiptType
+from app.treasury import build_balance_checkpoints, opening_balance
+
+
+class Command(BaseCommand):
+    help = (
+        "بنچمارک مانده اولیه کاردکس: با بزرگ شدن تاریخچه، زمان و تعداد کوئری محاسبه "
+        "مبتنی بر نقاط کنترل را با روش قدیمی (جمع در پایتون) مقایسه می‌کند. "
+        "همه داده‌های ساخته‌شده در پایان rollback می‌شوند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 50000],
+                            help="تعداد کل سندها (پرداخت + دریافت) در هر مرحله")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--skip-legacy", action="store_true",
+                            help="روش قدیمی برای حجم‌های بزرگ اجرا نشود")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        rng = random.Random(1404)
+        method = PaymentMethod.objects.create(name="bench", requires_bank=True)
+        bank = Bank.objects.create(name="bench")
+        pay_type = PayType.objects.create(name="bench")
+        receipt_type = ReceiptType.objects.create(name="bench")
+
+        start_date = timezone.localdate()
+        created = 0
+
+        self.stdout.write(f"{'rows':>10} {'checkpoint ms':>14} {'queries':>8} {'legacy ms':>10} {'queries':>8}")
+        for size in sorted(options["sizes"]):
+            # تاریخچه رو به عقب رشد می‌کند؛ روزهای اخیر همیشه همان‌ها هستند
+            days_back = max(size // 20, 30)
+            pays, receipts = [], []
+            for _ in range(created, size):
+                day = start_date - timedelta(days=rng.randint(1, days_back))
+                amount = rng.randint(1, 500) * 1000
+                if rng.random() < 0.5:
+                    pays.append(Pay(source_type=method, bank=bank, pay_type=pay_type, amount=amount, date=day))
+                else:
+                    receipts.append(Receipt(source_type=method, bank=bank, receipt_type=receipt_type, amount=amount, date=day))
+            Pay.objects.bulk_create(pays, batch_size=2000)
+            Receipt.objects.bulk_create(receipts, batch_size=2000)
+            created = size
+
+            # مانده پایان روز تا یک هفته قبل؛ روزهای بعد از آن جمع زده می‌شوند
+            build_balance_checkpoints(until=start_date - timedelta(days=7), full=True)
+            self.analyze()
+
+            fast_ms, fast_queries, fast_value = self.measure(
+                lambda: opening_balance(start_date, bank_id=bank.id), options["repeat"]
+            )
+            line = f"{size:>10} {fast_ms:>14.2f} {fast_queries:>8}"
+
+            if not options["skip_legacy"]:
+                legacy_ms, legacy_queries, legacy_value = self.measure(
+                    lambda: (
+                        sum(r.amount for r in Receipt.objects.filter(bank_id=bank.id, date__lt=start_date))
+                        - sum(p.amount for p in Pay.objects.filter(bank_id=bank.id, date__lt=start_date))
+                    ),
+                    options["repeat"],
+                )
+                if legacy_value != fast_value:
+                    self.stderr.write(f"Mismatch at {size}: {fast_value} != {legacy_value}")
+                line += f" {legacy_ms:>10.2f} {legacy_queries:>8}"
+
+            self.stdout.write(line)
+
+    def analyze(self):
+        # آمار جدول‌ها بعد از درج انبوه به‌روز شود تا planner ایندکس تاریخ را انتخاب کند
+        tables = [model._meta.db_table for model in (Pay, Receipt, BalanceCheckpoint)]
+        with connection.cursor() as cursor:
+            if connection.vendor == "mysql":
+                cursor.execute(f"ANALYZE TABLE {', '.join(tables)}")
+            elif connection.vendor == "sqlite":
+                cursor.execute("ANALYZE")
+
+    def measure(self, func, repeat):
+        timings = []
+        value = None
+        with CaptureQueriesContext(connection) as ctx:
+            value = func()
+        queries = len(ctx.captured_queries)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), queries, value
@@ -0,0 +1,170 @@
+import json
+import subprocess
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from app import metrics
+from app.models import Appointment, Customer, Pay, Receipt, Sale, SaleImage
+
+# view‌های اصلی که بازپخش می‌شوند؛ پارامترهای رشته‌ای در scenarios پر می‌شوند
+VIEWS = ["home", "sales", "ledger_report", "treasury_dashboard", "appointment_list", "gallery"]
+ROW_COUNTS = {
+    "customers": Customer, "sales": Sale, "pays": Pay, "receipts": Receipt,
+    "appointments": Appointment, "sale_images": SaleImage,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "بنچمارک view‌های اصلی با test client روی دیتابیس فعلی (مثلاً بعد از generate_synthetic_data)؛ "
+        "صدک‌های زمان پاسخ، زمان و تعداد کوئری‌ها و حجم پاسخ هر view به صورت JSON گزارش می‌شود "
+        "تا نتایج دو commit با --compare مقایسه شوند. اندازه‌ها از RequestMetricsMiddleware خوانده می‌شوند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2, help="درخواست‌های اول هر view که شمرده نمی‌شوند")
+        parser.add_argument("--views", nargs="+", choices=VIEWS, default=VIEWS)
+        parser.add_argument("--username", help="کاربر درخواست‌ها؛ پیش‌فرض اولین مدیر فعال")
+        parser.add_argument("--personnel-id", type=int, help="پرسنل تقویم؛ پیش‌فرض پرنوبت‌ترین پرسنل هفته جاری")
+        parser.add_argument("--label", default="", help="برچسب اجرا، مثلاً نام شاخه")
+        parser.add_argument("--output", help="مسیر فایل JSON؛ در غیر این صورت در خروجی چاپ می‌شود")
+        parser.add_argument("--compare", help="فایل JSON یک اجرای قبلی برای مقایسه")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True)
+        user = (
+            users.filter(username=options["username"]).first() if options["username"]
+            else users.filter(is_superuser=True).order_by("id").first()
+        )
+        if user is None:
+            raise CommandError("No active user to run the benchmark as.")
+
+        client = Client(HTTP_HOST=self.host())
+        client.force_login(user)
+        scenarios = self.scenarios(options["personnel_id"])
+
+        metrics.registry.reset()
+        statuses = {}
+        for name in options["views"]:
+            url, params = scenarios[name]
+            for _ in range(options["warmup"]):
+                client.get(url, params)
+            metrics.registry.reset()
+            for _ in range(options["repeat"]):
+                statuses[name] = client.get(url, params).status_code
+            scenarios[name] = (url, params, metrics.registry.summary().get(name))
+
+        result = {
+            "label": options["label"],
+            "revision": self.revision(),
+            "database": connection.vendor,
+            "created_at": timezone.now().isoformat(),
+            "user": user.username,
+            "repeat": options["repeat"],
+            "rows": {label: model.objects.count() for label, model in ROW_COUNTS.items()},
+            "views": {},
+        }
+        for name in options["views"]:
+            url, params, summary = scenarios[name]
+            if summary is None:
+                raise CommandError("RequestMetricsMiddleware is not installed; nothing was measured.")
+            result["views"][name] = self.report(url, params, statuses[name], summary)
+
+        output = json.dumps(result, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                handle.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(f"benchmark written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as handle:
+                self.compare(json.load(handle), result)
+
+    def host(self):
+        # test client با نام testserver درخواست می‌فرستد که در ALLOWED_HOSTS نیست
+        hosts = [host for host in settings.ALLOWED_HOSTS if host not in ("*", "testserver")]
+        if not hosts or "*" in settings.ALLOWED_HOSTS or "testserver" in settings.ALLOWED_HOSTS:
+            return "testserver"
+        return hosts[0].lstrip(".")
+
+    def scenarios(self, personnel_id):
+        today = timezone.localdate()
+        week = (today - timedelta(days=today.weekday()), today + timedelta(days=7 - today.weekday()))
+        if personnel_id is None:
+            busiest = (
+                Appointment.objects.filter(start_time__date__range=week)
+                .values("personnel_id").annotate(total=Count("id")).order_by("-total").first()
+            )
+            personnel_id = busiest["personnel_id"] if busiest else 0
+        return {
+            "home": (reverse("home"), {}),
+            "sales": (reverse("sales"), {}),
+            "ledger_report": (reverse("ledger_report"), {}),
+            "treasury_dashboard": (reverse("treasury_dashboard"), {}),
+            "appointment_list": (reverse("appointment_list"), {
+                "personnel_id": personnel_id, "start": week[0].isoformat(), "end": week[1].isoformat(),
+            }),
+            "gallery": (reverse("gallery"), {}),
+        }
+
+    def revision(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def report(self, url, params, status, summary):
+        quantiles = summary["quantiles"]
+        count = summary["count"]
+
+        def millis(field):
+            values = {f"p{int(q * 100)}": round(value * 1000, 2) for q, value in quantiles[field].items()}
+            values["mean"] = round(summary["sum"][field] / count * 1000, 2)
+            return values
+
+        return {
+            "url": url,
+            "params": params,
+            "status": status,
+            "requests": count,
+            "latency_ms": millis("duration"),
+            "db_ms": millis("db_time"),
+            "template_ms": millis("template_time"),
+            "queries": {f"p{int(q * 100)}": value for q, value in quantiles["queries"].items()},
+            "bytes": quantiles["size"][0.5],
+        }
+
+    def compare(self, before, after):
+        self.stdout.write(
+            f"\n{'view':<20} {'p50 ms':>18} {'p95 ms':>18} {'queries':>12}   "
+            f"({before.get('revision') or before.get('label')} -> {after.get('revision') or after.get('label')})"
+        )
+        for name, current in after["views"].items():
+            previous = before.get("views", {}).get(name)
+            if previous is None:
+                continue
+            columns = []
+            for old, new in (
+                (previous["latency_ms"]["p50"], current["latency_ms"]["p50"]),
+                (previous["latency_ms"]["p95"], current["latency_ms"]["p95"]),
+            ):
+                change = (new - old) / old * 100 if old else 0
+                columns.append(f"{old:>7.1f}→{new:<7.1f}{change:+.0f}%")
+            old_queries, new_queries = previous["queries"]["p50"], current["queries"]["p50"]
+            line = f"{name:<20} {columns[0]:>18} {columns[1]:>18} {old_queries:>5}→{new_queries:<5}"
+            style = self.style.ERROR if new_queries > old_queries else self.style.SUCCESS
+            self.stdout.write(style(line) if new_queries != old_queries else line)
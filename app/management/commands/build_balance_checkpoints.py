@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.treasury import build_balance_checkpoints
+from app.utils import jalali_to_gregorian
+
+
+class Command(BaseCommand):
+    help = (
+        "ساخت مانده‌های پایان روز برای محاسبه سریع مانده اولیه کاردکس. "
+        "برای به‌روز ماندن، اجرای شبانه (cron) کافی است."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--until", help="آخرین روز (جلالی، مثل 1404-06-30)؛ پیش‌فرض: دیروز")
+        parser.add_argument("--full", action="store_true", help="حذف و ساخت دوباره همه نقاط کنترل")
+
+    def handle(self, *args, **options):
+        until = None
+        if options["until"]:
+            try:
+                until = jalali_to_gregorian(options["until"].replace("/", "-"))
+            except Exception as e:
+                raise CommandError(f"Invalid --until date: {options['until']}") from e
+
+        count = build_balance_checkpoints(until=until, full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"{count} balance checkpoints created"))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from app.query_plans import check_query_plans, hot_queries
+
+
+class Command(BaseCommand):
+    help = (
+        "اجرای EXPLAIN برای کوئری‌های پرتکرار view‌ها (app/query_plans.py)؛ اگر هر کدام کل جدول یا کل ایندکس "
+        "را پیمایش کند، با خطا خارج می‌شود. برای نتیجه واقعی روی داده‌ای در حد production اجرا شود "
+        "(planner روی جدول‌های کوچک ممکن است پیمایش کامل را ارزان‌تر بداند)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--analyze", action="store_true", help="به‌روزرسانی آمار جدول‌ها قبل از EXPLAIN")
+
+    def handle(self, *args, **options):
+        if options["analyze"]:
+            self.analyze()
+
+        failed = []
+        for check in check_query_plans():
+            if check.full_scans:
+                failed.append(check.label)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {check.label}: {'; '.join(check.full_scans)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"OK         {check.label}"))
+            if options["verbosity"] > 1:
+                self.stdout.write(check.plan)
+
+        if failed:
+            raise CommandError(f"{len(failed)} hot queries fall back to a full scan: {', '.join(failed)}")
+
+    def analyze(self):
+        tables = sorted({query.model._meta.db_table for query in hot_queries()})
+        with connection.cursor() as cursor:
+            if connection.vendor == "mysql":
+                cursor.execute(f"ANALYZE TABLE {', '.join(tables)}")
+            elif connection.vendor == "sqlite":
+                cursor.execute("ANALYZE")
@@ -0,0 +1,323 @@
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+import jdatetime
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from app.availability import rebuild_availability
+from app.customer_search import rebuild_search_keys
+from app.models import (
+    Appointment, Bank, Customer, Pay, PaymentMethod, PayType, Personnel, PersonnelCommission, PersonnelUser,
+    Receipt, ReceiptType, Sale, SaleImage, SaleImageVariant, Work,
+)
+from app.treasury import build_balance_checkpoints, rebuild_balance_snapshots, rebuild_daily_cash_flow
+
+FIRST_NAMES = [
+    "مریم", "زهرا", "فاطمه", "سارا", "نرگس", "الهام", "مینا", "لیلا", "نازنین", "هانیه", "پریسا", "شیما",
+    "ریحانه", "سمیرا", "آزاده", "مهسا", "نگار", "یاسمن", "ترانه", "رویا", "علی", "محمد", "رضا", "امیر",
+]
+LAST_NAMES = [
+    "محمدی", "احمدی", "حسینی", "رضایی", "کریمی", "موسوی", "جعفری", "صادقی", "رحیمی", "کاظمی", "نوری",
+    "هاشمی", "قاسمی", "عباسی", "زارعی", "یوسفی", "اکبری", "مرادی", "فرهادی", "شریفی", "طاهری", "بهرامی",
+]
+REGIONS = ["شمال", "جنوب", "شرق", "غرب", "مرکز", ""]
+# (نام خدمت، قیمت پایه به تومان، مدت به دقیقه)
+WORKS = [
+    ("کوتاهی مو", 350000, 45), ("رنگ مو", 1800000, 150), ("مش", 2500000, 180), ("براشینگ", 400000, 45),
+    ("کراتین", 3000000, 180), ("اپیلاسیون", 300000, 30), ("اصلاح ابرو", 150000, 20), ("میکاپ", 2000000, 90),
+    ("ناخن", 600000, 60), ("پدیکور", 500000, 60), ("مانیکور", 400000, 45), ("شینیون", 1500000, 90),
+    ("لیفت مژه", 700000, 60), ("پاکسازی پوست", 900000, 75), ("فیشیال", 1100000, 75),
+]
+
+# وزن روزهای هفته از شنبه تا جمعه؛ پنجشنبه شلوغ و جمعه تقریباً تعطیل
+WEEKDAY_WEIGHTS = [1.0, 0.9, 0.9, 1.0, 1.1, 1.4, 0.2]
+# وزن ماه‌های جلالی؛ اسفند پیش از نوروز و فصل عروسی شلوغ‌تر
+MONTH_WEIGHTS = {1: 0.7, 2: 1.1, 3: 1.2, 4: 1.2, 5: 1.1, 6: 1.1, 7: 1.0, 8: 0.9, 9: 0.9, 10: 0.9, 11: 1.1, 12: 1.7}
+# ساعت شروع نوبت‌ها (۱۰ تا ۲۰) با اوج عصر
+HOURS = list(range(10, 21))
+HOUR_WEIGHTS = [0.5, 0.7, 0.8, 0.7, 0.8, 1.0, 1.3, 1.5, 1.5, 1.2, 0.8]
+
+
+def day_weight(day, trend):
+    jday = jdatetime.date.fromgregorian(date=day)
+    weight = WEEKDAY_WEIGHTS[jday.weekday()] * MONTH_WEIGHTS[jday.month] * trend
+    # تعطیلات نوروز
+    if jday.month == 1 and jday.day <= 13:
+        weight *= 0.15
+    return weight
+
+
+class DayPicker:
+    """انتخاب تصادفی روز و ساعت با توزیع واقعی‌تر از یکنواخت: فصل، روز هفته، ساعت و رشد کسب‌وکار"""
+
+    def __init__(self, rng, first_day, last_day):
+        self.rng = rng
+        total = (last_day - first_day).days + 1
+        self.days = [first_day + timedelta(days=offset) for offset in range(total)]
+        # رشد خطی از ۶۰٪ تا ۱۰۰٪ در طول تاریخچه
+        weights = [day_weight(day, 0.6 + 0.4 * index / max(total - 1, 1)) for index, day in enumerate(self.days)]
+        self.cum_days = list(accumulate(weights))
+        self.cum_hours = list(accumulate(HOUR_WEIGHTS))
+
+    def days_sample(self, count):
+        return self.rng.choices(self.days, cum_weights=self.cum_days, k=count)
+
+    def moment(self, day):
+        hour = self.rng.choices(HOURS, cum_weights=self.cum_hours)[0]
+        value = datetime.combine(day, datetime.min.time()) + timedelta(hours=hour, minutes=15 * self.rng.randrange(4))
+        return timezone.make_aware(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "ساخت داده مصنوعی برای همه مدل‌های اصلی (مشتری، فروش، پرداخت، دریافت، رزرو، تصویر و داده‌های پایه) "
+        "با تاریخ‌های واقعی‌نما و bulk_create دسته‌ای؛ برای سنجش مقیاس‌پذیری (bench_views). "
+        "داده‌ها پاک نمی‌شوند؛ روی دیتابیس production اجرا نشود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=50000)
+        parser.add_argument("--sales", type=int, default=1000000)
+        parser.add_argument("--pays", type=int, default=1000000)
+        parser.add_argument("--receipts", type=int, default=1000000)
+        parser.add_argument("--appointments", type=int, default=200000)
+        parser.add_argument("--images", type=int, default=20000, help="تعداد تصاویر فروش (بدون فایل واقعی)")
+        parser.add_argument("--personnel", type=int, default=20)
+        parser.add_argument("--scale", type=float, default=1.0,
+                            help="ضریب همه تعدادها؛ مثلاً 0.01 برای یک اجرای سریع")
+        parser.add_argument("--days", type=int, default=730, help="طول تاریخچه تا امروز (روز)")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=1404)
+        parser.add_argument("--noinput", "--no-input", action="store_false", dest="interactive")
+
+    def handle(self, *args, **options):
+        scale = options["scale"]
+        counts = {
+            name: int(options[name] * scale)
+            for name in ("customers", "sales", "pays", "receipts", "appointments", "images")
+        }
+        counts["personnel"] = options["personnel"]
+        if options["interactive"]:
+            summary = ", ".join(f"{name}={count}" for name, count in counts.items())
+            answer = input(f"Generate synthetic data ({summary}) in the current database? [y/N] ")
+            if answer.lower() not in ("y", "yes"):
+                raise CommandError("Cancelled.")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        today = timezone.localdate()
+        self.first_day = today - timedelta(days=options["days"])
+        self.picker = DayPicker(self.rng, self.first_day, today)
+
+        self.step("reference data", self.reference_data, counts["personnel"])
+        self.step("customers", self.customers, counts["customers"])
+        self.step("sales", self.sales, counts["sales"])
+        self.step("sale images", self.images, counts["images"])
+        self.step("pays", self.pays, counts["pays"])
+        self.step("receipts", self.receipts, counts["receipts"])
+        self.step("appointments", self.appointments, counts["appointments"], today)
+
+        # جدول‌های خلاصه و کلیدها؛ bulk_create سیگنال ندارد
+        self.step("search keys", rebuild_search_keys)
+        self.step("balance snapshots", rebuild_balance_snapshots)
+        self.step("balance checkpoints", build_balance_checkpoints, today - timedelta(days=1), True)
+        self.step("daily cash flow", rebuild_daily_cash_flow)
+        self.step("personnel availability", rebuild_availability)
+        self.stdout.write(self.style.SUCCESS("synthetic data generated"))
+
+    def step(self, label, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        self.stdout.write(f"{label}: {result} ({time.perf_counter() - started:.1f}s)")
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield min(self.batch_size, total - start)
+
+    def new_ids(self, model, after):
+        # MySQL در bulk_create شناسه برنمی‌گرداند
+        return list(model.objects.filter(id__gt=after).order_by("id").values_list("id", flat=True))
+
+    def reference_data(self, personnel_count):
+        self.cash = PaymentMethod.objects.filter(requires_bank=False).first() or PaymentMethod.objects.create(name="نقد")
+        self.card = (
+            PaymentMethod.objects.filter(requires_bank=True).first()
+            or PaymentMethod.objects.create(name="حساب بانکی", requires_bank=True)
+        )
+        for name in ("ملت", "ملی", "سامان"):
+            Bank.objects.get_or_create(name=name)
+        self.banks = list(Bank.objects.values_list("id", flat=True))
+        self.personnel_pay_type = PayType.objects.get_or_create(name="پرسنل", is_personnel=True)[0]
+        self.pay_types = [
+            PayType.objects.get_or_create(name=name, is_personnel=False)[0] for name in ("هزینه", "اجاره", "مواد مصرفی")
+        ]
+        self.customer_receipt_type = ReceiptType.objects.get_or_create(name="مشتری", is_customer=True)[0]
+        self.other_receipt_type = ReceiptType.objects.get_or_create(name="سایر", is_customer=False)[0]
+
+        self.works = [
+            Work.objects.get_or_create(work_name=name)[0] for name, _, _ in WORKS
+        ]
+        self.work_info = {work.id: (price, duration) for work, (_, price, duration) in zip(self.works, WORKS)}
+
+        suffix = Personnel.objects.aggregate(last=Max("id"))["last"] or 0
+        self.personnel = []
+        self.personnel_works = {}
+        for index in range(personnel_count):
+            person = Personnel.objects.create(
+                fname=self.rng.choice(FIRST_NAMES), lname=self.rng.choice(LAST_NAMES),
+                mobile=f"0912{self.rng.randrange(10 ** 7):07d}",
+            )
+            user = User.objects.create_user(f"synthetic_{suffix + index + 1}")
+            PersonnelUser.objects.create(personnel=person, user=user)
+            works = self.rng.sample(self.works, self.rng.randint(3, 8))
+            for work in works:
+                PersonnelCommission.objects.create(
+                    personnel=person, work=work, percentage=self.rng.choice([30, 40, 50, 60]),
+                    start_date=self.first_day, end_date=date(self.first_day.year + 10, 1, 1),
+                )
+            self.personnel.append(person.id)
+            self.personnel_works[person.id] = [work.id for work in works]
+        return f"{personnel_count} personnel, {len(self.works)} works"
+
+    def customers(self, total):
+        last = Customer.objects.aggregate(last=Max("id"))["last"] or 0
+        for size in self.batches(total):
+            Customer.objects.bulk_create([
+                Customer(
+                    fname=self.rng.choice(FIRST_NAMES), lname=self.rng.choice(LAST_NAMES),
+                    mobile=f"09{self.rng.choice(['12', '13', '19', '35', '36', '37', '38', '39'])}{self.rng.randrange(10 ** 7):07d}",
+                    region=self.rng.choice(REGIONS),
+                    birth_day=self.first_day - timedelta(days=self.rng.randint(18 * 365, 60 * 365))
+                    if self.rng.random() < 0.4 else None,
+                )
+                for _ in range(size)
+            ])
+        self.customer_ids = self.new_ids(Customer, last)
+        return len(self.customer_ids)
+
+    def pick_customer(self):
+        # مشتریان قدیمی‌تر بیشتر برمی‌گردند
+        return self.customer_ids[int(len(self.customer_ids) * self.rng.random() ** 2)]
+
+    def sales(self, total):
+        self.sales_range = (Sale.objects.aggregate(last=Max("id"))["last"] or 0, None)
+        for size in self.batches(total):
+            rows = []
+            for day in self.picker.days_sample(size):
+                personnel_id = self.rng.choice(self.personnel)
+                work_id = self.rng.choice(self.personnel_works[personnel_id])
+                price = self.work_info[work_id][0] * self.rng.choice([0.8, 1, 1, 1, 1.2, 1.5]) // 10000 * 10000
+                rows.append(Sale(
+                    customer_id=self.pick_customer(), personnel_id=personnel_id, work_id=work_id,
+                    price=int(price), date=self.picker.moment(day),
+                ))
+            Sale.objects.bulk_create_with_commission(rows, batch_size=self.batch_size)
+        self.sales_range = (self.sales_range[0], Sale.objects.aggregate(last=Max("id"))["last"] or 0)
+        return total
+
+    def random_sales(self, count):
+        first, last = self.sales_range
+        if last <= first:
+            return []
+        ids = {self.rng.randint(first + 1, last) for _ in range(count)}
+        return list(Sale.objects.filter(id__in=ids).values("id", "customer_id", "price", "date"))
+
+    def images(self, total):
+        last = SaleImage.objects.aggregate(last=Max("id"))["last"] or 0
+        for size in self.batches(total):
+            SaleImage.objects.bulk_create([
+                SaleImage(
+                    sale_id=sale["id"], image=f"sale_images/synthetic/{sale['id']}-{image_type}.jpg",
+                    image_type=image_type, status=SaleImage.READY,
+                )
+                # هر فروش یک تصویر قبل و یک تصویر بعد
+                for sale in self.random_sales(max(size // 2, 1))
+                for image_type in (SaleImage.BEFORE, SaleImage.AFTER)
+            ])
+        image_ids = self.new_ids(SaleImage, last)
+        for start in range(0, len(image_ids), self.batch_size):
+            SaleImageVariant.objects.bulk_create([
+                SaleImageVariant(
+                    image_id=image_id, size=size, format=SaleImageVariant.WEBP,
+                    file=f"sale_images/variants/synthetic/{image_id}-{size}.webp", width=width, height=width,
+                )
+                for image_id in image_ids[start:start + self.batch_size]
+                for size, width in ((SaleImageVariant.THUMB, 320), (SaleImageVariant.MEDIUM, 960))
+            ])
+        # تاریخ بارگذاری همان تاریخ فروش؛ uploaded_at در bulk_create برابر اکنون است
+        SaleImage.objects.filter(id__gt=last).update(
+            uploaded_at=Subquery(Sale.objects.filter(id=OuterRef("sale_id")).values("date")[:1])
+        )
+        return len(image_ids)
+
+    def source(self):
+        if self.rng.random() < 0.3:
+            return {"source_type": self.cash, "bank_id": None}
+        return {"source_type": self.card, "bank_id": self.rng.choice(self.banks)}
+
+    def pays(self, total):
+        for size in self.batches(total):
+            rows = []
+            for day in self.picker.days_sample(size):
+                if self.rng.random() < 0.6:
+                    extra = {"pay_type": self.personnel_pay_type, "personnel_id": self.rng.choice(self.personnel)}
+                    amount = self.rng.randint(5, 200) * 100000
+                else:
+                    extra = {"pay_type": self.rng.choice(self.pay_types)}
+                    amount = self.rng.randint(1, 100) * 50000
+                rows.append(Pay(amount=amount, date=day, **extra, **self.source()))
+            Pay.objects.bulk_create(rows)
+        return total
+
+    def receipts(self, total):
+        for size in self.batches(total):
+            # بیشتر دریافت‌ها پرداخت مشتری برای یک فروش است
+            sales = self.random_sales(int(size * 0.9))
+            rows = [
+                Receipt(
+                    sale_id=sale["id"], customer_id=sale["customer_id"], receipt_type=self.customer_receipt_type,
+                    amount=sale["price"], date=timezone.localtime(sale["date"]).date(), **self.source(),
+                )
+                for sale in sales
+            ]
+            rows.extend(
+                Receipt(
+                    receipt_type=self.other_receipt_type, amount=self.rng.randint(1, 50) * 100000, date=day,
+                    **self.source(),
+                )
+                for day in self.picker.days_sample(size - len(rows))
+            )
+            Receipt.objects.bulk_create(rows)
+        return total
+
+    def appointments(self, total, today):
+        # نوبت‌ها تا دو ماه آینده، بدون هم‌پوشانی برای هر پرسنل
+        picker = DayPicker(self.rng, self.first_day, today + timedelta(days=60))
+        now = timezone.now()
+        taken = set()
+        created = 0
+        for size in self.batches(total):
+            rows = []
+            for day in picker.days_sample(size):
+                personnel_id = self.rng.choice(self.personnel)
+                work_id = self.rng.choice(self.personnel_works[personnel_id])
+                start = picker.moment(day)
+                # هر خانه ۱۵ دقیقه‌ای یک عدد: شناسه پرسنل و شماره خانه از مبدأ زمان
+                first_slot = int(start.timestamp()) // 900
+                slots = {personnel_id << 32 | (first_slot + step) for step in range(-(-self.work_info[work_id][1] // 15))}
+                if taken & slots:
+                    continue
+                taken |= slots
+                end = start + timedelta(minutes=self.work_info[work_id][1])
+                rows.append(Appointment(
+                    customer_id=self.pick_customer(), personnel_id=personnel_id, work_id=work_id,
+                    start_time=start, end_time=end, is_paid=end < now,
+                ))
+            Appointment.objects.bulk_create(rows)
+            created += len(rows)
+        return f"{created} (skipped {total - created} overlapping)"
@@ -0,0 +1,42 @@
+import csv
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.sale_import import IMPORT_BATCH_SIZE, SaleImporter, SaleImportError
+
+
+class Command(BaseCommand):
+    help = (
+        "ورود انبوه فروش‌ها از فایل xlsx یا csv با ستون‌های تاریخ، ساعت، موبایل، پرسنل، خدمت و مبلغ. "
+        "ردیف‌های معتبر دسته‌ای و در یک تراکنش ثبت و خطای هر ردیف گزارش می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="فقط اعتبارسنجی، بدون ثبت")
+        parser.add_argument("--errors", help="مسیر فایل csv گزارش خطاها")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        importer = SaleImporter(batch_size=options["batch_size"], dry_run=options["dry_run"])
+        try:
+            result = importer.run(path, path.name)
+        except SaleImportError as e:
+            raise CommandError(str(e)) from e
+
+        if options["errors"]:
+            with open(options["errors"], "w", encoding="utf-8-sig", newline="") as handle:
+                writer = csv.writer(handle)
+                writer.writerow(["row", "error"])
+                writer.writerows(result.errors)
+        else:
+            for error in result.errors:
+                self.stderr.write(f"row {error.row}: {error.message}")
+
+        summary = f"{result.total} rows read, {result.created} sales created, {len(result.errors)} rows with errors"
+        self.stdout.write(self.style.SUCCESS(summary) if not result.errors else summary)
@@ -0,0 +1,40 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from app.image_jobs import process_pending_images
+
+
+class Command(BaseCommand):
+    help = (
+        "فشرده‌سازی تصاویر فاکتورهایی که در صف (pending) هستند با چند پروسس. "
+        "با --loop به صورت دائمی صف را بررسی می‌کند (مناسب systemd/supervisor)؛ "
+        "بدون آن یک بار صف را خالی می‌کند (مناسب cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument("--interval", type=float, default=2.0, help="فاصله بررسی صف خالی (ثانیه)")
+
+    def handle(self, *args, **options):
+        executor = ProcessPoolExecutor(max_workers=options["workers"]) if options["workers"] > 1 else None
+        total = 0
+        try:
+            while True:
+                processed = process_pending_images(executor=executor, batch_size=options["batch_size"])
+                total += processed
+                if processed:
+                    continue
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"{total} sale images processed"))
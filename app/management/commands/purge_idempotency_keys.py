@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "حذف کلیدهای منقضی‌شده جلوگیری از ثبت تکراری (IdempotencyKey)؛ اجرای دوره‌ای (cron) کافی است."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} expired idempotency keys deleted"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.treasury import rebuild_balance_snapshots
+
+
+class Command(BaseCommand):
+    help = "ساخت دوباره جدول مانده صندوق‌ها و حساب‌های بانکی از روی پرداخت‌ها و دریافت‌ها"
+
+    def handle(self, *args, **options):
+        count = rebuild_balance_snapshots()
+        self.stdout.write(self.style.SUCCESS(f"{count} balance snapshots rebuilt"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.customer_search import rebuild_search_keys
+
+
+class Command(BaseCommand):
+    help = "ساخت دوباره کلیدهای جستجوی مشتری (CustomerSearchKey) از روی نام و موبایل مشتریان"
+
+    def handle(self, *args, **options):
+        count = rebuild_search_keys()
+        self.stdout.write(self.style.SUCCESS(f"search keys rebuilt for {count} customers"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.treasury import rebuild_daily_cash_flow
+
+
+class Command(BaseCommand):
+    help = "ساخت دوباره جدول گردش روزانه (DailyCashFlow) از روی پرداخت‌ها و دریافت‌ها"
+
+    def handle(self, *args, **options):
+        count = rebuild_daily_cash_flow()
+        self.stdout.write(self.style.SUCCESS(f"{count} daily cash flow rows rebuilt"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.availability import rebuild_availability
+
+
+class Command(BaseCommand):
+    help = "ساخت دوباره نقشه بیتی رزرو روزانه پرسنل (PersonnelDayAvailability) از روی رزروها"
+
+    def handle(self, *args, **options):
+        count = rebuild_availability()
+        self.stdout.write(self.style.SUCCESS(f"{count} personnel availability rows rebuilt"))
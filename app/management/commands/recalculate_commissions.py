@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.commissions import recalculate_commissions
+from app.utils import jalali_to_gregorian
+
+
+class Command(BaseCommand):
+    help = (
+        "محاسبه دوباره درصد و مبلغ کمیسیون فروش‌های ثبت‌شده بر اساس کمیسیون‌های فعلی پرسنل. "
+        "بدون --apply فقط اختلاف‌ها نمایش داده می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--personnel", type=int, help="شناسه پرسنل")
+        parser.add_argument("--work", type=int, help="شناسه خدمت")
+        parser.add_argument("--from", dest="start", help="از تاریخ (جلالی، مثل 1404-01-01)")
+        parser.add_argument("--to", dest="end", help="تا تاریخ (جلالی)")
+        parser.add_argument("--apply", action="store_true", help="اعمال تغییرات روی فروش‌ها")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def parse_date(self, value, name):
+        if not value:
+            return None
+        try:
+            return jalali_to_gregorian(value.replace("/", "-"))
+        except Exception as e:
+            raise CommandError(f"Invalid --{name} date: {value}") from e
+
+    def handle(self, *args, **options):
+        result = recalculate_commissions(
+            personnel_id=options["personnel"],
+            work_id=options["work"],
+            start_date=self.parse_date(options["start"], "from"),
+            end_date=self.parse_date(options["end"], "to"),
+            dry_run=not options["apply"],
+            chunk_size=options["chunk_size"],
+        )
+
+        for row in result.sample:
+            self.stdout.write(
+                f"sale {row['id']} ({row['date']:%Y-%m-%d}, price {row['price']}): "
+                f"{row['commission_percentage']}% {row['commission_amount']} -> "
+                f"{row['expected_percentage']}% {row['expected_amount']}"
+            )
+        summary = (
+            f"{result.changed} of {result.matched} sales differ; "
+            f"commission total {result.old_total} -> {result.new_total}"
+        )
+        if result.applied:
+            self.stdout.write(self.style.SUCCESS(f"Updated: {summary}"))
+        else:
+            self.stdout.write(f"Dry run: {summary}. Run again with --apply to update.")
@@ -0,0 +1,165 @@
+import functools
+import heapq
+import math
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# تعداد آخرین درخواست‌های هر view که صدک‌ها روی آن‌ها حساب می‌شوند
+METRICS_WINDOW = getattr(settings, "METRICS_WINDOW", 1000)
+# درخواست‌های کندتر از این مقدار (میلی‌ثانیه) همراه با کندترین کوئری‌ها لاگ می‌شوند
+SLOW_REQUEST_MS = getattr(settings, "METRICS_SLOW_REQUEST_MS", 1000)
+TOP_QUERIES = 5
+QUANTILES = (0.5, 0.95, 0.99)
+
+RequestSample = namedtuple("RequestSample", ["duration", "db_time", "queries", "template_time", "size"])
+
+# (فیلد نمونه، نام متریک، توضیح)
+SERIES = [
+    ("duration", "medusa_request_duration_seconds", "Wall time per request"),
+    ("db_time", "medusa_request_db_seconds", "Total SQL time per request"),
+    ("queries", "medusa_request_db_queries", "SQL queries per request"),
+    ("template_time", "medusa_request_template_seconds", "Template render time per request"),
+    ("size", "medusa_response_size_bytes", "Response body size"),
+]
+
+
+class RequestTimer:
+    """
+    اندازه‌گیری یک درخواست؛ به عنوان execute_wrapper روی اتصال‌ها نصب می‌شود و
+    کندترین کوئری‌ها را نگه می‌دارد.
+    """
+
+    def __init__(self, top=TOP_QUERIES):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._top = top
+        self._slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            item = (elapsed, self.queries, sql)
+            if len(self._slowest) < self._top:
+                heapq.heappush(self._slowest, item)
+            else:
+                heapq.heappushpop(self._slowest, item)
+
+    def top_queries(self):
+        return [
+            {"ms": round(elapsed * 1000, 2), "sql": sql[:500]}
+            for elapsed, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+
+_current_timer = ContextVar("request_timer", default=None)
+
+
+def start_request():
+    """شروع اندازه‌گیری درخواست جاری؛ خروجی (timer, token) و token باید به finish_request داده شود"""
+    timer = RequestTimer()
+    return timer, _current_timer.set(timer)
+
+
+def finish_request(token):
+    _current_timer.reset(token)
+
+
+def instrument_templates():
+    """زمان رندر قالب‌ها (render و TemplateResponse) به درخواست جاری اضافه می‌شود؛ include‌ها دوباره شمرده نمی‌شوند"""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, "_request_metrics", False):
+        return
+    original = Template.render
+
+    @functools.wraps(original)
+    def render(self, context=None, request=None):
+        timer = _current_timer.get()
+        if timer is None:
+            return original(self, context, request)
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            timer.template_time += time.perf_counter() - start
+
+    render._request_metrics = True
+    Template.render = render
+
+
+def quantile(ordered, q):
+    if not ordered:
+        return 0
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class MetricsRegistry:
+    """
+    آخرین نمونه‌های هر view در حافظه همین پروسس؛ هر worker متریک‌های خودش را دارد.
+    جمع و تعداد از شروع پروسس برای _sum و _count پرومتئوس نگه داشته می‌شود.
+    """
+
+    def __init__(self, window=METRICS_WINDOW):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._totals = defaultdict(lambda: [0, [0] * len(RequestSample._fields)])
+
+    def observe(self, view, sample):
+        with self._lock:
+            self._samples[view].append(sample)
+            totals = self._totals[view]
+            totals[0] += 1
+            totals[1] = [total + value for total, value in zip(totals[1], sample)]
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    def summary(self):
+        """{view: {"count": n, "sum": {فیلد: جمع}, "quantiles": {فیلد: {q: مقدار}}}}"""
+        with self._lock:
+            samples = {view: list(values) for view, values in self._samples.items()}
+            totals = {view: (count, list(sums)) for view, (count, sums) in self._totals.items()}
+
+        result = {}
+        for view, values in samples.items():
+            count, sums = totals[view]
+            quantiles = {}
+            for index, field in enumerate(RequestSample._fields):
+                ordered = sorted(value[index] for value in values)
+                quantiles[field] = {q: quantile(ordered, q) for q in QUANTILES}
+            result[view] = {
+                "count": count,
+                "sum": dict(zip(RequestSample._fields, sums)),
+                "quantiles": quantiles,
+            }
+        return result
+
+    def render_prometheus(self):
+        summary = self.summary()
+        lines = []
+        for field, name, help_text in SERIES:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} summary")
+            for view in sorted(summary):
+                data = summary[view]
+                label = view.replace("\\", "\\\\").replace('"', '\\"')
+                for q, value in data["quantiles"][field].items():
+                    lines.append(f'{name}{{view="{label}",quantile="{q}"}} {value:.6g}')
+                lines.append(f'{name}_sum{{view="{label}"}} {data["sum"][field]:.6g}')
+                lines.append(f'{name}_count{{view="{label}"}} {data["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
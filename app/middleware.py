@@ -1,12 +1,17 @@
 from django.shortcuts import redirect
 from django.conf import settings
+from django.http import JsonResponse
 from django.urls import reverse, NoReverseMatch
-import hashlib
 import time
+from contextlib import ExitStack
+
+from django.db import connections
 
 import logging
 import traceback
 
+from app import idempotency, metrics
+
 logger = logging.getLogger("app")  # همون logger که تو settings تعریف کردی
 
 class LogErrorsMiddleware:
@@ -29,7 +34,55 @@ class LogErrorsMiddleware:
     def process_exception(self, request, exception):
         logger.error("💥 Exception رخ داده در process_exception: %s\n%s", exception, traceback.format_exc())
 
-        
+
+
+class RequestMetricsMiddleware:
+    """
+    برای هر view: زمان کل، تعداد و زمان کوئری‌ها، زمان رندر قالب و حجم پاسخ در app.metrics ثبت می‌شود.
+    درخواست‌های کندتر از METRICS_SLOW_REQUEST_MS با کندترین کوئری‌هایشان لاگ می‌شوند.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.instrument_templates()
+
+    def __call__(self, request):
+        timer, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        duration = time.perf_counter() - start
+
+        if response.streaming:
+            size = int(response.get("Content-Length") or 0)
+        else:
+            size = len(response.content)
+        view = getattr(request.resolver_match, "view_name", None) or "unresolved"
+        metrics.registry.observe(
+            view, metrics.RequestSample(duration, timer.db_time, timer.queries, timer.template_time, size),
+        )
+
+        if duration * 1000 >= metrics.SLOW_REQUEST_MS:
+            logger.warning(
+                "Slow request %s %s: %.0fms, %s queries\n%s",
+                request.method, request.path, duration * 1000, timer.queries,
+                "\n".join(f"{query['ms']}ms {query['sql']}" for query in timer.top_queries()),
+                extra={
+                    "view": view,
+                    "status": response.status_code,
+                    "db_ms": round(timer.db_time * 1000, 2),
+                    "template_ms": round(timer.template_time * 1000, 2),
+                    "top_queries": timer.top_queries(),
+                },
+            )
+        return response
+
+
 class LoginRequiredMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -52,22 +105,44 @@ class LoginRequiredMiddleware:
 
 
 
-class PreventDoubleSubmitMiddleware:
+class IdempotencyMiddleware:
+    """
+    جلوگیری از ثبت دوباره فرم‌ها و درخواست‌های AJAX با جدول IdempotencyKey (app/idempotency.py).
+    درخواست تکراری همان پاسخ درخواست اول را می‌گیرد؛ اگر اولی هنوز در حال اجراست، تا IDEMPOTENCY_WAIT
+    ثانیه با فاصله‌های رو به افزایش منتظر پاسخ آن می‌ماند. چیزی در session نوشته نمی‌شود.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        if request.method == "POST":
-            post_data = str(request.POST) + request.path
-            hash_key = hashlib.md5(post_data.encode()).hexdigest()
-
-            last_key = request.session.get("last_post_key")
-            last_time = request.session.get("last_post_time", 0)
+        if request.method not in idempotency.IDEMPOTENCY_METHODS:
+            return self.get_response(request)
+
+        client_key = idempotency.client_key(request)
+        key = idempotency.request_key(request, client_key)
+        if not idempotency.claim(key):
+            stored = idempotency.wait_for_response(key)
+            if stored == idempotency.PENDING:
+                logger.warning("Duplicate request still in progress: %s %s", request.method, request.path)
+                return JsonResponse({"status": "error", "message": "درخواست قبلی هنوز در حال انجام است"}, status=409)
+            if stored is not None:
+                logger.info("Replayed duplicate request: %s %s", request.method, request.path)
+                return idempotency.replay_response(stored)
+            # درخواست اول خطا داد و علامت پاک شد؛ این درخواست دوباره اجرا می‌شود
+            if not idempotency.claim(key):
+                return JsonResponse({"status": "error", "message": "درخواست قبلی هنوز در حال انجام است"}, status=409)
 
-            if last_key == hash_key and time.time() - last_time < 3:
-                return redirect(request.path)
-
-            request.session["last_post_key"] = hash_key
-            request.session["last_post_time"] = time.time()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            idempotency.release(key)
+            raise
 
-        return self.get_response(request)
+        if response.streaming or response.status_code >= 500:
+            # خطای سرور ذخیره نمی‌شود تا ارسال دوباره امکان‌پذیر باشد
+            idempotency.release(key)
+        else:
+            ttl = idempotency.IDEMPOTENCY_TTL if client_key else idempotency.IDEMPOTENCY_WINDOW
+            idempotency.store_response(key, response, ttl)
+        return response
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Sum
+
+
+def build_snapshots(apps, schema_editor):
+    Pay = apps.get_model('app', 'Pay')
+    Receipt = apps.get_model('app', 'Receipt')
+    BalanceSnapshot = apps.get_model('app', 'BalanceSnapshot')
+
+    totals = {}
+    for model, sign in ((Receipt, 1), (Pay, -1)):
+        rows = model.objects.values('source_type_id', 'bank_id').annotate(total=Sum('amount'), last=Max('date')).order_by()
+        for row in rows:
+            key = (row['source_type_id'], row['bank_id'])
+            balance, last = totals.get(key, (0, None))
+            totals[key] = (balance + sign * (row['total'] or 0), max(filter(None, [last, row['last']]), default=None))
+
+    BalanceSnapshot.objects.bulk_create([
+        BalanceSnapshot(source_type_id=source_type_id, bank_id=bank_id, balance=balance, last_tx_date=last)
+        for (source_type_id, bank_id), (balance, last) in totals.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_import_default_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('last_tx_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bank', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.bank')),
+                ('source_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.paymentmethod')),
+            ],
+            options={
+                'verbose_name': 'مانده حساب',
+                'verbose_name_plural': 'مانده حساب\u200cها',
+                'constraints': [models.UniqueConstraint(fields=('source_type', 'bank'), name='unique_balance_snapshot')],
+            },
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
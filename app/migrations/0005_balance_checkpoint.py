@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_balance_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pay',
+            name='date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='receipt',
+            name='date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('closing_balance', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('bank', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.bank')),
+                ('source_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.paymentmethod')),
+            ],
+            options={
+                'verbose_name': 'مانده پایان روز',
+                'verbose_name_plural': 'مانده\u200cهای پایان روز',
+                'constraints': [models.UniqueConstraint(fields=('day', 'source_type', 'bank'), name='unique_balance_checkpoint')],
+            },
+        ),
+    ]
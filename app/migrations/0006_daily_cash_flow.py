@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def build_daily_cash_flow(apps, schema_editor):
+    Pay = apps.get_model('app', 'Pay')
+    Receipt = apps.get_model('app', 'Receipt')
+    DailyCashFlow = apps.get_model('app', 'DailyCashFlow')
+
+    totals = {}
+    for row in Pay.objects.values('date', 'source_type_id', 'bank_id', 'personnel_id').annotate(total=Sum('amount')).order_by():
+        key = (row['date'], row['source_type_id'], row['bank_id'], row['personnel_id'])
+        totals.setdefault(key, [0, 0])[0] += row['total'] or 0
+    for row in Receipt.objects.values('date', 'source_type_id', 'bank_id').annotate(total=Sum('amount')).order_by():
+        key = (row['date'], row['source_type_id'], row['bank_id'], None)
+        totals.setdefault(key, [0, 0])[1] += row['total'] or 0
+
+    DailyCashFlow.objects.bulk_create([
+        DailyCashFlow(day=day, source_type_id=source_type_id, bank_id=bank_id, personnel_id=personnel_id,
+                      pay_total=pay_total, receipt_total=receipt_total)
+        for (day, source_type_id, bank_id, personnel_id), (pay_total, receipt_total) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_balance_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCashFlow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('pay_total', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('receipt_total', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('bank', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.bank')),
+                ('personnel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.personnel')),
+                ('source_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.paymentmethod')),
+            ],
+            options={
+                'verbose_name': 'گردش روزانه',
+                'verbose_name_plural': 'گردش\u200cهای روزانه',
+                'indexes': [models.Index(fields=['personnel', 'day'], name='app_dailyca_personn_cec7c8_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'source_type', 'bank', 'personnel'), name='unique_daily_cash_flow')],
+            },
+        ),
+        migrations.RunPython(build_daily_cash_flow, migrations.RunPython.noop),
+    ]
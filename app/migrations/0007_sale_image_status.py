@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_daily_cash_flow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saleimage',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='saleimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'در صف'), ('processing', 'در حال پردازش'), ('ready', 'آماده'), ('failed', 'خطا')], db_index=True, default='ready', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='saleimage',
+            name='status_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_sale_image_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('thumb', 'کوچک'), ('medium', 'متوسط'), ('full', 'کامل')], max_length=10)),
+                ('format', models.CharField(choices=[('jpeg', 'JPEG'), ('webp', 'WebP')], max_length=5)),
+                ('file', models.FileField(upload_to='sale_images/variants/')),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='app.saleimage')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('image', 'size', 'format'), name='unique_sale_image_variant')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_sale_image_variant'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='saleimage',
+            index=models.Index(fields=['image_type', '-uploaded_at', '-id'], name='sale_image_gallery_idx'),
+        ),
+    ]
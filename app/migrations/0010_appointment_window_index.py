@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_sale_image_gallery_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['personnel', 'start_time', 'end_time'], name='appointment_window_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_appointment_window_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonnelDayAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('busy', models.BinaryField(default=b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00', max_length=36)),
+                ('personnel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_days', to='app.personnel')),
+            ],
+            options={
+                'verbose_name': 'نقشه رزرو روزانه',
+                'verbose_name_plural': 'نقشه\u200cهای رزرو روزانه',
+                'indexes': [models.Index(fields=['day'], name='app_personn_day_0212b1_idx')],
+                'constraints': [models.UniqueConstraint(fields=('personnel', 'day'), name='unique_personnel_day_availability')],
+            },
+        ),
+    ]
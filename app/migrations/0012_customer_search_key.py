@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:49
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# کپی ثابت منطق app/normalize.py در زمان این مهاجرت؛ تغییر بعدی کد برنامه این مهاجرت را عوض نمی‌کند
+_CHAR_MAP = str.maketrans({
+    "ي": "ی", "ى": "ی", "ئ": "ی", "ك": "ک", "ة": "ه", "أ": "ا", "إ": "ا", "آ": "ا",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4", "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+    "۰": "0", "۱": "1", "۲": "2", "۳": "3", "۴": "4", "۵": "5", "۶": "6", "۷": "7", "۸": "8", "۹": "9",
+    "\u200c": None, "\u200d": None, "\u0640": None,
+})
+_DIACRITICS = re.compile("[\u064b-\u0652\u0670]")
+_SEPARATORS = re.compile(r"[\s\-_.,/]+")
+
+
+def _name_tokens(value):
+    text = _DIACRITICS.sub("", str(value or "").translate(_CHAR_MAP)).lower()
+    return [token for token in _SEPARATORS.split(text) if token]
+
+
+def _normalize_mobile(value):
+    mobile = "".join(ch for ch in str(value or "").translate(_CHAR_MAP) if ch.isdigit())
+    if mobile.startswith("98") and len(mobile) == 12:
+        mobile = "0" + mobile[2:]
+    elif mobile.startswith("9") and len(mobile) == 10:
+        mobile = "0" + mobile
+    return mobile
+
+
+def _build_keys(fname, lname, mobile):
+    keys = {('n', token[:200]) for token in _name_tokens(f"{fname} {lname}")}
+    mobile = _normalize_mobile(mobile)
+    if mobile:
+        keys.add(('m', mobile))
+        keys.add(('r', mobile[::-1]))
+    return keys
+
+
+def build_search_keys(apps, schema_editor):
+    # کلیدهای مشتریان موجود؛ بعداً با دستور rebuild_customer_search_keys هم قابل ساخت است
+    Customer = apps.get_model('app', 'Customer')
+    CustomerSearchKey = apps.get_model('app', 'CustomerSearchKey')
+    rows = [
+        CustomerSearchKey(customer_id=customer_id, kind=kind, key=key)
+        for customer_id, fname, lname, mobile in Customer.objects.values_list('id', 'fname', 'lname', 'mobile').iterator()
+        for kind, key in _build_keys(fname, lname, mobile)
+    ]
+    CustomerSearchKey.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_personnel_day_availability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSearchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('n', 'نام'), ('m', 'موبایل'), ('r', 'موبایل معکوس')], max_length=1)),
+                ('key', models.CharField(max_length=200)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_keys', to='app.customer')),
+            ],
+            options={
+                'verbose_name': 'کلید جستجوی مشتری',
+                'verbose_name_plural': 'کلیدهای جستجوی مشتری',
+                'indexes': [models.Index(fields=['kind', 'key', 'customer'], name='customer_search_key_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_keys, migrations.RunPython.noop),
+    ]
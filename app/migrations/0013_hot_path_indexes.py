@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_customer_search_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pay',
+            index=models.Index(fields=['source_type', 'bank', 'date'], name='pay_account_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personnelcommission',
+            index=models.Index(fields=['personnel', 'work', 'start_date', 'end_date'], name='commission_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(fields=['source_type', 'bank', 'date'], name='receipt_account_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date'], name='sale_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['personnel', 'date'], name='sale_personnel_date_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_bank_key(apps, schema_editor):
+    # ردیف‌های تکراری «بدون بانک» (ممکن در MySQL) پیش از قید یکتایی جدید در یک ردیف جمع می‌شوند
+    BalanceSnapshot = apps.get_model('app', 'BalanceSnapshot')
+    kept = {}
+    for snapshot in BalanceSnapshot.objects.order_by('id'):
+        key = (snapshot.source_type_id, snapshot.bank_id or 0)
+        first = kept.get(key)
+        if first is None:
+            snapshot.bank_key = key[1]
+            snapshot.save(update_fields=['bank_key'])
+            kept[key] = snapshot
+            continue
+        first.balance += snapshot.balance
+        first.last_tx_date = max(filter(None, [first.last_tx_date, snapshot.last_tx_date]), default=None)
+        first.save(update_fields=['balance', 'last_tx_date'])
+        snapshot.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='balancesnapshot',
+            name='unique_balance_snapshot',
+        ),
+        migrations.AddField(
+            model_name='balancesnapshot',
+            name='bank_key',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_bank_key, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='balancecheckpoint',
+            name='bank',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='app.bank'),
+        ),
+        migrations.AlterField(
+            model_name='balancesnapshot',
+            name='bank',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='app.bank'),
+        ),
+        migrations.AlterField(
+            model_name='dailycashflow',
+            name='bank',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='app.bank'),
+        ),
+        migrations.AddConstraint(
+            model_name='balancesnapshot',
+            constraint=models.UniqueConstraint(fields=('source_type', 'bank_key'), name='unique_balance_snapshot'),
+        ),
+    ]
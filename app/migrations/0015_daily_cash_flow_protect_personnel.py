@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_balance_bank_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailycashflow',
+            name='personnel',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='app.personnel'),
+        ),
+    ]
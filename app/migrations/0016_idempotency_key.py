@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_daily_cash_flow_protect_personnel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('headers', models.JSONField(default=list)),
+                ('cookies', models.JSONField(default=dict)),
+                ('content', models.BinaryField(default=bytes)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'کلید درخواست',
+                'verbose_name_plural': 'کلیدهای درخواست',
+            },
+        ),
+    ]
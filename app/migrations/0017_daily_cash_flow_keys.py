@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:03
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def fill_keys(apps, schema_editor):
+    DailyCashFlow = apps.get_model('app', 'DailyCashFlow')
+    DailyCashFlow.objects.filter(bank__isnull=False).update(bank_key=F('bank_id'))
+    DailyCashFlow.objects.filter(personnel__isnull=False).update(personnel_key=F('personnel_id'))
+
+    # ردیف‌های تکراری (ممکن در MySQL روی ستون‌های NULL) پیش از قید یکتایی جدید در یک ردیف جمع می‌شوند
+    key = ['day', 'source_type_id', 'bank_key', 'personnel_key']
+    duplicates = (
+        DailyCashFlow.objects.values(*key)
+        .annotate(count=Count('id'), pay=Sum('pay_total'), receipt=Sum('receipt_total'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for group in duplicates:
+        rows = DailyCashFlow.objects.filter(**{field: group[field] for field in key}).order_by('id')
+        first = rows.first()
+        rows.exclude(pk=first.pk).delete()
+        DailyCashFlow.objects.filter(pk=first.pk).update(pay_total=group['pay'], receipt_total=group['receipt'])
+
+    # ردیف‌های صفرشده‌ای که حذف پرسنل را مسدود می‌کنند
+    DailyCashFlow.objects.filter(pay_total=0, receipt_total=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='dailycashflow',
+            name='unique_daily_cash_flow',
+        ),
+        migrations.AddField(
+            model_name='dailycashflow',
+            name='bank_key',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='dailycashflow',
+            name='personnel_key',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailycashflow',
+            constraint=models.UniqueConstraint(fields=('day', 'source_type', 'bank_key', 'personnel_key'), name='unique_daily_cash_flow'),
+        ),
+    ]
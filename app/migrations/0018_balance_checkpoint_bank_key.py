@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:05
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def fill_bank_key(apps, schema_editor):
+    BalanceCheckpoint = apps.get_model('app', 'BalanceCheckpoint')
+    BalanceCheckpoint.objects.filter(bank__isnull=False).update(bank_key=F('bank_id'))
+
+    # ردیف تکراری «بدون بانک» (ممکن در MySQL) معلوم نیست کدام مانده درست است؛ نقاط کنترل داده مشتق‌اند،
+    # پس همه پاک می‌شوند تا build_balance_checkpoints (cron شبانه) دوباره بسازد و تا آن موقع
+    # opening_balance از جمع خود اسناد حساب می‌شود
+    duplicated = (
+        BalanceCheckpoint.objects.values('day', 'source_type_id', 'bank_key')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    if duplicated.exists():
+        BalanceCheckpoint.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_daily_cash_flow_keys'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='balancecheckpoint',
+            name='unique_balance_checkpoint',
+        ),
+        migrations.AddField(
+            model_name='balancecheckpoint',
+            name='bank_key',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_bank_key, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='balancecheckpoint',
+            constraint=models.UniqueConstraint(fields=('day', 'source_type', 'bank_key'), name='unique_balance_checkpoint'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractBaseUser
 from django.utils import timezone
 from django.contrib.auth.models import User
@@ -57,6 +58,24 @@ class Personnel(BaseModel):
         return self.name
 
 
+class CustomerQuerySet(models.QuerySet):
+    def with_sale_stats(self):
+        """
+        تعداد فاکتور، تاریخ آخرین مراجعه و جمع خرید هر مشتری با زیرکوئری‌های وابسته روی ایندکس customer فروش؛
+        در لیست صفحه‌بندی‌شده فقط برای ردیف‌های همان صفحه اجرا می‌شوند.
+        """
+        sales = Sale.objects.filter(customer=models.OuterRef("pk")).order_by().values("customer")
+        return self.annotate(
+            sales_count=Coalesce(
+                models.Subquery(sales.annotate(value=models.Count("id")).values("value")), 0,
+            ),
+            last_visit=models.Subquery(sales.annotate(value=models.Max("date")).values("value")),
+            total_spent=Coalesce(
+                models.Subquery(sales.annotate(value=models.Sum("price")).values("value")), 0,
+            ),
+        )
+
+
 class Customer(BaseModel):
     fname = models.CharField(max_length=200)
     lname = models.CharField(max_length=200, default="")
@@ -72,6 +91,9 @@ class Customer(BaseModel):
     )
     black_list = models.BooleanField(default=False)
     black_list_reason = models.CharField(max_length=2000, blank=True)
+
+    objects = CustomerQuerySet.as_manager()
+
     @property
     def name(self):
         return f"{self.fname}-{self.lname}"
@@ -82,6 +104,54 @@ class Customer(BaseModel):
     def sale_count(self):
         return self.sale_set.count()
 
+# کلیدهای نرمال‌شده جستجوی مشتری (app/customer_search.py)؛ جستجو فقط با پیشوند روی ایندکس (kind, key, customer)
+class CustomerSearchKey(models.Model):
+    NAME = "n"
+    MOBILE = "m"
+    MOBILE_REVERSED = "r"
+    KIND_CHOICES = [
+        (NAME, "نام"),
+        (MOBILE, "موبایل"),
+        (MOBILE_REVERSED, "موبایل معکوس"),
+    ]
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="search_keys")
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    key = models.CharField(max_length=200)
+
+    class Meta:
+        verbose_name = "کلید جستجوی مشتری"
+        verbose_name_plural = "کلیدهای جستجوی مشتری"
+        indexes = [
+            models.Index(fields=["kind", "key", "customer"], name="customer_search_key_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_id} {self.kind}:{self.key}"
+
+
+class SaleManager(models.Manager):
+    def bulk_create_with_commission(self, sales, batch_size=1000):
+        """
+        ثبت انبوه فروش‌ها با محاسبه کمیسیون در حافظه؛
+        کمیسیون همه (پرسنل، خدمت)های درگیر با یک کوئری خوانده می‌شود.
+        """
+        from app.commissions import CommissionIndex, apply_commission, sale_day
+
+        sales = list(sales)
+        if not sales:
+            return []
+        index = CommissionIndex.load(
+            personnel_ids={sale.personnel_id for sale in sales},
+            work_ids={sale.work_id for sale in sales},
+        )
+        for sale in sales:
+            apply_commission(sale, index.lookup(sale.personnel_id, sale.work_id, sale_day(sale.date)))
+
+        with transaction.atomic():
+            return self.bulk_create(sales, batch_size=batch_size)
+
+
 class Sale(BaseModel):
     customer = models.ForeignKey("Customer", on_delete=models.PROTECT)
     personnel = models.ForeignKey("Personnel", on_delete=models.PROTECT)
@@ -92,22 +162,22 @@ class Sale(BaseModel):
     work = models.ForeignKey("Work" , on_delete=  models.PROTECT)
     commission_percentage = models.IntegerField(default=60)
     commission_amount = models.IntegerField(default=0)
-    
+
+    objects = SaleManager()
+
+    class Meta:
+        indexes = [
+            # لیست روزانه و نمودار فروش؛ لیست پرسنل روی (personnel, date)
+            models.Index(fields=["date"], name="sale_date_idx"),
+            models.Index(fields=["personnel", "date"], name="sale_personnel_date_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.pk:  
-            commission = PersonnelCommission.objects.filter(
-                personnel=self.personnel,
-                work=self.work,
-                start_date__lte=self.date.date(),
-                end_date__gte=self.date.date()
-            ).first()
-
-            if commission:
-                self.commission_percentage = commission.percentage
-                self.commission_amount = int(self.price * commission.percentage / 100)
-            else:
-                self.commission_percentage = 0
-                self.commission_amount = 0
+            from app.commissions import apply_commission, commission_index, sale_day
+
+            percentage = commission_index().lookup(self.personnel_id, self.work_id, sale_day(self.date))
+            apply_commission(self, percentage)
 
         super().save(*args, **kwargs)
 
@@ -119,14 +189,84 @@ class SaleImage(models.Model):
         (AFTER, "بعد"),
     ]
 
+    # فایل خام آپلود با وضعیت pending ذخیره و بعداً توسط process_sale_images فشرده می‌شود
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+    STATUSES = [
+        (PENDING, "در صف"),
+        (PROCESSING, "در حال پردازش"),
+        (READY, "آماده"),
+        (FAILED, "خطا"),
+    ]
+
     sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name="images")
     image = models.ImageField(upload_to="sale_images/")
     image_type = models.CharField(max_length=10, choices=IMAGE_TYPES)  # 👈 اضافه شد
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=READY, db_index=True)
+    status_updated_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # صفحه‌بندی کرسری گالری روی (uploaded_at, id)
+            models.Index(fields=["image_type", "-uploaded_at", "-id"], name="sale_image_gallery_idx"),
+        ]
 
     def __str__(self):
         return f"{self.sale} - {self.get_image_type_display()}"
 
+    def srcset(self, fmt):
+        """srcset نسخه‌های یک فرمت؛ نسخه full/jpeg خود فایل image است (از variants پیش‌خوانده استفاده می‌شود)"""
+        variants = sorted(
+            (variant for variant in self.variants.all() if variant.format == fmt or variant.size == SaleImageVariant.FULL),
+            key=lambda variant: variant.width,
+        )
+        parts = {}
+        for variant in variants:
+            # نسخه‌های قدیمی تصاویر کوچک ممکن است عرض تکراری داشته باشند
+            if variant.width in parts:
+                continue
+            if variant.format == fmt:
+                parts[variant.width] = f"{variant.file.url} {variant.width}w"
+            elif fmt == SaleImageVariant.JPEG:
+                parts[variant.width] = f"{self.image.url} {variant.width}w"
+        return ", ".join(parts.values())
+
+
+class SaleImageVariant(models.Model):
+    THUMB = "thumb"
+    MEDIUM = "medium"
+    FULL = "full"
+    SIZES = [
+        (THUMB, "کوچک"),
+        (MEDIUM, "متوسط"),
+        (FULL, "کامل"),
+    ]
+    JPEG = "jpeg"
+    WEBP = "webp"
+    FORMATS = [
+        (JPEG, "JPEG"),
+        (WEBP, "WebP"),
+    ]
+
+    image = models.ForeignKey(SaleImage, on_delete=models.CASCADE, related_name="variants")
+    size = models.CharField(max_length=10, choices=SIZES)
+    format = models.CharField(max_length=5, choices=FORMATS)
+    file = models.FileField(upload_to="sale_images/variants/")
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["image", "size", "format"], name="unique_sale_image_variant"),
+        ]
+
+    def __str__(self):
+        return f"{self.image_id} - {self.size}.{self.format}"
+
 
 
 class Work(BaseModel):
@@ -202,10 +342,13 @@ class PersonnelCommission(BaseModel):
     class Meta:
         verbose_name = "کمیسیون پرسنل"
         verbose_name_plural = "کمیسیون‌ها"
+        indexes = [
+            models.Index(fields=["personnel", "work", "start_date", "end_date"], name="commission_period_idx"),
+        ]
 
     def save(self, *args, **kwargs):
-        today = datetime.date.today()
-        jalali_year = datetime2jalali(today).year
+        # datetime2jalali با USE_TZ فقط datetime می‌پذیرد
+        jalali_year = datetime2jalali(timezone.now()).year
 
         if not self.start_date:
             self.start_date = datetime.date(jalali_year - 621, 3, 21)
@@ -239,6 +382,12 @@ class Appointment(BaseModel):
     is_paid = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # بازه زمانی تقویم و بررسی تداخل هر پرسنل؛ end_time از خود ایندکس خوانده می‌شود
+            models.Index(fields=["personnel", "start_time", "end_time"], name="appointment_window_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.end_time and hasattr(self.work, 'duration'):
             self.end_time = self.start_time + timezone.timedelta(minutes=self.work.duration)
@@ -265,7 +414,7 @@ class Pay(BaseModel):
     bank = models.ForeignKey("Bank", null=True, blank=True, on_delete=models.SET_NULL)
     amount = models.DecimalField(max_digits=12, decimal_places=0)
     description = models.TextField(blank=True, null=True)
-    date = models.DateField()
+    date = models.DateField(db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     pay_type = models.ForeignKey(PayType, on_delete=models.PROTECT)
@@ -276,6 +425,17 @@ class Pay(BaseModel):
         related_name="payments_received"
     )
 
+    class Meta:
+        indexes = [
+            # کاردکس و مانده اولیه یک صندوق/حساب: اول برابری‌ها، بعد بازه تاریخ
+            models.Index(fields=["source_type", "bank", "date"], name="pay_account_date_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # به‌روزرسانی موجودی (سیگنال post_save) در همان تراکنش ثبت پرداخت انجام شود
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"پرداخت به {self.pay_type} - {self.amount} - {self.date}"
 
@@ -295,7 +455,7 @@ class Receipt(BaseModel):
     bank = models.ForeignKey("Bank", null=True, blank=True, on_delete=models.SET_NULL)
     amount = models.DecimalField(max_digits=12, decimal_places=0)
     description = models.TextField(blank=True, null=True)
-    date = models.DateField()
+    date = models.DateField(db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     sale = models.ForeignKey("Sale", on_delete=models.CASCADE, blank=True, null=True)
     receipt_type = models.ForeignKey(ReceiptType, on_delete=models.PROTECT)
@@ -306,5 +466,128 @@ class Receipt(BaseModel):
         related_name="receipts_made"        
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["source_type", "bank", "date"], name="receipt_account_date_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"دریافت از {self.receipt_type} - {self.amount} - {self.date}"
+
+
+# مانده هر صندوق/حساب بانکی که با هر ثبت، ویرایش یا حذف پرداخت و دریافت به‌روز می‌شود
+class BalanceSnapshot(models.Model):
+    source_type = models.ForeignKey("PaymentMethod", on_delete=models.CASCADE)
+    # حذف بانک: ردیف‌ها پیش از حذف روی ردیف «بدون بانک» جمع می‌شوند (treasury.fold_bank_into_unbanked)
+    bank = models.ForeignKey("Bank", null=True, blank=True, on_delete=models.DO_NOTHING)
+    # شناسه بانک یا ۰ برای «بدون بانک»؛ در MySQL یکتایی روی ستون NULL تضمین نمی‌شود
+    bank_key = models.PositiveIntegerField(default=0, editable=False)
+    balance = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    last_tx_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "مانده حساب"
+        verbose_name_plural = "مانده حساب‌ها"
+        constraints = [
+            models.UniqueConstraint(fields=["source_type", "bank_key"], name="unique_balance_snapshot"),
+        ]
+
+    @property
+    def name(self):
+        if self.bank_id:
+            return f"{self.source_type.name} - {self.bank.name}"
+        return self.source_type.name
+
+    def __str__(self):
+        return f"{self.name}: {self.balance}"
+
+
+# مانده پایان روز هر صندوق/حساب بانکی؛ مانده اولیه کاردکس از نزدیک‌ترین نقطه قبل از بازه خوانده می‌شود
+class BalanceCheckpoint(models.Model):
+    day = models.DateField(db_index=True)
+    source_type = models.ForeignKey("PaymentMethod", on_delete=models.CASCADE)
+    bank = models.ForeignKey("Bank", null=True, blank=True, on_delete=models.DO_NOTHING)
+    # شناسه بانک یا ۰؛ مثل BalanceSnapshot.bank_key
+    bank_key = models.PositiveIntegerField(default=0, editable=False)
+    closing_balance = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+
+    class Meta:
+        verbose_name = "مانده پایان روز"
+        verbose_name_plural = "مانده‌های پایان روز"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "source_type", "bank_key"], name="unique_balance_checkpoint"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.source_type_id}/{self.bank_id}: {self.closing_balance}"
+
+
+# جمع روزانه پرداخت و دریافت به تفکیک صندوق/بانک/پرسنل برای نمودارهای داشبورد
+class DailyCashFlow(models.Model):
+    day = models.DateField()
+    source_type = models.ForeignKey("PaymentMethod", on_delete=models.CASCADE)
+    bank = models.ForeignKey("Bank", null=True, blank=True, on_delete=models.DO_NOTHING)
+    personnel = models.ForeignKey("Personnel", null=True, blank=True, on_delete=models.PROTECT)
+    # شناسه بانک/پرسنل یا ۰؛ مثل BalanceSnapshot.bank_key، یکتایی روی ستون NULL در MySQL تضمین نمی‌شود
+    bank_key = models.PositiveIntegerField(default=0, editable=False)
+    personnel_key = models.PositiveIntegerField(default=0, editable=False)
+    pay_total = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    receipt_total = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+
+    class Meta:
+        verbose_name = "گردش روزانه"
+        verbose_name_plural = "گردش‌های روزانه"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "source_type", "bank_key", "personnel_key"], name="unique_daily_cash_flow",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["personnel", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.source_type_id}/{self.bank_id}: -{self.pay_total} +{self.receipt_total}"
+
+
+# نقشه بیتی ساعات رزروشده هر پرسنل در هر روز؛ هر بیت یک بازه ۵ دقیقه‌ای (بیت ۰ = ۰۰:۰۰)
+class PersonnelDayAvailability(models.Model):
+    personnel = models.ForeignKey("Personnel", on_delete=models.CASCADE, related_name="availability_days")
+    day = models.DateField()
+    busy = models.BinaryField(max_length=36, default=bytes(36))
+
+    class Meta:
+        verbose_name = "نقشه رزرو روزانه"
+        verbose_name_plural = "نقشه‌های رزرو روزانه"
+        constraints = [
+            models.UniqueConstraint(fields=["personnel", "day"], name="unique_personnel_day_availability"),
+        ]
+        indexes = [
+            models.Index(fields=["day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.personnel_id} - {self.day}"
+
+
+# درخواست‌های POST اجراشده برای جلوگیری از ثبت تکراری (app/idempotency.py)؛ کلید، هش کاربر و داده درخواست است
+class IdempotencyKey(models.Model):
+    key = models.CharField(max_length=64, primary_key=True)
+    # تا پایان درخواست اول خالی است
+    status = models.PositiveSmallIntegerField(null=True, blank=True)
+    headers = models.JSONField(default=list)
+    cookies = models.JSONField(default=dict)
+    content = models.BinaryField(default=bytes)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "کلید درخواست"
+        verbose_name_plural = "کلیدهای درخواست"
+
+    def __str__(self):
+        return f"{self.key} ({self.status or 'pending'})"
@@ -0,0 +1,35 @@
+import re
+
+from app.utils import persian_to_english
+
+# ی و ک عربی، ارقام عربی، نیم‌فاصله و اعراب
+_CHAR_MAP = str.maketrans({
+    "ي": "ی", "ى": "ی", "ئ": "ی", "ك": "ک", "ة": "ه", "أ": "ا", "إ": "ا", "آ": "ا",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4", "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+    "\u200c": None, "\u200d": None, "\u0640": None,
+})
+_DIACRITICS = re.compile("[\u064b-\u0652\u0670]")
+_SEPARATORS = re.compile(r"[\s\-_.,/]+")
+
+
+def normalize_text(value):
+    text = persian_to_english(str(value or "")).translate(_CHAR_MAP)
+    return _DIACRITICS.sub("", text).lower()
+
+
+def name_tokens(value):
+    return [token for token in _SEPARATORS.split(normalize_text(value)) if token]
+
+
+def name_key(value):
+    """کلید مقایسه نام‌ها: «علي - رضايي» و «علی رضایی» یکی هستند"""
+    return " ".join(name_tokens(value))
+
+
+def normalize_mobile(value):
+    mobile = "".join(ch for ch in persian_to_english(str(value or "")) if ch.isdigit())
+    if mobile.startswith("98") and len(mobile) == 12:
+        mobile = "0" + mobile[2:]
+    elif mobile.startswith("9") and len(mobile) == 10:
+        mobile = "0" + mobile
+    return mobile
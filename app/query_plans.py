@@ -0,0 +1,78 @@
+import json
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from app.booking import overlapping
+from app.ledger import _ledger_filters
+from app.models import Appointment, Pay, PersonnelCommission, Receipt, Sale
+
+# (عنوان، مدلی که نباید کامل پیمایش شود، کوئری)
+HotQuery = namedtuple("HotQuery", ["label", "model", "queryset"])
+PlanCheck = namedtuple("PlanCheck", ["label", "table", "full_scans", "plan"])
+
+
+def hot_queries():
+    """کوئری‌های پرتکرار view‌ها با همان فیلترها؛ مقدار پارامترها در طرح اجرا اثری ندارد"""
+    now = timezone.now()
+    today = timezone.localdate()
+    week_ago = today - timedelta(days=7)
+    ledger = _ledger_filters(week_ago, today, bank_id=1, payment_method_id=1)
+    return [
+        HotQuery("sales list (admin)", Sale, Sale.objects.filter(date__gte=now, date__lt=now + timedelta(days=1)).order_by("-date")),
+        HotQuery("sales list (personnel)", Sale, Sale.objects.filter(personnel_id=1, date__gte=now, date__lt=now + timedelta(days=1))),
+        HotQuery("home sales chart", Sale, Sale.objects.filter(date__gte=now - timedelta(days=90), date__lt=now).values("date")),
+        HotQuery("appointment feed", Appointment, Appointment.objects.filter(personnel_id=1, start_time__lt=now, end_time__gt=now - timedelta(days=7))),
+        HotQuery("booking overlap", Appointment, overlapping(1, now, now + timedelta(hours=1))),
+        HotQuery("pay list", Pay, Pay.objects.filter(date__range=[week_ago, today]).order_by("-date")),
+        HotQuery("receipt list", Receipt, Receipt.objects.filter(date__range=[week_ago, today]).order_by("-date")),
+        HotQuery("ledger pays", Pay, Pay.objects.filter(**ledger).order_by("date", "id")),
+        HotQuery("ledger receipts", Receipt, Receipt.objects.filter(**ledger).order_by("date", "id")),
+        HotQuery("opening balance (pays)", Pay, Pay.objects.filter(source_type_id=1, bank_id=1, date__gt=week_ago, date__lt=today).values("amount")),
+        HotQuery("opening balance (receipts)", Receipt, Receipt.objects.filter(source_type_id=1, bank_id=1, date__gt=week_ago, date__lt=today).values("amount")),
+        HotQuery("commission period", PersonnelCommission, PersonnelCommission.objects.filter(
+            personnel_id=1, work_id=1, start_date__lte=today, end_date__gte=today,
+        )),
+    ]
+
+
+def _sqlite_full_scans(plan, table):
+    # «SCAN جدول» پیمایش کامل جدول یا ایندکس است؛ «SEARCH» یعنی جستجو روی ایندکس
+    pattern = re.compile(rf"\bSCAN {re.escape(table)}\b")
+    return [line.strip() for line in plan.splitlines() if pattern.search(line)]
+
+
+def _mysql_full_scans(plan, table):
+    # access_type برابر ALL (کل جدول) یا index (کل ایندکس)
+    found = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if node.get("table_name") == table and node.get("access_type") in ("ALL", "index"):
+                found.append(f"{table}: access_type={node['access_type']}")
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(json.loads(plan))
+    return found
+
+
+def check_query(query):
+    table = query.model._meta.db_table
+    if connection.vendor == "sqlite":
+        plan = query.queryset.explain()
+        return PlanCheck(query.label, table, _sqlite_full_scans(plan, table), plan)
+    if connection.vendor == "mysql":
+        plan = query.queryset.explain(format="json")
+        return PlanCheck(query.label, table, _mysql_full_scans(plan, table), plan)
+    raise NotImplementedError(f"EXPLAIN check is not implemented for {connection.vendor}")
+
+
+def check_query_plans():
+    return [check_query(query) for query in hot_queries()]
@@ -0,0 +1,108 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from app.models import Bank, PaymentMethod, PayType, Personnel, PersonnelCommission, ReceiptType, Work
+
+REFDATA_VERSION_KEY = "refdata_version"
+REFDATA_CACHE_KEY = "refdata:{version}"
+
+# نسخه در کش مشترک (CACHES در settings) است؛ هر پروسس حداکثر هر REFDATA_CHECK_INTERVAL ثانیه یک بار آن را می‌خواند
+# و بین دو بررسی کپی خودش را معتبر می‌داند. تغییر در همین پروسس فوراً دیده می‌شود.
+REFDATA_CHECK_INTERVAL = getattr(settings, "REFDATA_CHECK_INTERVAL", 5)
+# این مهلت فقط اگر کلید نسخه از کش حذف شود، کهنگی کپی پروسس را محدود می‌کند
+REFDATA_TTL = getattr(settings, "REFDATA_TTL", 60)
+
+class ReferenceData:
+    """
+    جدول‌های پایه کوچک (روش پرداخت، بانک، نوع پرداخت/دریافت، خدمت، پرسنل و خدمات هر پرسنل)
+    به صورت لیست دیکشنری و JSON آماده برای قالب‌ها.
+    """
+
+    def __init__(self, lists):
+        self.payment_methods = lists["payment_methods"]
+        self.banks = lists["banks"]
+        self.pay_types = lists["pay_types"]
+        self.receipt_types = lists["receipt_types"]
+        self.works = lists["works"]
+        self.personnel = lists["personnel"]
+        # کلیدهای JSON رشته‌اند
+        self.personnel_works = {int(key): value for key, value in lists["personnel_works"].items()}
+        self.json = {name: json.dumps(value) for name, value in lists.items()}
+
+    @staticmethod
+    def load():
+        works = {row["id"]: row for row in Work.objects.order_by("id").values("id", "work_name")}
+        personnel_works = {}
+        for personnel_id, work_id in PersonnelCommission.objects.order_by("id").values_list("personnel_id", "work_id"):
+            # هر خدمت یک بار، به ترتیب ثبت کمیسیون
+            items = personnel_works.setdefault(str(personnel_id), [])
+            if work_id in works and works[work_id] not in items:
+                items.append(works[work_id])
+        personnel = [
+            {**row, "name": f"{row['fname']}-{row['lname']}"}
+            for row in Personnel.objects.order_by("id").values("id", "fname", "lname", "is_active")
+        ]
+        return {
+            "payment_methods": list(PaymentMethod.objects.order_by("id").values("id", "name", "requires_bank")),
+            "banks": list(Bank.objects.order_by("id").values("id", "name")),
+            "pay_types": list(PayType.objects.order_by("id").values("id", "name", "is_personnel")),
+            "receipt_types": list(ReceiptType.objects.order_by("id").values("id", "name", "is_customer")),
+            "works": list(works.values()),
+            "personnel": personnel,
+            "personnel_works": personnel_works,
+        }
+
+
+_shared_data = None
+_shared_version = None
+_shared_loaded_at = 0.0
+_checked_version = None
+_checked_at = 0.0
+
+
+def current_version():
+    """نسخه داده‌های پایه؛ در حالت پایدار از حافظه پروسس و هر REFDATA_CHECK_INTERVAL ثانیه یک بار از کش مشترک"""
+    global _checked_version, _checked_at
+    now = time.monotonic()
+    if _checked_version is None or now - _checked_at >= REFDATA_CHECK_INTERVAL:
+        _checked_version = cache.get(REFDATA_VERSION_KEY, 0)
+        _checked_at = now
+    return _checked_version
+
+
+def reference_data():
+    """
+    نسخه فعلی داده‌های پایه: اول کپی همین پروسس، بعد کش جنگو و در آخر دیتابیس.
+    در حالت پایدار هیچ کوئری دیتابیسی ندارد.
+    """
+    global _shared_data, _shared_version, _shared_loaded_at
+    version = current_version()
+    expired = time.monotonic() - _shared_loaded_at > REFDATA_TTL
+    if _shared_data is not None and version == _shared_version and not expired:
+        return _shared_data
+
+    key = REFDATA_CACHE_KEY.format(version=version)
+    lists = cache.get(key)
+    if lists is None:
+        lists = ReferenceData.load()
+        cache.set(key, lists, REFDATA_TTL)
+    _shared_data = ReferenceData(lists)
+    _shared_version = version
+    _shared_loaded_at = time.monotonic()
+    return _shared_data
+
+
+def invalidate_reference_data():
+    global _shared_data, _checked_version, _checked_at
+    _shared_data = None
+    try:
+        version = cache.incr(REFDATA_VERSION_KEY)
+    except ValueError:
+        version = 1
+        cache.set(REFDATA_VERSION_KEY, version, None)
+    # نسخه تازه بدون خواندن دوباره از کش
+    _checked_version = version
+    _checked_at = time.monotonic()
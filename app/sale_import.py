@@ -0,0 +1,246 @@
+import csv
+import io
+import logging
+from collections import namedtuple
+from datetime import date, datetime, time
+
+import jdatetime
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from app.models import Customer, Personnel, Sale, Work
+from app.normalize import name_key, normalize_mobile
+from app.utils import persian_to_english
+
+logger = logging.getLogger("app")
+
+IMPORT_BATCH_SIZE = 1000
+
+# عنوان‌های قابل قبول هر ستون در ردیف اول فایل
+COLUMN_ALIASES = {
+    "date": ["date", "تاریخ"],
+    "time": ["time", "ساعت"],
+    "mobile": ["mobile", "موبایل", "موبایل مشتری"],
+    "personnel": ["personnel", "پرسنل"],
+    "work": ["work", "خدمت"],
+    "price": ["price", "مبلغ"],
+}
+REQUIRED_COLUMNS = ["date", "mobile", "personnel", "work", "price"]
+
+RowError = namedtuple("RowError", ["row", "message"])
+ImportResult = namedtuple("ImportResult", ["total", "created", "errors"])
+
+
+class SaleImportError(Exception):
+    pass
+
+
+class SaleImportFileError(SaleImportError):
+    pass
+
+
+def _xlsx_rows(file):
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _csv_rows(file):
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        with open(file, encoding="utf-8-sig", newline="") as handle:
+            yield from csv.reader(handle)
+    else:
+        yield from csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+
+
+def read_rows(file, filename):
+    """
+    ردیف‌های فایل به صورت جریانی: (شماره ردیف، دیکشنری ستون‌ها).
+    ردیف اول عنوان ستون‌هاست.
+    """
+    name = str(filename).lower()
+    if name.endswith(".xlsx"):
+        rows = _xlsx_rows(file)
+    elif name.endswith(".csv"):
+        rows = _csv_rows(file)
+    else:
+        raise SaleImportFileError("فقط فایل‌های xlsx و csv پشتیبانی می‌شوند")
+
+    header = next(rows, None)
+    if header is None:
+        raise SaleImportFileError("فایل خالی است")
+
+    titles = [name_key(title) for title in header]
+    positions = {}
+    for key, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in titles:
+                positions[key] = titles.index(alias)
+                break
+    missing = [key for key in REQUIRED_COLUMNS if key not in positions]
+    if missing:
+        raise SaleImportFileError(f"ستون‌های لازم پیدا نشد: {', '.join(missing)}")
+
+    for number, row in enumerate(rows, start=2):
+        if not any(cell not in (None, "") for cell in row):
+            continue
+        yield number, {
+            key: row[position] if position < len(row) else None
+            for key, position in positions.items()
+        }
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = persian_to_english(str(value or "")).strip().replace("/", "-")
+    parts = [int(part) for part in text.split("-")]
+    if len(parts) != 3:
+        raise ValueError
+    # سال کمتر از ۱۷۰۰ جلالی در نظر گرفته می‌شود
+    if parts[0] < 1700:
+        return jdatetime.date(*parts).togregorian()
+    return date(*parts)
+
+
+def _parse_time(value):
+    if value in (None, ""):
+        return time(12, 0)
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time):
+        return value
+    hour, minute = persian_to_english(str(value)).strip().split(":")[:2]
+    return time(int(hour), int(minute))
+
+
+def _parse_price(value):
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = persian_to_english(str(value or "")).replace(",", "").replace("٬", "").strip()
+    return int(float(text))
+
+
+class SaleImporter:
+    """
+    ورود انبوه فروش‌ها از xlsx/csv. مشتری با موبایل، خدمت با نام و پرسنل با نام کامل
+    یا موبایل از روی دیکشنری‌هایی که یک بار ساخته می‌شوند پیدا می‌شوند.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, user=None, dry_run=False):
+        self.batch_size = batch_size
+        self.user = user
+        self.dry_run = dry_run
+        # در صورت تکرار، رکورد قدیمی‌تر انتخاب می‌شود؛ کلید خالی هیچ‌وقت تطبیق نمی‌خورد
+        self.customers = {}
+        for customer_id, mobile in Customer.objects.order_by("id").values_list("id", "mobile"):
+            self.customers.setdefault(normalize_mobile(mobile), customer_id)
+        self.works = {}
+        for work_id, name in Work.objects.order_by("id").values_list("id", "work_name"):
+            self.works.setdefault(name_key(name), work_id)
+        self.personnel = {}
+        for personnel_id, fname, lname, mobile in Personnel.objects.order_by("id").values_list(
+            "id", "fname", "lname", "mobile"
+        ):
+            self.personnel.setdefault(name_key(f"{fname} {lname}"), personnel_id)
+            self.personnel.setdefault(normalize_mobile(mobile), personnel_id)
+        for lookup in (self.customers, self.works, self.personnel):
+            lookup.pop("", None)
+
+    def build_sale(self, values):
+        errors = []
+
+        customer_id = self.customers.get(normalize_mobile(values["mobile"]))
+        if customer_id is None:
+            errors.append(f"مشتری با موبایل {values['mobile']} پیدا نشد")
+        work_id = self.works.get(name_key(values["work"]))
+        if work_id is None:
+            errors.append(f"خدمت «{values['work']}» پیدا نشد")
+        personnel_key = values["personnel"]
+        personnel_id = self.personnel.get(name_key(personnel_key)) or self.personnel.get(
+            normalize_mobile(personnel_key)
+        )
+        if personnel_id is None:
+            errors.append(f"پرسنل «{personnel_key}» پیدا نشد")
+
+        try:
+            sale_date = datetime.combine(_parse_date(values["date"]), _parse_time(values.get("time")))
+            if settings.USE_TZ:
+                sale_date = timezone.make_aware(sale_date)
+        except (TypeError, ValueError):
+            errors.append(f"تاریخ یا ساعت نامعتبر: {values['date']} {values.get('time') or ''}".strip())
+            sale_date = None
+        try:
+            price = _parse_price(values["price"])
+            if price < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append(f"مبلغ نامعتبر: {values['price']}")
+            price = None
+
+        if errors:
+            return None, "؛ ".join(errors)
+        return Sale(
+            customer_id=customer_id,
+            personnel_id=personnel_id,
+            work_id=work_id,
+            price=price,
+            date=sale_date,
+            created_by=self.user,
+            updated_by=self.user,
+        ), None
+
+    def run(self, file, filename):
+        """
+        کل فایل در یک تراکنش ثبت می‌شود: اگر یک دسته یا خواندن ادامه فایل خطا بدهد،
+        هیچ فاکتوری ثبت نمی‌شود و فایل را می‌توان بعد از اصلاح دوباره فرستاد.
+        """
+        total = created = 0
+        errors = []
+        batch = []
+        try:
+            with transaction.atomic():
+                for number, values in read_rows(file, filename):
+                    total += 1
+                    sale, error = self.build_sale(values)
+                    if error:
+                        errors.append(RowError(number, error))
+                    else:
+                        batch.append(sale)
+                    if len(batch) >= self.batch_size:
+                        created += self.flush(batch)
+                        batch = []
+                created += self.flush(batch)
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise SaleImportFileError(f"خواندن ردیف {total + 1} فایل ممکن نیست؛ هیچ فاکتوری ثبت نشد") from e
+        except DatabaseError as e:
+            logger.error(
+                "Sale import rolled back",
+                exc_info=True,
+                extra={"user": getattr(self.user, "id", None), "file": str(filename), "rows_read": total},
+            )
+            raise SaleImportError("ثبت فاکتورها ناموفق بود و هیچ فاکتوری از این فایل ثبت نشد") from e
+
+        logger.info(
+            "Sales imported",
+            extra={
+                "user": getattr(self.user, "id", None),
+                "file": str(filename),
+                "total": total,
+                "created": created,
+                "errors": len(errors),
+                "dry_run": self.dry_run,
+            },
+        )
+        return ImportResult(total, created, errors)
+
+    def flush(self, batch):
+        if not batch or self.dry_run:
+            return 0
+        return len(Sale.objects.bulk_create_with_commission(batch, batch_size=self.batch_size))
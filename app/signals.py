@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from app.models import (
+    Appointment, Bank, Customer, Pay, PaymentMethod, PayType, Personnel, PersonnelCommission, Receipt, ReceiptType,
+    SaleImageVariant, Work,
+)
+from app import availability, commissions, customer_search, refdata, treasury
+
+
+@receiver(pre_save, sender=Pay)
+@receiver(pre_save, sender=Receipt)
+def remember_ledger_entry(sender, instance, **kwargs):
+    # مقدار قبلی سند برای برگرداندن اثرش روی مانده در زمان ویرایش
+    instance._ledger_previous = treasury.stored_ledger_entry(sender, instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Pay)
+@receiver(post_save, sender=Receipt)
+def update_balances_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, "_ledger_previous", None)
+    treasury.apply_ledger_change(sender, old=previous, new=treasury.ledger_entry(instance))
+    instance._ledger_previous = None
+
+
+@receiver(post_delete, sender=Pay)
+@receiver(post_delete, sender=Receipt)
+def update_balances_on_delete(sender, instance, **kwargs):
+    treasury.apply_ledger_change(sender, old=treasury.ledger_entry(instance))
+
+
+@receiver(pre_delete, sender=Bank)
+def fold_bank_balances(sender, instance, **kwargs):
+    treasury.fold_bank_into_unbanked(instance.pk)
+
+
+@receiver(post_save, sender=PersonnelCommission)
+@receiver(post_delete, sender=PersonnelCommission)
+def invalidate_commissions(sender, **kwargs):
+    commissions.invalidate_commission_index()
+    # اگر ایندکس پیش از commit با داده‌های همین تراکنش ساخته شده باشد، دوباره ساخته شود
+    transaction.on_commit(commissions.invalidate_commission_index)
+
+
+@receiver(post_delete, sender=SaleImageVariant)
+def delete_variant_file(sender, instance, **kwargs):
+    # حذف تصویر فاکتور (cascade) فایل نسخه‌ها را هم پاک کند
+    instance.file.delete(save=False)
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_days(sender, instance, **kwargs):
+    # روزهای قبلی رزرو تا در صورت جابه‌جایی، نقشه روز قبلی هم به‌روز شود
+    previous = None
+    if instance.pk:
+        previous = Appointment.objects.filter(pk=instance.pk).values_list("personnel_id", "start_time", "end_time").first()
+    instance._availability_previous = availability.appointment_days(*previous) if previous else set()
+
+
+@receiver(post_save, sender=Appointment)
+def update_availability_on_save(sender, instance, **kwargs):
+    days = availability.appointment_days(instance.personnel_id, instance.start_time, instance.end_time)
+    availability.refresh_days(days | getattr(instance, "_availability_previous", set()))
+    instance._availability_previous = set()
+
+
+@receiver(post_delete, sender=Appointment)
+def update_availability_on_delete(sender, instance, **kwargs):
+    availability.refresh_days(availability.appointment_days(instance.personnel_id, instance.start_time, instance.end_time))
+
+
+@receiver(post_save, sender=Customer)
+def update_customer_search_keys(sender, instance, **kwargs):
+    customer_search.update_customer_keys(instance)
+
+
+@receiver(post_save, sender=PaymentMethod)
+@receiver(post_delete, sender=PaymentMethod)
+@receiver(post_save, sender=Bank)
+@receiver(post_delete, sender=Bank)
+@receiver(post_save, sender=PayType)
+@receiver(post_delete, sender=PayType)
+@receiver(post_save, sender=ReceiptType)
+@receiver(post_delete, sender=ReceiptType)
+@receiver(post_save, sender=Work)
+@receiver(post_delete, sender=Work)
+@receiver(post_save, sender=Personnel)
+@receiver(post_delete, sender=Personnel)
+@receiver(post_save, sender=PersonnelCommission)
+@receiver(post_delete, sender=PersonnelCommission)
+def invalidate_reference_data(sender, **kwargs):
+    refdata.invalidate_reference_data()
+    # مثل ایندکس کمیسیون: نسخه‌ای که پیش از commit ساخته شده دوباره بارگذاری شود
+    transaction.on_commit(refdata.invalidate_reference_data)
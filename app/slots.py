@@ -0,0 +1,118 @@
+from collections import defaultdict
+from functools import partial
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from app.models import Appointment
+
+# ساعات کاری هر روز هفته (weekday پایتون: دوشنبه=0 ... یکشنبه=6)؛ کلید default برای بقیه روزها
+# مثال در settings: BOOKING_WORKING_HOURS = {"default": [("09:00", "21:00")], 4: []}
+DEFAULT_WORKING_HOURS = {"default": [("09:00", "21:00")]}
+WORKING_HOURS = getattr(settings, "BOOKING_WORKING_HOURS", DEFAULT_WORKING_HOURS)
+
+# فاصله شروع نوبت‌های پیشنهادی و مدت پیش‌فرض خدمت (دقیقه)
+SLOT_STEP_MINUTES = getattr(settings, "BOOKING_SLOT_STEP_MINUTES", 15)
+DEFAULT_DURATION_MINUTES = getattr(settings, "BOOKING_DEFAULT_DURATION_MINUTES", 60)
+
+
+def _localize(day, value):
+    moment = datetime.combine(day, value)
+    return timezone.make_aware(moment) if settings.USE_TZ else moment
+
+
+def working_intervals(day, hours=None):
+    hours = hours or WORKING_HOURS
+    ranges = hours.get(day.weekday(), hours.get("default", []))
+    return [
+        (_localize(day, time.fromisoformat(start)), _localize(day, time.fromisoformat(end)))
+        for start, end in ranges
+    ]
+
+
+def merge_intervals(intervals):
+    """ادغام بازه‌های مرتب‌شده بر اساس شروع که هم‌پوشانی یا تماس دارند"""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def busy_intervals(personnel_ids, start, end):
+    """رزروهای همه پرسنل در بازه با یک کوئری، ادغام‌شده برای هر پرسنل"""
+    rows = (
+        Appointment.objects.filter(personnel_id__in=personnel_ids, start_time__lt=end, end_time__gt=start)
+        .order_by("personnel_id", "start_time")
+        .values_list("personnel_id", "start_time", "end_time")
+    )
+    grouped = defaultdict(list)
+    for personnel_id, start_time, end_time in rows:
+        grouped[personnel_id].append((start_time, end_time))
+    return {personnel_id: merge_intervals(intervals) for personnel_id, intervals in grouped.items()}
+
+
+def _free_starts(open_start, open_end, busy, position, duration, step, not_before, align):
+    """
+    شروع‌های آزاد یک بازه کاری؛ busy از position به بعد پیمایش می‌شود و
+    موقعیت جدید برای بازه بعدی برگردانده می‌شود (پیمایش خطی).
+    """
+    starts = []
+    cursor = max(open_start, not_before) if not_before else open_start
+    while position < len(busy) and busy[position][1] <= cursor:
+        position += 1
+
+    scan = position
+    while cursor + duration <= open_end:
+        if scan < len(busy) and busy[scan][0] < cursor + duration:
+            # تداخل با رزرو: از پایان آن (روی مضرب step) ادامه می‌دهیم
+            cursor = max(cursor, align(busy[scan][1]))
+            scan += 1
+            continue
+        starts.append(cursor)
+        cursor += step
+    return starts, position
+
+
+def _align(moment, day_start_moment, step):
+    # شروع نوبت‌ها روی مضرب step از ابتدای روز قرار بگیرد
+    offset = (moment - day_start_moment) % step
+    return moment if not offset else moment + (step - offset)
+
+
+def free_slots(personnel_ids, days, duration_minutes=None, step_minutes=None, now=None):
+    """
+    نوبت‌های آزاد چند پرسنل در چند روز با یک کوئری.
+    خروجی: {personnel_id: {day: [datetime شروع، ...]}}
+    """
+    duration = timedelta(minutes=duration_minutes or DEFAULT_DURATION_MINUTES)
+    step = timedelta(minutes=step_minutes or SLOT_STEP_MINUTES)
+    days = sorted(set(days))
+    if not days or not personnel_ids:
+        return {}
+
+    window_start = _localize(days[0], time.min)
+    window_end = _localize(days[-1] + timedelta(days=1), time.min)
+    busy_by_personnel = busy_intervals(personnel_ids, window_start, window_end)
+
+    result = {}
+    for personnel_id in personnel_ids:
+        busy = busy_by_personnel.get(personnel_id, [])
+        position = 0
+        by_day = {}
+        for day in days:
+            align = partial(_align, day_start_moment=_localize(day, time.min), step=step)
+            slots = []
+            for open_start, open_end in working_intervals(day):
+                not_before = align(now) if now and now > open_start else None
+                starts, position = _free_starts(
+                    align(open_start), open_end, busy, position, duration, step, not_before, align,
+                )
+                slots.extend(starts)
+            by_day[day] = slots
+        result[personnel_id] = by_day
+    return result
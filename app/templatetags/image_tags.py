@@ -0,0 +1,22 @@
+from django import template
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def sale_picture(image, css="", style="", sizes="(max-width: 768px) 50vw, 320px", alt=""):
+    """
+    تصویر فاکتور با <picture>: مرورگر نسخه WebP یا JPEG مناسب اندازه را از srcset انتخاب می‌کند.
+    برای تصاویری که هنوز نسخه ندارند، همان فایل اصلی نمایش داده می‌شود.
+    """
+    webp = image.srcset("webp")
+    jpeg = image.srcset("jpeg")
+    if not webp:
+        return format_html('<img src="{}" class="{}" style="{}" alt="{}" data-full="{}" loading="lazy">',
+                           image.image.url, css, style, alt, image.image.url)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" style="{}" alt="{}" data-full="{}" loading="lazy"></picture>',
+        webp, sizes, image.image.url, jpeg, sizes, css, style, alt, image.image.url,
+    )
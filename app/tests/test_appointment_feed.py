@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Appointment, Customer, Personnel, Work
+
+
+class AppointmentFeedTest(TestCase):
+    def setUp(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        self.personnel = Personnel.objects.create(fname="پرسنل", lname="تست", mobile="09122222222")
+        self.customer = Customer.objects.create(fname="سارا", lname="محمدی", mobile="09121111111")
+        self.work = Work.objects.create(work_name="خدمت تست")
+        self.week_start = timezone.make_aware(timezone.datetime(2025, 5, 3))
+        for day in range(-7, 14):
+            start = self.week_start + timedelta(days=day, hours=10)
+            Appointment.objects.create(
+                customer=self.customer, work=self.work, personnel=self.personnel,
+                start_time=start, end_time=start + timedelta(hours=1),
+            )
+        self.params = {
+            "personnel_id": self.personnel.id,
+            "start": self.week_start.isoformat(),
+            "end": (self.week_start + timedelta(days=7)).isoformat(),
+        }
+
+    def test_window_and_shape(self):
+        # session، کاربر، aggregate اعتبارسنجی و یک SELECT با join
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("appointment_list"), self.params)
+        data = response.json()
+        self.assertEqual(len(data), 7)
+        self.assertEqual(data[0]["title"], "سارا-محمدی - خدمت تست")
+        self.assertEqual(
+            set(data[0]),
+            {"id", "title", "start", "end", "customerId", "customerName", "workId", "personnelId", "isPaid"},
+        )
+
+    def test_customer_name_is_sent_separately(self):
+        # نام با « - » را نمی‌شود از عنوان جدا کرد
+        Customer.objects.filter(pk=self.customer.pk).update(fname="سارا - مریم")
+        data = self.client.get(reverse("appointment_list"), self.params).json()
+        self.assertEqual(data[0]["customerName"], "سارا - مریم-محمدی")
+
+    def test_unchanged_window_returns_304(self):
+        response = self.client.get(reverse("appointment_list"), self.params)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        response = self.client.get(reverse("appointment_list"), self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Appointment.objects.filter(start_time__gte=self.week_start).order_by("start_time").first().delete()
+        response = self.client.get(reverse("appointment_list"), self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 6)
+
+    def test_renamed_customer_or_work_changes_etag(self):
+        etag = self.client.get(reverse("appointment_list"), self.params)["ETag"]
+        self.customer.fname = "مریم"
+        self.customer.save()
+        response = self.client.get(reverse("appointment_list"), self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["title"], "مریم-محمدی - خدمت تست")
+
+        etag = response["ETag"]
+        self.work.work_name = "خدمت جدید"
+        self.work.save()
+        response = self.client.get(reverse("appointment_list"), self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["title"], "مریم-محمدی - خدمت جدید")
@@ -0,0 +1,88 @@
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.availability import day_mask, free_personnel, from_bytes, rebuild_availability
+from app.models import Appointment, Customer, Personnel, PersonnelDayAvailability, Work
+
+
+def at(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class AvailabilityBitmapTest(TestCase):
+    def setUp(self):
+        self.day = date(2025, 5, 4)
+        self.first = Personnel.objects.create(fname="پرسنل", lname="اول", mobile="09122222222")
+        self.second = Personnel.objects.create(fname="پرسنل", lname="دوم", mobile="09123333333")
+        self.customer = Customer.objects.create(fname="سارا", lname="محمدی", mobile="09121111111")
+        self.work = Work.objects.create(work_name="خدمت نقشه")
+        # پرسنل پیش‌فرض داده اولیه در این آزمون‌ها دخالت نکند
+        Personnel.objects.exclude(id__in=[self.first.id, self.second.id]).update(is_active=False)
+
+    def book(self, personnel, start, end):
+        return Appointment.objects.create(
+            customer=self.customer, work=self.work, personnel=personnel, start_time=start, end_time=end,
+        )
+
+    def bitmap(self, personnel, day=None):
+        row = PersonnelDayAvailability.objects.filter(personnel=personnel, day=day or self.day).first()
+        return from_bytes(row.busy) if row else 0
+
+    def test_day_mask_rounds_to_slots(self):
+        mask = day_mask(self.day, at(self.day, 0, 7), at(self.day, 0, 21))
+        # ۰۰:۰۵ تا ۰۰:۲۵ = بیت‌های ۱ تا ۴
+        self.assertEqual(mask, 0b11110)
+
+    def test_bitmap_follows_create_update_delete(self):
+        appointment = self.book(self.first, at(self.day, 17), at(self.day, 18))
+        self.assertEqual(self.bitmap(self.first), day_mask(self.day, at(self.day, 17), at(self.day, 18)))
+
+        next_day = self.day + timedelta(days=1)
+        appointment.start_time = at(next_day, 10)
+        appointment.end_time = at(next_day, 11)
+        appointment.save()
+        self.assertEqual(self.bitmap(self.first), 0)
+        self.assertEqual(self.bitmap(self.first, next_day), day_mask(next_day, at(next_day, 10), at(next_day, 11)))
+
+        appointment.delete()
+        self.assertFalse(PersonnelDayAvailability.objects.filter(personnel=self.first).exists())
+
+    def test_who_is_free(self):
+        self.book(self.first, at(self.day, 18), at(self.day, 19))
+
+        with self.assertNumQueries(2):
+            free = free_personnel(at(self.day, 17, 30), 90)
+        self.assertEqual(free, [self.second.id])
+
+        self.assertEqual(free_personnel(at(self.day, 16), 90), [self.first.id, self.second.id])
+        # خارج از ساعات کاری
+        self.assertEqual(free_personnel(at(self.day, 20, 30), 60), [])
+
+    def test_rebuild_matches_signals(self):
+        self.book(self.first, at(self.day, 9), at(self.day, 10))
+        self.book(self.second, at(self.day, 11), at(self.day, 12, 30))
+        before = {(row.personnel_id, row.day): bytes(row.busy) for row in PersonnelDayAvailability.objects.all()}
+
+        self.assertEqual(rebuild_availability(), 2)
+        after = {(row.personnel_id, row.day): bytes(row.busy) for row in PersonnelDayAvailability.objects.all()}
+        self.assertEqual(before, after)
+
+
+class FreePersonnelViewTest(TestCase):
+    def setUp(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        Personnel.objects.update(is_active=False)
+        self.personnel = Personnel.objects.create(fname="پرسنل", lname="آزاد", mobile="09122222222")
+
+    def test_response(self):
+        start = at(date(2025, 5, 4), 17, 30)
+        response = self.client.get(reverse("free_personnel"), {"start": start.isoformat(), "duration": 90})
+        self.assertEqual(response.json()["personnel"], [{"id": self.personnel.id, "name": "پرسنل آزاد"}])
+
+        response = self.client.get(reverse("free_personnel"), {"start": "x"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,42 @@
+from datetime import datetime, time, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from app.booking import BookingConflict, save_appointment
+from app.models import Appointment, Customer, Personnel, Work
+
+
+def at(hour, minute=0):
+    day = timezone.localdate() + timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class SaveAppointmentTest(TestCase):
+    def setUp(self):
+        self.personnel = Personnel.objects.create(fname="پرسنل", lname="قفل", mobile="09122222222")
+        self.other = Personnel.objects.create(fname="پرسنل", lname="دیگر", mobile="09123333333")
+        self.customer = Customer.objects.create(fname="سارا", lname="محمدی", mobile="09121111111")
+        self.work = Work.objects.create(work_name="خدمت قفل")
+
+    def appointment(self, personnel, start, end):
+        return Appointment(customer=self.customer, work=self.work, personnel=personnel, start_time=start, end_time=end)
+
+    def test_conflict_is_rejected(self):
+        save_appointment(self.appointment(self.personnel, at(10), at(11)))
+        with self.assertRaises(BookingConflict):
+            save_appointment(self.appointment(self.personnel, at(10, 30), at(11, 30)))
+        save_appointment(self.appointment(self.other, at(10, 30), at(11, 30)))
+        self.assertEqual(Appointment.objects.count(), 2)
+
+    def test_update_ignores_itself(self):
+        appointment = save_appointment(self.appointment(self.personnel, at(10), at(11)))
+        appointment.end_time = at(11, 30)
+        save_appointment(appointment)
+        self.assertEqual(Appointment.objects.get().end_time, at(11, 30))
+
+    def test_unknown_personnel(self):
+        appointment = self.appointment(self.personnel, at(10), at(11))
+        appointment.personnel_id = 0
+        with self.assertRaises(Personnel.DoesNotExist):
+            save_appointment(appointment)
@@ -7,8 +7,9 @@ from django.utils import timezone
 class BookingURLsTest(TestCase):
     def setUp(self):
         self.client = Client()
+        self.client.force_login(User.objects.create_user("booking_user", password="pass"))
 
-        self.customer = Customer.objects.create(name="مشتری تست", mobile="09123456789")
+        self.customer = Customer.objects.create(fname="مشتری", lname="تست", mobile="09123456789")
         self.user = self.personnel = Personnel.objects.create(
             fname="مشتری تست",
             lname="مشتری تست",
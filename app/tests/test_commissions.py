@@ -0,0 +1,158 @@
+import time
+from datetime import date, datetime
+from unittest import mock
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.commissions import CommissionIndex, recalculate_commissions
+from app.models import Customer, Personnel, PersonnelCommission, Sale, Work
+from app.refdata import REFDATA_CHECK_INTERVAL, REFDATA_VERSION_KEY
+
+
+class CommissionIndexTest(TestCase):
+    def setUp(self):
+        self.personnel = Personnel.objects.create(fname="پرسنل", lname="تست", mobile="09120000000")
+        self.work = Work.objects.create(work_name="خدمت تست")
+        self.customer = Customer.objects.create(fname="مشتری", lname="تست", mobile="09130000000")
+        PersonnelCommission.objects.create(
+            personnel=self.personnel, work=self.work, percentage=40,
+            start_date=date(2025, 1, 1), end_date=date(2025, 6, 30),
+        )
+        PersonnelCommission.objects.create(
+            personnel=self.personnel, work=self.work, percentage=50,
+            start_date=date(2025, 7, 1), end_date=date(2025, 12, 31),
+        )
+
+    def test_lookup_intervals(self):
+        index = CommissionIndex.load()
+        key = (self.personnel.id, self.work.id)
+        self.assertEqual(index.lookup(*key, date(2025, 1, 1)), 40)
+        self.assertEqual(index.lookup(*key, date(2025, 6, 30)), 40)
+        self.assertEqual(index.lookup(*key, date(2025, 7, 1)), 50)
+        self.assertIsNone(index.lookup(*key, date(2024, 12, 31)))
+        self.assertIsNone(index.lookup(*key, date(2026, 1, 1)))
+
+    def test_long_overlapping_interval_is_found(self):
+        # بازه طولانی قدیمی‌تر که بازه‌های بعدی داخل آن افتاده‌اند
+        PersonnelCommission.objects.all().delete()
+        PersonnelCommission.objects.create(
+            personnel=self.personnel, work=self.work, percentage=30,
+            start_date=date(2024, 1, 1), end_date=date(2030, 1, 1),
+        )
+        PersonnelCommission.objects.create(
+            personnel=self.personnel, work=self.work, percentage=70,
+            start_date=date(2025, 3, 1), end_date=date(2025, 3, 31),
+        )
+        index = CommissionIndex.load()
+        self.assertEqual(index.lookup(self.personnel.id, self.work.id, date(2025, 5, 1)), 30)
+
+    def test_save_uses_index_and_signals_invalidate(self):
+        sale = Sale.objects.create(
+            customer=self.customer, personnel=self.personnel, work=self.work,
+            price=1000, date=timezone.make_aware(datetime(2025, 8, 1, 10, 0)),
+        )
+        self.assertEqual((sale.commission_percentage, sale.commission_amount), (50, 500))
+
+        PersonnelCommission.objects.filter(percentage=50).get().delete()
+        with self.assertNumQueries(2):
+            # ساخت دوباره ایندکس و INSERT
+            sale = Sale.objects.create(
+                customer=self.customer, personnel=self.personnel, work=self.work,
+                price=1000, date=timezone.make_aware(datetime(2025, 8, 2, 10, 0)),
+            )
+        self.assertEqual((sale.commission_percentage, sale.commission_amount), (0, 0))
+
+        with self.assertNumQueries(1):
+            Sale.objects.create(
+                customer=self.customer, personnel=self.personnel, work=self.work,
+                price=1000, date=timezone.make_aware(datetime(2025, 8, 3, 10, 0)),
+            )
+
+    def test_bulk_create_with_commission(self):
+        sales = [
+            Sale(customer=self.customer, personnel=self.personnel, work=self.work,
+                 price=999, date=timezone.make_aware(datetime(2025, month, 15, 12, 0)))
+            for month in range(1, 13)
+        ]
+        with self.assertNumQueries(4):
+            # کوئری کمیسیون و یک INSERT چندردیفی داخل savepoint
+            Sale.objects.bulk_create_with_commission(sales, batch_size=500)
+        amounts = sorted(Sale.objects.values_list("commission_percentage", "commission_amount"))
+        self.assertEqual(amounts, [(40, 399)] * 6 + [(50, 499)] * 6)
+
+    def test_changes_from_other_processes_are_seen(self):
+        Sale.objects.create(
+            customer=self.customer, personnel=self.personnel, work=self.work,
+            price=1000, date=timezone.make_aware(datetime(2025, 8, 1, 10, 0)),
+        )
+        # ویرایش در پروسس دیگر: سیگنال آنجا اجرا شده و فقط ردیف دیتابیس و نسخه کش مشترک عوض شده‌اند
+        PersonnelCommission.objects.filter(percentage=50).update(percentage=70)
+        cache.incr(REFDATA_VERSION_KEY)
+        later = time.monotonic() + REFDATA_CHECK_INTERVAL
+        with mock.patch("app.refdata.time.monotonic", return_value=later):
+            sale = Sale.objects.create(
+                customer=self.customer, personnel=self.personnel, work=self.work,
+                price=1000, date=timezone.make_aware(datetime(2025, 8, 2, 10, 0)),
+            )
+        self.assertEqual((sale.commission_percentage, sale.commission_amount), (70, 700))
+
+
+class CommissionRecalculationTest(TestCase):
+    def setUp(self):
+        self.personnel = Personnel.objects.create(fname="پرسنل", lname="تست", mobile="09120000000")
+        self.work = Work.objects.create(work_name="خدمت تست")
+        self.customer = Customer.objects.create(fname="مشتری", lname="تست", mobile="09130000000")
+        self.commission = PersonnelCommission.objects.create(
+            personnel=self.personnel, work=self.work, percentage=40,
+            start_date=date(2025, 1, 1), end_date=date(2025, 12, 31),
+        )
+        for day in range(1, 11):
+            Sale.objects.create(
+                customer=self.customer, personnel=self.personnel, work=self.work,
+                price=999, date=timezone.make_aware(datetime(2025, 3, day, 10, 0)),
+            )
+
+    def test_dry_run_then_apply(self):
+        self.commission.percentage = 50
+        self.commission.save()
+
+        result = recalculate_commissions(personnel_id=self.personnel.id, chunk_size=3)
+        self.assertEqual((result.matched, result.changed), (10, 10))
+        self.assertEqual((result.old_total, result.new_total), (3990, 4990))
+        self.assertFalse(Sale.objects.filter(commission_percentage=50).exists())
+
+        result = recalculate_commissions(
+            personnel_id=self.personnel.id, start_date=date(2025, 3, 6), dry_run=False, chunk_size=3,
+        )
+        self.assertEqual(result.changed, 5)
+        self.assertEqual(
+            sorted(Sale.objects.values_list("commission_percentage", "commission_amount")),
+            [(40, 399)] * 5 + [(50, 499)] * 5,
+        )
+        self.assertEqual(recalculate_commissions(personnel_id=self.personnel.id, start_date=date(2025, 3, 6)).changed, 0)
+
+    def test_sales_without_commission_drop_to_zero(self):
+        self.commission.delete()
+        result = recalculate_commissions(dry_run=False)
+        self.assertEqual(result.changed, 10)
+        self.assertFalse(Sale.objects.exclude(commission_percentage=0, commission_amount=0).exists())
+
+    def test_admin_action_shows_diff_before_apply(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        self.commission.percentage = 50
+        self.commission.save()
+        url = reverse("admin:app_personnelcommission_changelist")
+        data = {"action": "recalculate_sales", ACTION_CHECKBOX_NAME: [self.commission.pk]}
+
+        response = self.client.post(url, data)
+        self.assertContains(response, "10 از 10 فروش")
+        self.assertFalse(Sale.objects.filter(commission_percentage=50).exists())
+
+        self.client.post(url, {**data, "apply": "1"})
+        self.assertEqual(Sale.objects.filter(commission_percentage=50, commission_amount=499).count(), 10)
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Customer, Personnel, Sale, Work
+
+
+class CustomerListTest(TestCase):
+    def setUp(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        Customer.objects.bulk_create([
+            Customer(fname=f"مشتری{index}", lname="لیست", mobile=f"0912{index:07d}") for index in range(70)
+        ])
+        self.customer = Customer.objects.order_by("id").first()
+        personnel = Personnel.objects.create(fname="پرسنل", lname="تست", mobile="09122222222")
+        work = Work.objects.create(work_name="خدمت لیست")
+        self.last_visit = timezone.now() - timedelta(days=1)
+        for price, date in [(1000, self.last_visit - timedelta(days=10)), (2500, self.last_visit)]:
+            sale = Sale.objects.create(customer=self.customer, personnel=personnel, work=work, price=price)
+            Sale.objects.filter(id=sale.id).update(date=date)
+
+    def test_stats_are_annotated(self):
+        customer = Customer.objects.with_sale_stats().get(id=self.customer.id)
+        self.assertEqual(customer.sales_count, 2)
+        self.assertEqual(customer.total_spent, 3500)
+        self.assertEqual(customer.last_visit, self.last_visit)
+
+        other = Customer.objects.with_sale_stats().exclude(id=self.customer.id).first()
+        self.assertEqual((other.sales_count, other.total_spent, other.last_visit), (0, 0, None))
+
+    def test_page_queries_do_not_grow_with_rows(self):
+        # session، کاربر، COUNT صفحه‌بندی و یک SELECT با زیرکوئری‌ها
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("customers"))
+        self.assertEqual(len(response.context["customers"]), 50)
+        self.assertTrue(response.context["is_paginated"])
+
+        response = self.client.get(reverse("customers"), {"page": 2})
+        self.assertEqual(len(response.context["customers"]), Customer.objects.count() - 50)
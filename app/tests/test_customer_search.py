@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from app.customer_search import rebuild_search_keys, search_customers, search_page
+from app.normalize import name_key, normalize_mobile, normalize_text
+from app.models import Customer, CustomerSearchKey
+
+
+class CustomerSearchKeyTest(TestCase):
+    def setUp(self):
+        self.zahra = Customer.objects.create(fname="زهرا", lname="علي‌پور", mobile="۰۹۱۲۳۴۵۶۷۸۹")
+        self.kamran = Customer.objects.create(fname="كامران", lname="ملکی", mobile="09351112233")
+
+    def ids(self, query):
+        return sorted(search_customers(query).values_list("id", flat=True))
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("علي‌پور"), "علیپور")
+        self.assertEqual(normalize_text("كامران ١٢"), "کامران 12")
+        self.assertEqual(normalize_text("مُحَمَّد"), "محمد")
+        self.assertEqual(name_key("علي - رضايي"), name_key("علی  رضایی"))
+        self.assertEqual(normalize_mobile("+98 ۹۱۲ 000 1111"), "09120001111")
+
+    def test_persian_and_arabic_letters_match(self):
+        self.assertEqual(self.ids("علی"), [self.zahra.id])
+        self.assertEqual(self.ids("علیپ"), [self.zahra.id])
+        self.assertEqual(self.ids("کام"), [self.kamran.id])
+        self.assertEqual(self.ids("زهرا علی"), [self.zahra.id])
+        self.assertEqual(self.ids("زهرا ملک"), [])
+
+    def test_mobile_prefix_and_suffix(self):
+        self.assertEqual(self.ids("0912"), [self.zahra.id])
+        self.assertEqual(self.ids("۹۳۵"), [self.kamran.id])
+        self.assertEqual(self.ids("6789"), [self.zahra.id])
+        self.assertEqual(self.ids("2233"), [self.kamran.id])
+
+    def test_keys_follow_save_and_rebuild(self):
+        self.kamran.lname = "رضایی"
+        self.kamran.save()
+        self.assertEqual(self.ids("ملک"), [])
+        self.assertEqual(self.ids("رضا"), [self.kamran.id])
+
+        Customer.objects.filter(id=self.zahra.id).update(fname="مینا")
+        self.assertEqual(rebuild_search_keys(), Customer.objects.count())
+        self.assertEqual(self.ids("مینا"), [self.zahra.id])
+        self.assertFalse(CustomerSearchKey.objects.filter(key="زهرا").exists())
+
+    def test_customer_list_filter(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        response = self.client.get(reverse("customers"), {"filter": "علي"})
+        self.assertEqual(list(response.context["customers"]), [self.zahra])
+
+    def test_page_is_limited_and_sorted_by_name(self):
+        for index in range(5):
+            Customer.objects.create(fname=f"زینب {5 - index}", lname="زارع", mobile=f"0915000000{index}")
+        with self.assertNumQueries(1):
+            page = search_page("ز", 3)
+        # هر مشتری یک بار، با اینکه هم نام و هم نام خانوادگی با «ز» شروع می‌شوند
+        self.assertEqual(len({customer["id"] for customer in page}), 3)
+        self.assertEqual(page, sorted(page, key=lambda customer: (customer["fname"], customer["lname"], customer["id"])))
+        self.assertEqual(len(search_page("ز", 20)), 6)
+        self.assertEqual([customer["id"] for customer in search_page("زهرا 6789", 5)], [self.zahra.id])
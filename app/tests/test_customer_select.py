@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from app.customer_search import rebuild_search_keys
+from app.forms import CustomerForm, ReceiptForm, SaleForm
+from app.models import Customer, Personnel
+
+
+class CustomerSelectTest(TestCase):
+    def setUp(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        Personnel.objects.create(fname="پرسنل", lname="تست", mobile="09122222222")
+        Customer.objects.bulk_create([
+            Customer(fname=f"مشتری{index}", lname="انبوه", mobile=f"0912{index:07d}") for index in range(60)
+        ])
+        self.customer = Customer.objects.create(fname="سارا", lname="محمدی", mobile="09351111111")
+        rebuild_search_keys()
+
+    def test_forms_render_only_selected_customer(self):
+        for form in (SaleForm(), ReceiptForm(), CustomerForm()):
+            field = "referrer" if isinstance(form, CustomerForm) else "customer"
+            html = str(form[field])
+            self.assertIn('data-ajax-url="%s"' % reverse("customer_search"), html)
+            self.assertNotIn("انبوه", html)
+
+        html = str(SaleForm(initial={"customer": self.customer.id})["customer"])
+        self.assertEqual(html.count("<option"), 1)
+        self.assertIn(f'value="{self.customer.id}" selected', html)
+
+    def test_tampered_value_renders_as_invalid(self):
+        form = CustomerForm(data={"fname": "علی", "lname": "رضایی", "mobile": "09120000001", "referrer": "x1"})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(str(form["referrer"]).count('selected'), 0)
+
+    def test_selected_customer_still_validates(self):
+        form = CustomerForm(data={"fname": "علی", "lname": "رضایی", "mobile": "09120000001", "referrer": self.customer.id})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data["referrer"], self.customer)
+
+    def test_search_is_prefix_and_limited(self):
+        results = self.client.get(reverse("customer_search"), {"q": "مشتری"}).json()["results"]
+        self.assertEqual(len(results), 20)
+        results = self.client.get(reverse("customer_search"), {"q": "مشتری", "limit": 500}).json()["results"]
+        self.assertEqual(len(results), 50)
+        # پیشوندی: وسط نام تطبیق نمی‌خورد
+        self.assertEqual(self.client.get(reverse("customer_search"), {"q": "تری"}).json()["results"], [])
+        results = self.client.get(reverse("customer_search"), {"q": "935"}).json()["results"]
+        self.assertEqual([r["id"] for r in results], [self.customer.id])
+
+    def test_calendar_does_not_render_customers(self):
+        response = self.client.get(reverse("booking_calendar"))
+        self.assertNotContains(response, "انبوه")
+        self.assertNotIn("customer_list", response.context)
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+import jdatetime
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Customer, Personnel, Sale, Work
+
+
+class DailySalesChartTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(fname="مشتری", lname="تست", mobile="09120000001")
+        self.personnel = Personnel.objects.create(fname="پرسنل", lname="تست", mobile="09120000002")
+        self.work = Work.objects.create(work_name="خدمت تست")
+        self.client.force_login(User.objects.create_superuser(username="sales_admin", password="pass"))
+
+    def add_sale(self, when, price):
+        sale = Sale.objects.create(customer=self.customer, personnel=self.personnel, work=self.work, price=price, date=when)
+        Sale.objects.filter(pk=sale.pk).update(commission_amount=price // 2)
+
+    def test_default_window_is_gap_filled(self):
+        now = timezone.now()
+        self.add_sale(now, 1000)
+        self.add_sale(now - timedelta(days=3), 400)
+        self.add_sale(now - timedelta(days=400), 999)
+
+        response = self.client.get(reverse("home"))
+        chart = response.context["sales_chart"]
+        self.assertEqual(len(chart), 90)
+        self.assertEqual(chart[-1]["commission"], 500)
+        self.assertEqual(chart[-1]["remainder"], 500)
+        self.assertEqual(chart[-4]["commission"], 200)
+        self.assertEqual(sum(point["commission"] for point in chart), 700)
+
+    def test_jalali_month_window(self):
+        first = jdatetime.date(1403, 12, 1)
+        self.add_sale(timezone.make_aware(jdatetime.datetime(1403, 12, 10, 12).togregorian()), 800)
+
+        response = self.client.get(reverse("home"), {"sales_month": "1403-12"})
+        chart = response.context["sales_chart"]
+        self.assertEqual(chart[0]["date"], first.strftime("%Y-%m-%d"))
+        self.assertEqual(len(chart), 30)
+        self.assertEqual(sum(point["commission"] for point in chart), 400)
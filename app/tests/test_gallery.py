@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.gallery import GALLERY_PAGE_SIZE
+from app.models import Customer, Personnel, PersonnelUser, Sale, SaleImage, Work
+
+
+class GalleryPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        self.personnel = Personnel.objects.create(fname="پرسنل", lname="تست", mobile="09122222222")
+        self.customer = Customer.objects.create(fname="سارا", lname="محمدی", mobile="09121111111")
+        work = Work.objects.create(work_name="خدمت تست")
+        sale = Sale.objects.create(customer=self.customer, personnel=self.personnel, work=work, price=1000)
+
+        now = timezone.now()
+        images = [
+            SaleImage(sale=sale, image=f"sale_images/{i}.jpg", image_type=SaleImage.AFTER)
+            for i in range(GALLERY_PAGE_SIZE + 6)
+        ]
+        SaleImage.objects.bulk_create(images)
+        # چند تصویر با زمان یکسان تا ترتیب با id شکسته شود
+        for index, image in enumerate(SaleImage.objects.order_by("id")):
+            SaleImage.objects.filter(id=image.id).update(uploaded_at=now - timedelta(minutes=index // 3))
+
+    def test_pages_cover_all_images_once(self):
+        # session، کاربر، تصاویر با join، نسخه‌ها و لیست پرسنل
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("gallery"))
+        first_page = [image.id for image in response.context["images"]]
+        self.assertEqual(len(first_page), GALLERY_PAGE_SIZE)
+        self.assertTrue(response.context["next_cursor"])
+
+        data = self.client.get(reverse("gallery_images"), {"after": response.context["next_cursor"]}).json()
+        self.assertIsNone(data["next"])
+        self.assertEqual(data["html"].count('class="card"'), 6)
+
+        ordered = list(SaleImage.objects.order_by("-uploaded_at", "-id").values_list("id", flat=True))
+        self.assertEqual(first_page, ordered[:GALLERY_PAGE_SIZE])
+
+    def test_personnel_user_only_sees_own_images(self):
+        other = User.objects.create_user("staff", password="pass")
+        other_personnel = Personnel.objects.create(fname="دیگر", lname="پرسنل", mobile="09123333333")
+        PersonnelUser.objects.create(user=other, personnel=other_personnel)
+        self.client.login(username="staff", password="pass")
+        response = self.client.get(reverse("gallery"))
+        self.assertEqual(list(response.context["images"]), [])
+
+    def test_customer_search(self):
+        Customer.objects.create(fname="مریم", lname="احمدی", mobile="09351234567")
+        results = self.client.get(reverse("customer_search"), {"q": "سارا"}).json()["results"]
+        self.assertEqual([r["id"] for r in results], [self.customer.id])
+        results = self.client.get(reverse("customer_search"), {"q": "۰۹۳۵۱"}).json()["results"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(self.client.get(reverse("customer_search")).json()["results"], [])
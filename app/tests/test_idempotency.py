@@ -0,0 +1,142 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app import idempotency
+from app.middleware import IdempotencyMiddleware
+from app.models import IdempotencyKey, Work
+
+
+class IdempotencyMiddlewareTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("idem_admin", "admin@example.com", "pass")
+        self.client.force_login(self.admin)
+        self.url = reverse("new_work")
+
+    def test_same_key_replays_first_response(self):
+        first = self.client.post(self.url, {"work_name": "خدمت idem"}, HTTP_IDEMPOTENCY_KEY="k1")
+        second = self.client.post(self.url, {"work_name": "خدمت idem"}, HTTP_IDEMPOTENCY_KEY="k1")
+
+        self.assertEqual(Work.objects.filter(work_name="خدمت idem").count(), 1)
+        self.assertEqual((second.status_code, second["Location"]), (first.status_code, first["Location"]))
+        self.assertEqual(second[idempotency.REPLAYED_HEADER], "true")
+        self.assertNotIn(idempotency.REPLAYED_HEADER, first)
+
+        self.client.post(self.url, {"work_name": "خدمت idem"}, HTTP_IDEMPOTENCY_KEY="k2")
+        self.assertEqual(Work.objects.filter(work_name="خدمت idem").count(), 2)
+
+    def test_form_token_and_changed_data(self):
+        self.client.post(self.url, {"work_name": "خدمت فرم", "idempotency_key": "form-1"})
+        self.client.post(self.url, {"work_name": "خدمت فرم", "idempotency_key": "form-1"})
+        self.assertEqual(Work.objects.filter(work_name="خدمت فرم").count(), 1)
+
+        # همان فرم با داده تازه (مثلاً بعد از دکمه برگشت) درخواست جدید است
+        self.client.post(self.url, {"work_name": "خدمت فرم ۲", "idempotency_key": "form-1"})
+        self.assertTrue(Work.objects.filter(work_name="خدمت فرم ۲").exists())
+
+    def test_without_key_identical_posts_inside_window_are_replayed(self):
+        self.client.post(self.url, {"work_name": "خدمت بدون کلید"})
+        response = self.client.post(self.url, {"work_name": "خدمت بدون کلید"})
+        self.assertEqual(response[idempotency.REPLAYED_HEADER], "true")
+        self.assertEqual(Work.objects.filter(work_name="خدمت بدون کلید").count(), 1)
+
+        # پایان پنجره
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.client.post(self.url, {"work_name": "خدمت بدون کلید"})
+        self.assertEqual(Work.objects.filter(work_name="خدمت بدون کلید").count(), 2)
+
+    def test_keys_are_scoped_per_user(self):
+        self.client.post(self.url, {"work_name": "خدمت کاربر"}, HTTP_IDEMPOTENCY_KEY="shared")
+        other = User.objects.create_superuser("idem_other", "other@example.com", "pass")
+        self.client.force_login(other)
+        response = self.client.post(self.url, {"work_name": "خدمت کاربر"}, HTTP_IDEMPOTENCY_KEY="shared")
+
+        self.assertNotIn(idempotency.REPLAYED_HEADER, response)
+        self.assertEqual(Work.objects.filter(work_name="خدمت کاربر").count(), 2)
+
+    def test_post_does_not_write_session(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, {"work_name": "خدمت session"}, HTTP_IDEMPOTENCY_KEY="s1")
+            self.client.post(self.url, {"work_name": "خدمت session"}, HTTP_IDEMPOTENCY_KEY="s1")
+        writes = [
+            query["sql"] for query in queries.captured_queries
+            if "django_session" in query["sql"] and not query["sql"].lstrip().upper().startswith("SELECT")
+        ]
+        self.assertEqual(writes, [])
+
+    def test_post_writes_one_claim_and_one_response(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, {"work_name": "خدمت جدول"}, HTTP_IDEMPOTENCY_KEY="t1")
+        writes = [
+            query["sql"].split()[0].upper() for query in queries.captured_queries
+            if "app_idempotencykey" in query["sql"] and not query["sql"].lstrip().upper().startswith("SELECT")
+        ]
+        self.assertEqual(writes, ["INSERT", "UPDATE"])
+
+
+class IdempotencyFailureTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.calls = 0
+
+    def request(self):
+        request = self.factory.post("/pay/new/", {"amount": "1000"}, HTTP_IDEMPOTENCY_KEY="fail")
+        request.user = AnonymousUser()
+        return request
+
+    def view(self, status):
+        def get_response(request):
+            self.calls += 1
+            return HttpResponse(status=status)
+        return IdempotencyMiddleware(get_response)
+
+    def test_server_errors_are_not_stored(self):
+        self.view(500)(self.request())
+        response = self.view(201)(self.request())
+        self.assertEqual((self.calls, response.status_code), (2, 201))
+
+        response = self.view(201)(self.request())
+        self.assertEqual((self.calls, response[idempotency.REPLAYED_HEADER]), (2, "true"))
+
+    def test_in_flight_duplicate_gets_conflict(self):
+        request = self.request()
+        key = idempotency.request_key(request, "fail")
+        self.assertTrue(idempotency.claim(key))
+        with mock.patch.object(idempotency, "IDEMPOTENCY_WAIT", 0):
+            response = self.view(201)(self.request())
+        self.assertEqual((self.calls, response.status_code), (0, 409))
+
+    def test_waiting_duplicate_backs_off(self):
+        key = idempotency.request_key(self.request(), "fail")
+        self.assertTrue(idempotency.claim(key))
+        clock, delays = [0.0], []
+
+        def sleep(seconds):
+            delays.append(seconds)
+            clock[0] += seconds
+
+        with mock.patch.object(idempotency.time, "monotonic", lambda: clock[0]), \
+                mock.patch.object(idempotency.time, "sleep", sleep):
+            self.assertEqual(idempotency.wait_for_response(key, timeout=5), idempotency.PENDING)
+        self.assertEqual(delays, [0.25, 0.5, 1.0, 2.0, 1.25])
+
+    def test_expired_rows_are_reclaimed_and_purged(self):
+        key = idempotency.request_key(self.request(), "fail")
+        self.assertTrue(idempotency.claim(key))
+        self.assertFalse(idempotency.claim(key))
+
+        # درخواست اولی که هرگز تمام نشد، پس از IDEMPOTENCY_LOCK_TIMEOUT کنار می‌رود
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.assertTrue(idempotency.claim(key))
+
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        call_command("purge_idempotency_keys", stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
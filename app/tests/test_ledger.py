@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from app.ledger import decode_cursor, encode_cursor, ledger_page
+from app.models import Bank, Pay, PaymentMethod, PayType, Receipt, ReceiptType
+
+
+class LedgerPageTest(TestCase):
+    def setUp(self):
+        self.method = PaymentMethod.objects.create(name="بانکی تست", requires_bank=True)
+        self.bank = Bank.objects.create(name="بانک تست")
+        pay_type = PayType.objects.create(name="هزینه تست")
+        receipt_type = ReceiptType.objects.create(name="سایر تست")
+        self.start = date(2025, 3, 1)
+        # مانده اولیه ۵۰۰ واقعاً در دیتابیس است؛ صفحات بعد مانده را از دیتابیس می‌خوانند
+        Receipt.objects.create(
+            source_type=self.method, bank=self.bank, amount=500,
+            date=self.start - timedelta(days=1), receipt_type=receipt_type,
+        )
+
+        for i in range(40):
+            day = self.start + timedelta(days=i % 7)
+            Receipt.objects.create(
+                source_type=self.method, bank=self.bank, amount=1000 + i,
+                date=day, receipt_type=receipt_type,
+            )
+            Pay.objects.create(
+                source_type=self.method, bank=self.bank, amount=100 + i,
+                date=day, pay_type=pay_type,
+            )
+
+    def expected_rows(self):
+        rows = [(p.date, p.id, "pay", -p.amount) for p in Pay.objects.all()]
+        rows += [(r.date, r.id, "receipt", r.amount) for r in Receipt.objects.filter(date__gte=self.start)]
+        rows.sort()
+        balance = Decimal(500)
+        expected = []
+        for day, pk, kind, amount in rows:
+            balance += amount
+            expected.append((day, pk, kind, balance))
+        return expected
+
+    def test_keyset_pages_match_full_ledger(self):
+        end = self.start + timedelta(days=10)
+        seen = []
+        rows, cursor = ledger_page(self.start, end, bank_id=self.bank.id, opening=500, limit=15)
+        seen += rows
+        while cursor is not None:
+            rows, cursor = ledger_page(self.start, end, bank_id=self.bank.id, after=cursor, limit=15)
+            self.assertLessEqual(len(rows), 15)
+            seen += rows
+
+        self.assertEqual(
+            [(row["date"], row["id"], row["kind"], row["balance"]) for row in seen],
+            self.expected_rows(),
+        )
+
+    def test_cursor_balance_is_computed_server_side(self):
+        end = self.start + timedelta(days=10)
+        rows, cursor = ledger_page(self.start, end, bank_id=self.bank.id, opening=500, limit=15)
+        self.assertEqual(decode_cursor(encode_cursor(cursor)), cursor)
+        # مانده دستکاری‌شده در آدرس پذیرفته نمی‌شود
+        self.assertIsNone(decode_cursor(encode_cursor(cursor) + "_999999"))
+
+        # ویرایش ردیفی قبل از کرسر بین دو صفحه در مانده صفحه بعد دیده می‌شود
+        first = Pay.objects.get(pk=rows[0]["id"]) if rows[0]["kind"] == "pay" else Receipt.objects.get(pk=rows[0]["id"])
+        first.amount += 7 if rows[0]["kind"] == "receipt" else -7
+        first.save()
+        next_rows, _ = ledger_page(self.start, end, bank_id=self.bank.id, after=cursor, limit=15)
+        expected = {(day, pk, kind): balance for day, pk, kind, balance in self.expected_rows()}
+        row = next_rows[0]
+        self.assertEqual(row["balance"], expected[(row["date"], row["id"], row["kind"])])
+        self.assertEqual(row["balance"] - rows[-1]["balance"], row["signed_amount"] + 7)
+
+    def test_report_view_paginates(self):
+        user = User.objects.create_superuser(username="ledger_admin", password="pass")
+        self.client.force_login(user)
+        response = self.client.get(reverse("ledger_report"), {
+            "start_date": "2025-03-01",
+            "end_date": "2025-03-31",
+            "bank": self.bank.id,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["transactions"]), 50)
+        self.assertIsNotNone(response.context["next_page_query"])
+        self.assertEqual(response.context["increase_count"], 40)
+        self.assertEqual(response.context["decrease_count"], 40)
@@ -0,0 +1,33 @@
+import logging
+import queue
+
+from django.test import TestCase
+
+from app.log_utils import LazyQueueHandler, lazy
+from app.models import Customer
+
+
+class LazyLogTest(TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("app.tests.lazy")
+        self.records = queue.SimpleQueue()
+        self.handler = LazyQueueHandler(self.records)
+        self.logger.addHandler(self.handler)
+        self.logger.propagate = False
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def test_disabled_level_runs_no_query(self):
+        self.logger.setLevel(logging.ERROR)
+        with self.assertNumQueries(0):
+            self.logger.info("customers: %s", lazy(Customer.objects.count), extra={"count": lazy(Customer.objects.count)})
+        self.assertTrue(self.records.empty())
+
+    def test_enabled_level_resolves_in_caller_thread(self):
+        self.logger.setLevel(logging.INFO)
+        Customer.objects.create(fname="سارا", lname="محمدی", mobile="09121111111")
+        expected = Customer.objects.count()
+        with self.assertNumQueries(2):
+            self.logger.info("customers: %s", lazy(Customer.objects.count), extra={"count": lazy(Customer.objects.count)})
+        record = self.records.get_nowait()
+        self.assertEqual(record.getMessage(), f"customers: {expected}")
+        self.assertEqual(record.count, expected)
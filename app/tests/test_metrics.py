@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.template import engines
+from django.test import TestCase
+from django.urls import reverse
+
+from app import metrics
+from app.models import Customer
+
+
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        Customer.objects.create(fname="سارا", lname="محمدی", mobile="09121111111")
+
+    def test_request_is_recorded_per_view(self):
+        self.client.get(reverse("customers"))
+        self.client.get(reverse("customers"))
+
+        data = metrics.registry.summary()["customers"]
+        self.assertEqual(data["count"], 2)
+        self.assertGreater(data["quantiles"]["queries"][0.5], 0)
+        self.assertGreater(data["quantiles"]["template_time"][0.99], 0)
+        self.assertGreater(data["sum"]["size"], 0)
+        self.assertLessEqual(data["quantiles"]["db_time"][0.99], data["quantiles"]["duration"][0.99])
+
+    def test_prometheus_endpoint_is_staff_only(self):
+        self.client.get(reverse("customers"))
+        response = self.client.get(reverse("metrics"))
+        body = response.content.decode()
+        self.assertIn("# TYPE medusa_request_duration_seconds summary", body)
+        self.assertIn('medusa_request_db_queries{view="customers",quantile="0.95"}', body)
+        self.assertIn('medusa_request_duration_seconds_count{view="customers"} 1', body)
+
+        User.objects.create_user("staff", password="pass")
+        self.client.login(username="staff", password="pass")
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 302)
+
+    def test_slow_request_is_logged_with_queries(self):
+        with mock.patch.object(metrics, "SLOW_REQUEST_MS", 0), self.assertLogs("app", "WARNING") as logs:
+            self.client.get(reverse("customers"))
+        self.assertIn("Slow request GET", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+    def test_template_time_goes_to_the_current_request(self):
+        metrics.instrument_templates()
+        template = engines["django"].from_string("{{ value }}")
+        timer, token = metrics.start_request()
+        try:
+            template.render({"value": 1})
+        finally:
+            metrics.finish_request(token)
+        recorded = timer.template_time
+        self.assertGreater(recorded, 0)
+
+        # بعد از پایان درخواست چیزی به آن اضافه نمی‌شود
+        template.render({"value": 2})
+        self.assertEqual(timer.template_time, recorded)
+
+    def test_quantile(self):
+        values = list(range(1, 101))
+        self.assertEqual([metrics.quantile(values, q) for q in metrics.QUANTILES], [50, 95, 99])
+        self.assertEqual(metrics.quantile([], 0.5), 0)
@@ -0,0 +1,301 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app import refdata, urls
+from app.commissions import invalidate_commission_index
+from app.customer_search import rebuild_search_keys
+from app.models import (
+    Appointment, Bank, Customer, Pay, PaymentMethod, PayType, Personnel, PersonnelCommission, PersonnelUser,
+    Receipt, ReceiptType, Sale, Work,
+)
+from app.refdata import invalidate_reference_data, reference_data
+
+# (نام مسیر, آرگومان‌های مسیر, پارامترهای GET)؛ آرگومان‌ها و پارامترهای رشته‌ای از روی داده‌های ساخته‌شده پر می‌شوند
+ROUTES = [
+    ("home", {}, {}),
+    ("sales", {}, {}),
+    ("create_sale", {}, {}),
+    ("update_sale", {"pk": "sale"}, {}),
+    ("delete_sale", {"pk": "sale"}, {}),
+    ("import_sales", {}, {}),
+    ("customers", {}, {}),
+    ("new_customer", {}, {}),
+    ("update_customer", {"pk": "customer"}, {}),
+    ("delete_customer", {"pk": "customer"}, {}),
+    ("save_payments", {}, {}),
+    ("get_payment_data", {}, {}),
+    ("create_pay", {}, {}),
+    ("create_receipt", {}, {}),
+    ("ledger_report", {}, {}),
+    ("users", {}, {}),
+    ("create_user", {}, {}),
+    ("login", {}, {}),
+    ("logout", {}, {}),
+    ("password_change", {}, {}),
+    ("password_change_done", {}, {}),
+    ("booking_calendar", {}, {}),
+    ("create_appointment", {}, {}),
+    ("get_time_slots", {}, {"personnel_id": "personnel", "date": "day", "days": "7"}),
+    ("free_personnel", {}, {"start": "tomorrow"}),
+    ("metrics", {}, {}),
+    ("appointment_list", {}, {"personnel_id": "personnel"}),
+    ("update_appointment", {"pk": "appointment"}, {}),
+    ("delete_appointment", {"pk": "appointment"}, {}),
+    ("personnel_works", {}, {"personnel_id": "personnel"}),
+    ("pay_list", {}, {}),
+    ("receipt_list", {}, {}),
+    ("treasury_dashboard", {}, {}),
+    ("delete_sale_image", {}, {}),
+    ("gallery", {}, {}),
+    ("gallery_images", {}, {}),
+    ("customer_search", {}, {"q": "بودجه"}),
+    ("update_pay", {"pk": "pay"}, {}),
+    ("delete_pay", {"pk": "pay"}, {}),
+    ("update_receipt", {"pk": "receipt"}, {}),
+    ("delete_receipt", {"pk": "receipt"}, {}),
+    ("sale_images", {"sale_id": "sale"}, {}),
+    ("sale_image_status", {"sale_id": "sale"}, {}),
+    ("finance_menu", {}, {}),
+    ("settings_menu", {}, {}),
+    ("personnel_list", {}, {}),
+    ("new_personnel", {}, {}),
+    ("update_personnel", {"pk": "personnel"}, {}),
+    ("delete_personnel", {"pk": "personnel"}, {}),
+    ("works", {}, {}),
+    ("new_work", {}, {}),
+    ("update_work", {"pk": "work"}, {}),
+    ("delete_work", {"pk": "work"}, {}),
+    ("commissions", {}, {}),
+    ("new_commission", {}, {}),
+    ("update_commission", {"pk": "commission"}, {}),
+    ("delete_commission", {"pk": "commission"}, {}),
+    ("edit_user", {"user_id": "user"}, {}),
+    ("delete_user", {"user_id": "user"}, {}),
+]
+
+# سقف کوئری هر مسیر (مدیر, پرسنل)؛ session و کاربر هم شمرده می‌شوند و عدد به تعداد ردیف‌ها بستگی ندارد.
+# اگر view عوض شد و تعداد کوئری‌هایش واقعاً لازم است، سقف همین‌جا به‌روز شود.
+BUDGETS = {
+    "home": (6, 8),
+    "sales": (4, 6),
+    "create_sale": (4, 4),
+    "update_sale": (8, 8),
+    "delete_sale": (6, 6),
+    "import_sales": (2, 2),
+    "customers": (4, 4),
+    "new_customer": (2, 2),
+    "update_customer": (3, 3),
+    "delete_customer": (3, 3),
+    "save_payments": (2, 2),
+    "get_payment_data": (2, 2),
+    "create_pay": (8, 8),
+    "create_receipt": (7, 7),
+    "ledger_report": (8, 2),
+    "users": (3, 2),
+    "create_user": (3, 2),
+    "login": (2, 2),
+    "logout": (2, 2),
+    "password_change": (2, 2),
+    "password_change_done": (2, 2),
+    "booking_calendar": (3, 3),
+    "create_appointment": (2, 2),
+    "get_time_slots": (3, 3),
+    "free_personnel": (5, 5),
+    "metrics": (2, 2),
+    "appointment_list": (4, 4),
+    "update_appointment": (2, 2),
+    "delete_appointment": (2, 2),
+    "personnel_works": (2, 2),
+    "pay_list": (3, 3),
+    "receipt_list": (3, 3),
+    "treasury_dashboard": (3, 3),
+    "delete_sale_image": (2, 2),
+    "gallery": (4, 4),
+    "gallery_images": (3, 4),
+    "customer_search": (3, 3),
+    "update_pay": (9, 9),
+    "delete_pay": (9, 9),
+    "update_receipt": (9, 9),
+    "delete_receipt": (9, 9),
+    "sale_images": (6, 8),
+    "sale_image_status": (4, 5),
+    "finance_menu": (2, 2),
+    "settings_menu": (2, 2),
+    "personnel_list": (3, 3),
+    "new_personnel": (2, 2),
+    "update_personnel": (3, 2),
+    "delete_personnel": (3, 2),
+    "works": (3, 2),
+    "new_work": (2, 2),
+    "update_work": (3, 2),
+    "delete_work": (3, 2),
+    "commissions": (3, 2),
+    "new_commission": (4, 2),
+    "update_commission": (5, 2),
+    "delete_commission": (5, 2),
+    "edit_user": (3, 3),
+    "delete_user": (3, 3),
+}
+ADMIN, PERSONNEL = 0, 1
+
+
+class QueryBudgetTest(TestCase):
+    """
+    همه مسیرهای app/urls.py با داده‌هایی در حد چند صد ردیف، یک بار با مدیر و یک بار با کاربر پرسنل؛
+    تعداد کوئری هر مسیر باید زیر سقف خودش بماند و با اضافه شدن ردیف‌ها بیشتر نشود.
+    """
+
+    maxDiff = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cash = PaymentMethod.objects.create(name="نقد بودجه")
+        cls.card = PaymentMethod.objects.create(name="کارت بودجه", requires_bank=True)
+        cls.bank = Bank.objects.create(name="بانک بودجه")
+        cls.pay_type = PayType.objects.create(name="پرسنل بودجه", is_personnel=True)
+        cls.receipt_type = ReceiptType.objects.create(name="مشتری بودجه", is_customer=True)
+
+        cls.admin = User.objects.create_superuser("budget_admin", "admin@example.com", "pass")
+        cls.staff_user = User.objects.create_user("budget_personnel", password="pass")
+        cls.personnel = Personnel.objects.create(fname="پرسنل", lname="بودجه", mobile="09120000000")
+        PersonnelUser.objects.create(personnel=cls.personnel, user=cls.staff_user)
+        cls.work = Work.objects.create(work_name="خدمت بودجه")
+        cls.commission = PersonnelCommission.objects.create(personnel=cls.personnel, work=cls.work, percentage=40)
+        cls.objects = cls.seed(0)
+
+    @classmethod
+    def seed(cls, batch, customers=200, sales=300, entries=100, appointments=150):
+        """یک دسته داده: چند پرسنل و خدمت تازه، مشتری، فروش هفته اخیر، پرداخت، دریافت و رزرو"""
+        now = timezone.now()
+        today = timezone.localdate()
+        staff = [cls.personnel] + [
+            Personnel.objects.create(fname=f"پرسنل{batch}", lname=str(index), mobile="09120000000")
+            for index in range(3)
+        ]
+        works = [cls.work] + [Work.objects.create(work_name=f"خدمت بودجه {batch}-{index}") for index in range(3)]
+        for person in staff[1:]:
+            for work in works:
+                PersonnelCommission.objects.create(personnel=person, work=work, percentage=50)
+
+        first = Customer.objects.bulk_create([
+            Customer(fname=f"بودجه{batch}x{index}", lname="مشتری", mobile=f"0935{batch:02d}{index:05d}")
+            for index in range(customers)
+        ])
+        rebuild_search_keys()
+        Sale.objects.bulk_create_with_commission(
+            Sale(
+                customer=first[index % customers], personnel=staff[index % len(staff)], work=works[index % len(works)],
+                price=100000 + index, date=now - timedelta(hours=index % 24, days=index % 7),
+            )
+            for index in range(sales)
+        )
+        for index in range(entries):
+            day = today - timedelta(days=index % 7)
+            Pay.objects.create(
+                source_type=cls.card, bank=cls.bank, amount=1000 + index, date=day,
+                pay_type=cls.pay_type, personnel=staff[index % len(staff)],
+            )
+            Receipt.objects.create(
+                source_type=cls.cash, amount=2000 + index, date=day,
+                receipt_type=cls.receipt_type, customer=first[index % customers],
+            )
+
+        start = timezone.make_aware(datetime.combine(today + timedelta(days=1), datetime.min.time()))
+        Appointment.objects.bulk_create([
+            Appointment(
+                customer=first[index % customers], work=works[index % len(works)], personnel=staff[index % len(staff)],
+                start_time=start + timedelta(days=index // 40, hours=index % 10),
+                end_time=start + timedelta(days=index // 40, hours=index % 10, minutes=45),
+            )
+            for index in range(appointments)
+        ])
+
+        return {
+            "sale": Sale.objects.order_by("id").first().id,
+            "customer": first[0].id,
+            "pay": Pay.objects.order_by("id").first().id,
+            "receipt": Receipt.objects.order_by("id").first().id,
+            "appointment": Appointment.objects.order_by("id").first().id,
+            "personnel": cls.personnel.id,
+            "work": cls.work.id,
+            "commission": cls.commission.id,
+            "user": cls.staff_user.id,
+            "day": start.date().isoformat(),
+            "tomorrow": (start + timedelta(hours=10)).isoformat(),
+        }
+
+    def url(self, name, kwargs, params):
+        path = reverse(name, kwargs={key: self.objects[value] for key, value in kwargs.items()})
+        return path, {key: self.objects.get(value, value) for key, value in params.items()}
+
+    def clear_caches(self):
+        """حالت یک worker تازه: کش مشترک و کش‌های پروسس (داده‌های پایه، کمیسیون) خالی"""
+        cache.clear()
+        invalidate_reference_data()
+        invalidate_commission_index()
+        # worker تازه نسخه را هنوز از کش مشترک نخوانده است
+        refdata._checked_version = None
+
+    def cold_allowance(self):
+        """کوئری‌های یک بار پر کردن داده‌های پایه؛ در حالت گرم هیچ کوئری‌ای ندارد"""
+        self.clear_caches()
+        with CaptureQueriesContext(connection) as queries:
+            reference_data()
+        return len(queries)
+
+    def request(self, name, path, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, query)
+        self.assertLess(response.status_code, 500, name)
+        return len(queries)
+
+    def measure(self, user):
+        self.client.force_login(user)
+        cold, warm = {}, {}
+        for name, kwargs, params in ROUTES:
+            path, query = self.url(name, kwargs, params)
+            self.clear_caches()
+            cold[name] = self.request(name, path, query)
+            warm[name] = self.request(name, path, query)
+        return cold, warm
+
+    def check_user(self, user, role):
+        small_cold, small = self.measure(user)
+        self.objects = self.seed(1, customers=400, sales=600, entries=200, appointments=300)
+        large_cold, large = self.measure(user)
+
+        grown = {name: (small[name], large[name]) for name in small if large[name] > small[name]}
+        grown.update({
+            f"{name} (cold)": (small_cold[name], large_cold[name])
+            for name in small_cold if large_cold[name] > small_cold[name]
+        })
+        self.assertEqual(grown, {}, "queries grow with rows")
+        over = {
+            name: (count, BUDGETS[name][role]) for name, count in large.items() if count > BUDGETS[name][role]
+        }
+        self.assertEqual(over, {}, "over query budget")
+        # درخواست اول هر مسیر فقط می‌تواند هزینه یک بار پر کردن کش‌ها را اضافه داشته باشد
+        allowance = self.cold_allowance()
+        over_cold = {
+            name: (count, BUDGETS[name][role] + allowance)
+            for name, count in large_cold.items() if count > BUDGETS[name][role] + allowance
+        }
+        self.assertEqual(over_cold, {}, "over query budget on a cold cache")
+
+    def test_every_named_route_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns if pattern.name}
+        self.assertEqual(names, {name for name, _, _ in ROUTES})
+        self.assertEqual(names, set(BUDGETS))
+
+    def test_admin_budget(self):
+        self.check_user(self.admin, ADMIN)
+
+    def test_personnel_budget(self):
+        self.check_user(self.staff_user, PERSONNEL)
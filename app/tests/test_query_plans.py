@@ -0,0 +1,26 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from app.query_plans import _mysql_full_scans, _sqlite_full_scans, check_query_plans
+
+
+class QueryPlanTest(TestCase):
+    def test_hot_queries_use_indexes(self):
+        scans = {check.label: check.full_scans for check in check_query_plans() if check.full_scans}
+        self.assertEqual(scans, {})
+
+    def test_command_reports_every_query(self):
+        out = StringIO()
+        call_command("check_query_plans", stdout=out)
+        self.assertNotIn("FULL SCAN", out.getvalue())
+        self.assertIn("OK         booking overlap", out.getvalue())
+
+    def test_full_scan_detection(self):
+        self.assertEqual(_sqlite_full_scans("2 0 0 SCAN app_sale\n5 0 0 SCAN app_work", "app_sale"), ["2 0 0 SCAN app_sale"])
+        self.assertEqual(_sqlite_full_scans("3 0 0 SEARCH app_sale USING INDEX sale_date_idx (date>?)", "app_sale"), [])
+        plan = '{"query_block": {"nested_loop": [{"table": {"table_name": "app_pay", "access_type": "ALL"}},' \
+               ' {"table": {"table_name": "app_bank", "access_type": "eq_ref"}}]}}'
+        self.assertEqual(_mysql_full_scans(plan, "app_pay"), ["app_pay: access_type=ALL"])
+        self.assertEqual(_mysql_full_scans(plan, "app_bank"), [])
@@ -0,0 +1,66 @@
+import json
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from app.models import Bank, PaymentMethod, Personnel, PersonnelCommission, Work
+from app.refdata import REFDATA_CHECK_INTERVAL, REFDATA_VERSION_KEY, invalidate_reference_data, reference_data
+
+
+class ReferenceDataTest(TestCase):
+    def setUp(self):
+        invalidate_reference_data()
+        self.bank = Bank.objects.create(name="بانک تست")
+        self.personnel = Personnel.objects.create(fname="پرسنل", lname="مرجع", mobile="09122222222")
+        self.work = Work.objects.create(work_name="خدمت مرجع")
+
+    def test_steady_state_needs_no_queries(self):
+        reference_data()
+        with self.assertNumQueries(0):
+            data = reference_data()
+        self.assertIn({"id": self.bank.id, "name": "بانک تست"}, data.banks)
+        self.assertIn(self.bank.id, [row["id"] for row in json.loads(data.json["banks"])])
+
+    def test_signals_invalidate(self):
+        reference_data()
+        PaymentMethod.objects.create(name="کارت تست", requires_bank=True)
+        self.assertIn("کارت تست", [row["name"] for row in reference_data().payment_methods])
+
+        self.bank.delete()
+        self.assertNotIn(self.bank.id, [row["id"] for row in reference_data().banks])
+
+    def test_personnel_works(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        PersonnelCommission.objects.create(
+            personnel=self.personnel, work=self.work, percentage=40, start_date="2025-01-01", end_date="2025-12-31",
+        )
+        reference_data()
+        # session و کاربر؛ خدمات از کپی پروسس خوانده می‌شوند
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("personnel_works"), {"personnel_id": self.personnel.id})
+        self.assertEqual(response.json(), [{"id": self.work.id, "work_name": "خدمت مرجع"}])
+
+    def test_other_process_changes_are_seen(self):
+        data = reference_data()
+        # پروسس دیگر بانک را ثبت کرده و فقط نسخه کش مشترک را بالا برده است
+        Bank.objects.bulk_create([Bank(name='بانک "دیگر"')])
+        self.assertIs(reference_data(), data)
+        cache.incr(REFDATA_VERSION_KEY)
+        # تا بررسی بعدی نسخه، کپی همین پروسس بدون کوئری استفاده می‌شود
+        with self.assertNumQueries(0):
+            self.assertIs(reference_data(), data)
+        later = time.monotonic() + REFDATA_CHECK_INTERVAL
+        with mock.patch("app.refdata.time.monotonic", return_value=later):
+            self.assertIn('بانک "دیگر"', [row["name"] for row in reference_data().banks])
+
+    def test_payment_data_is_valid_json(self):
+        Bank.objects.create(name='بانک "ملی"')
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        response = self.client.get(reverse("get_payment_data"))
+        self.assertIn({"id": Bank.objects.get(name='بانک "ملی"').id, "name": 'بانک "ملی"'}, response.json()["banks"])
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from app.image_jobs import backfill_variants, process_pending_images, queue_sale_image
+from app.models import Customer, Personnel, Sale, SaleImage, Work
+
+
+def make_upload(name="photo.png", size=(2400, 1800)):
+    buffer = BytesIO()
+    Image.new("RGBA", size, (200, 30, 30, 255)).save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class SaleImageQueueTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        self.sale = Sale.objects.create(
+            customer=Customer.objects.create(fname="مشتری", lname="تست", mobile="09121111111"),
+            personnel=Personnel.objects.create(fname="پرسنل", lname="تست", mobile="09122222222"),
+            work=Work.objects.create(work_name="خدمت تست"),
+            price=1000,
+        )
+
+    def test_update_view_queues_raw_upload(self):
+        response = self.client.post(
+            reverse("update_sale", args=[self.sale.id]),
+            {
+                "customer": self.sale.customer_id,
+                "personnel": self.sale.personnel_id,
+                "work": self.sale.work_id,
+                "price": 1000,
+                "date": "1404-01-15",
+                "time": "10:00",
+                "images_after": make_upload(),
+            },
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        image = SaleImage.objects.get(sale=self.sale)
+        self.assertEqual(image.status, SaleImage.PENDING)
+        self.assertTrue(image.image.name.endswith(".png"))
+
+        status = self.client.get(reverse("sale_image_status", args=[self.sale.id])).json()
+        self.assertTrue(status["pending"])
+
+        self.assertEqual(process_pending_images(), 1)
+        image.refresh_from_db()
+        self.assertEqual(image.status, SaleImage.READY)
+        self.assertTrue(image.image.name.endswith(".jpg"))
+        with Image.open(image.image.path) as processed:
+            self.assertLessEqual(max(processed.size), 1024)
+            self.assertEqual(processed.format, "JPEG")
+        self.assertFalse(image.image.storage.exists(image.image.name.replace(".jpg", ".png")))
+
+        variants = {(v.size, v.format): v for v in image.variants.all()}
+        self.assertEqual(len(variants), 5)
+        self.assertEqual(variants[("thumb", "webp")].width, 320)
+        self.assertEqual(variants[("full", "webp")].width, 1024)
+        self.assertIn(f"{image.image.url} 1024w", image.srcset("jpeg"))
+        self.assertIn(f"{variants[('medium', 'webp')].file.url} 640w", image.srcset("webp"))
+
+        status = self.client.get(reverse("sale_image_status", args=[self.sale.id])).json()
+        self.assertEqual(status["images"][0]["status"], SaleImage.READY)
+        self.assertFalse(status["pending"])
+
+    def test_small_upload_has_no_duplicate_widths(self):
+        image = queue_sale_image(self.sale, make_upload(size=(200, 150)), SaleImage.BEFORE)
+        self.assertEqual(process_pending_images(), 1)
+        image.refresh_from_db()
+
+        variants = {(v.size, v.format): v.width for v in image.variants.all()}
+        self.assertEqual(variants, {("full", "webp"): 200})
+        self.assertEqual(image.srcset("jpeg"), f"{image.image.url} 200w")
+        self.assertEqual(image.srcset("webp").count("200w"), 1)
+
+    def test_broken_upload_is_marked_failed(self):
+        image = queue_sale_image(
+            self.sale, SimpleUploadedFile("broken.jpg", b"not an image"), SaleImage.BEFORE
+        )
+        self.assertEqual(process_pending_images(), 1)
+        image.refresh_from_db()
+        self.assertEqual(image.status, SaleImage.FAILED)
+        self.assertTrue(image.error)
+        self.assertEqual(process_pending_images(), 0)
+
+    def test_backfill_and_delete_variants(self):
+        image = SaleImage.objects.create(sale=self.sale, image=make_upload("old.jpg", (800, 600)), image_type=SaleImage.AFTER)
+        self.assertEqual(backfill_variants(), (1, 0))
+        self.assertEqual(backfill_variants(), (0, 0))
+
+        files = [variant.file.path for variant in image.variants.all()]
+        self.assertEqual(len(files), 5)
+
+        response = self.client.get(reverse("gallery"))
+        self.assertContains(response, 'type="image/webp"')
+
+        image.delete()
+        self.assertFalse(any(os.path.exists(path) for path in files))
@@ -0,0 +1,111 @@
+import os
+import tempfile
+from datetime import date
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+
+from app.models import Customer, Personnel, PersonnelCommission, Sale, Work
+
+
+class SaleImportTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(fname="مشتری", lname="تست", mobile="09121111111")
+        self.personnel = Personnel.objects.create(fname="سارا", lname="احمدی", mobile="09122222222")
+        self.work = Work.objects.create(work_name="اصلاح تست")
+        PersonnelCommission.objects.create(
+            personnel=self.personnel, work=self.work, percentage=40,
+            start_date=date(2025, 1, 1), end_date=date(2025, 12, 31),
+        )
+
+    def test_csv_command_imports_valid_rows_and_reports_errors(self):
+        handle = tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8-sig", delete=False)
+        with handle:
+            handle.write("تاریخ,ساعت,موبایل,پرسنل,خدمت,مبلغ\n")
+            handle.write("1404/01/15,10:30,۰۹۱۲۱۱۱۱۱۱۱,سارا احمدی,اصلاح تست,\"1,000,000\"\n")
+            handle.write("2025-04-05,,9121111111,09122222222,اصلاح تست,500000\n")
+            handle.write("1404/01/16,11:00,09129999999,سارا احمدی,رنگ مو,100\n")
+            handle.write("1404/13/40,11:00,09121111111,سارا احمدی,اصلاح تست,abc\n")
+        self.addCleanup(os.unlink, handle.name)
+
+        out, err = StringIO(), StringIO()
+        call_command("import_sales", handle.name, stdout=out, stderr=err)
+
+        self.assertIn("4 rows read, 2 sales created, 2 rows with errors", out.getvalue())
+        self.assertIn("row 4:", err.getvalue())
+        self.assertIn("row 5:", err.getvalue())
+
+        sales = list(Sale.objects.order_by("date"))
+        self.assertEqual([s.price for s in sales], [1000000, 500000])
+        self.assertEqual([s.commission_amount for s in sales], [400000, 200000])
+        self.assertEqual(timezone.localtime(sales[0].date).strftime("%Y-%m-%d %H:%M"), "2025-04-04 10:30")
+
+    def test_upload_view(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["date", "mobile", "personnel", "work", "price"])
+        for day in range(1, 6):
+            sheet.append([f"1404/02/0{day}", "09121111111", "سارا احمدی", "اصلاح تست", 200000])
+        sheet.append(["1404/02/06", "09121111111", "ناشناس", "اصلاح تست", 200000])
+        buffer = BytesIO()
+        workbook.save(buffer)
+        upload = SimpleUploadedFile("sales.xlsx", buffer.getvalue())
+
+        response = self.client.post(reverse("import_sales"), {"file": upload})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["result"].created, 5)
+        self.assertEqual(response.context["result"].errors[0].row, 7)
+        self.assertEqual(Sale.objects.filter(created_by__username="admin").count(), 5)
+
+    def test_dry_run_writes_nothing(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        upload = SimpleUploadedFile(
+            "sales.csv", "date,mobile,personnel,work,price\n1404/02/01,09121111111,سارا احمدی,اصلاح تست,1000\n".encode()
+        )
+        response = self.client.post(reverse("import_sales"), {"file": upload, "dry_run": "on"})
+        self.assertEqual(response.context["result"].total, 1)
+        self.assertFalse(Sale.objects.exists())
+
+    def test_failed_batch_rolls_back_whole_file(self):
+        rows = "".join(f"1404/02/0{day},09121111111,سارا احمدی,اصلاح تست,1000\n" for day in range(1, 6))
+        content = f"date,mobile,personnel,work,price\n{rows}"
+        handle = tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8-sig", delete=False)
+        with handle:
+            handle.write(content)
+        self.addCleanup(os.unlink, handle.name)
+        create = Sale.objects.bulk_create_with_commission
+
+        def fail_second_batch(batch, **kwargs):
+            if Sale.objects.exists():
+                raise IntegrityError("duplicate")
+            return create(batch, **kwargs)
+
+        with mock.patch.object(Sale.objects, "bulk_create_with_commission", side_effect=fail_second_batch):
+            # دسته اول ثبت شده و دسته دوم خطا می‌دهد
+            with self.assertRaises(CommandError):
+                call_command("import_sales", handle.name, "--batch-size", "2", stdout=StringIO(), stderr=StringIO())
+            self.assertFalse(Sale.objects.exists())
+
+            User.objects.create_superuser("admin", "admin@example.com", "pass")
+            self.client.login(username="admin", password="pass")
+            with mock.patch.object(Sale.objects, "bulk_create_with_commission", side_effect=IntegrityError("duplicate")):
+                response = self.client.post(
+                    reverse("import_sales"), {"file": SimpleUploadedFile("sales.csv", content.encode())},
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["form"].errors["file"])
+        self.assertFalse(Sale.objects.exists())
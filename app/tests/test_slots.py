@@ -0,0 +1,97 @@
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Appointment, Customer, Personnel, Work
+from app.slots import free_slots, merge_intervals
+
+
+def at(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class FreeSlotsTest(TestCase):
+    def setUp(self):
+        self.day = date(2025, 5, 4)
+        self.first = Personnel.objects.create(fname="پرسنل", lname="اول", mobile="09122222222")
+        self.second = Personnel.objects.create(fname="پرسنل", lname="دوم", mobile="09123333333")
+        self.customer = Customer.objects.create(fname="سارا", lname="محمدی", mobile="09121111111")
+        self.work = Work.objects.create(work_name="خدمت نوبت")
+
+    def book(self, personnel, start, end):
+        return Appointment.objects.create(
+            customer=self.customer, work=self.work, personnel=personnel, start_time=start, end_time=end,
+        )
+
+    def test_merge_intervals(self):
+        self.assertEqual(
+            merge_intervals([(1, 3), (2, 5), (5, 6), (8, 9), (8, 8)]),
+            [[1, 6], [8, 9]],
+        )
+
+    def test_busy_intervals_removed_and_duration_fits(self):
+        self.book(self.first, at(self.day, 10), at(self.day, 11))
+        self.book(self.first, at(self.day, 10, 30), at(self.day, 12, 10))
+        self.book(self.first, at(self.day, 13), at(self.day, 13, 20))
+
+        slots = free_slots([self.first.id], [self.day], duration_minutes=60, step_minutes=30)[self.first.id][self.day]
+        starts = [timezone.localtime(slot).strftime("%H:%M") for slot in slots]
+
+        # ۱۲:۳۰ با رزرو ۱۳:۰۰ تداخل دارد؛ بعد از ۱۳:۲۰ اولین شروع روی مضرب ۳۰ دقیقه است
+        self.assertEqual(starts[:3], ["09:00", "13:30", "14:00"])
+        self.assertEqual(starts[-1], "20:00")
+
+    def test_past_slots_excluded(self):
+        slots = free_slots([self.first.id], [self.day], duration_minutes=60, step_minutes=15, now=at(self.day, 18, 5))
+        starts = [timezone.localtime(slot).strftime("%H:%M") for slot in slots[self.first.id][self.day]]
+        self.assertEqual(starts[0], "18:15")
+
+    def test_many_personnel_and_days_single_query(self):
+        self.book(self.second, at(self.day + timedelta(days=1), 9), at(self.day + timedelta(days=1), 21))
+        days = [self.day + timedelta(days=offset) for offset in range(7)]
+
+        with self.assertNumQueries(1):
+            result = free_slots([self.first.id, self.second.id], days, duration_minutes=60)
+
+        self.assertEqual(len(result[self.first.id]), 7)
+        self.assertTrue(all(result[self.first.id].values()))
+        self.assertEqual(result[self.second.id][self.day + timedelta(days=1)], [])
+
+
+class AvailableSlotsViewTest(TestCase):
+    def setUp(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        self.personnel = Personnel.objects.create(fname="پرسنل", lname="تست", mobile="09122222222")
+        customer = Customer.objects.create(fname="سارا", lname="محمدی", mobile="09121111111")
+        work = Work.objects.create(work_name="خدمت نوبت")
+        self.day = timezone.localdate() + timedelta(days=2)
+        Appointment.objects.create(
+            customer=customer, work=work, personnel=self.personnel,
+            start_time=at(self.day, 9), end_time=at(self.day, 12),
+        )
+
+    def test_response_shape(self):
+        response = self.client.get(reverse("get_time_slots"), {
+            "personnel_id": self.personnel.id, "date": self.day.isoformat(), "days": 2, "duration": 60,
+        })
+        data = response.json()
+        self.assertEqual(data["status"], "success")
+        self.assertEqual(data["slots"][0], "12:00")
+        self.assertEqual(set(data["availability"][str(self.personnel.id)]), {
+            self.day.isoformat(), (self.day + timedelta(days=1)).isoformat(),
+        })
+
+    def test_jalali_dates_invalid_in_gregorian(self):
+        # ۳۱ شهریور و ۳۰ اردیبهشت به شکل میلادی تاریخ نامعتبرند
+        for jalali, gregorian in (("1404-06-31", date(2025, 9, 22)), ("۱۴۰۴/۰۲/۳۰", date(2025, 5, 20))):
+            response = self.client.get(reverse("get_time_slots"), {"personnel_id": self.personnel.id, "date": jalali})
+            self.assertEqual(response.status_code, 200, jalali)
+            self.assertEqual(set(response.json()["availability"][str(self.personnel.id)]), {gregorian.isoformat()})
+
+    def test_invalid_params(self):
+        response = self.client.get(reverse("get_time_slots"), {"personnel_id": "x", "date": "2025-01-01"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,59 @@
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Exists, OuterRef
+from django.test import TestCase
+
+from app.models import Appointment, BalanceSnapshot, Customer, CustomerSearchKey, Pay, Receipt, Sale, SaleImage
+
+
+class SyntheticDataTest(TestCase):
+    def generate(self):
+        call_command(
+            "generate_synthetic_data", "--noinput", "--customers", "60", "--sales", "400", "--pays", "150",
+            "--receipts", "150", "--appointments", "200", "--images", "20", "--personnel", "4", "--days", "90",
+            "--batch-size", "70", stdout=StringIO(),
+        )
+
+    def test_generates_consistent_data(self):
+        customers = Customer.objects.count()
+        self.generate()
+
+        self.assertEqual(Customer.objects.count() - customers, 60)
+        self.assertEqual(Sale.objects.count(), 400)
+        self.assertEqual((Pay.objects.count(), Receipt.objects.count()), (150, 150))
+        self.assertTrue(SaleImage.objects.exists())
+        self.assertFalse(Sale.objects.filter(commission_amount=0).exists())
+        self.assertEqual(CustomerSearchKey.objects.values("customer").distinct().count(), Customer.objects.count())
+        self.assertTrue(BalanceSnapshot.objects.exists())
+
+        # نوبت‌های هر پرسنل هم‌پوشانی ندارند
+        overlapping = Appointment.objects.filter(Exists(
+            Appointment.objects.filter(
+                personnel_id=OuterRef("personnel_id"),
+                start_time__lt=OuterRef("end_time"),
+                end_time__gt=OuterRef("start_time"),
+            ).exclude(pk=OuterRef("pk"))
+        ))
+        self.assertTrue(Appointment.objects.exists())
+        self.assertFalse(overlapping.exists())
+
+    def test_bench_views_reports_json(self):
+        self.generate()
+        User.objects.create_superuser("bench_admin", "admin@example.com", "pass")
+        out = StringIO()
+        call_command("bench_views", "--repeat", "3", "--warmup", "1", "--username", "bench_admin", stdout=out)
+
+        result = json.loads(out.getvalue())
+        self.assertEqual(result["rows"]["sales"], 400)
+        self.assertEqual(
+            set(result["views"]),
+            {"home", "sales", "ledger_report", "treasury_dashboard", "appointment_list", "gallery"},
+        )
+        for name, report in result["views"].items():
+            self.assertEqual(report["status"], 200, name)
+            self.assertEqual(report["requests"], 3)
+            self.assertGreater(report["queries"]["p50"], 0)
+            self.assertLessEqual(report["latency_ms"]["p50"], report["latency_ms"]["p99"])
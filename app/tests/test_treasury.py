@@ -0,0 +1,250 @@
+from datetime import date
+
+from django.db.models import ProtectedError
+from django.test import TestCase
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Bank, BalanceCheckpoint, BalanceSnapshot, DailyCashFlow, Pay, PaymentMethod, PayType, Personnel, Receipt, ReceiptType
+from app.treasury import build_balance_checkpoints, opening_balance, rebuild_balance_snapshots, rebuild_daily_cash_flow
+
+
+class BalanceSnapshotTest(TestCase):
+    def setUp(self):
+        self.cash = PaymentMethod.objects.create(name="نقد تست", requires_bank=False)
+        self.card = PaymentMethod.objects.create(name="بانکی تست", requires_bank=True)
+        self.bank = Bank.objects.create(name="بانک تست")
+        self.pay_type = PayType.objects.create(name="هزینه تست")
+        self.receipt_type = ReceiptType.objects.create(name="سایر تست")
+
+    def snapshot(self, method, bank=None):
+        return BalanceSnapshot.objects.get(source_type=method, bank=bank)
+
+    def test_create_update_delete_keep_balance(self):
+        receipt = Receipt.objects.create(
+            source_type=self.card, bank=self.bank, amount=1000,
+            date=date(2025, 1, 10), receipt_type=self.receipt_type,
+        )
+        pay = Pay.objects.create(
+            source_type=self.card, bank=self.bank, amount=300,
+            date=date(2025, 1, 12), pay_type=self.pay_type,
+        )
+        snapshot = self.snapshot(self.card, self.bank)
+        self.assertEqual(snapshot.balance, 700)
+        self.assertEqual(snapshot.last_tx_date, date(2025, 1, 12))
+
+        # انتقال پرداخت به صندوق نقدی
+        pay.source_type = self.cash
+        pay.bank = None
+        pay.save()
+        self.assertEqual(self.snapshot(self.card, self.bank).balance, 1000)
+        self.assertEqual(self.snapshot(self.card, self.bank).last_tx_date, date(2025, 1, 10))
+        self.assertEqual(self.snapshot(self.cash).balance, -300)
+
+        receipt.delete()
+        snapshot = self.snapshot(self.card, self.bank)
+        self.assertEqual(snapshot.balance, 0)
+        self.assertIsNone(snapshot.last_tx_date)
+
+    def test_rebuild_matches_incremental(self):
+        for day in range(1, 6):
+            Receipt.objects.create(
+                source_type=self.cash, amount=100 * day,
+                date=date(2025, 2, day), receipt_type=self.receipt_type,
+            )
+            Pay.objects.create(
+                source_type=self.card, bank=self.bank, amount=10 * day,
+                date=date(2025, 2, day), pay_type=self.pay_type,
+            )
+        incremental = set(BalanceSnapshot.objects.values_list("source_type_id", "bank_id", "balance", "last_tx_date"))
+
+        rebuild_balance_snapshots()
+        rebuilt = set(BalanceSnapshot.objects.values_list("source_type_id", "bank_id", "balance", "last_tx_date"))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_deleting_bank_folds_into_unbanked_rows(self):
+        other_bank = Bank.objects.create(name="بانک دوم")
+        for bank, amount in ((self.bank, 1000), (other_bank, 400), (None, 50)):
+            Receipt.objects.create(
+                source_type=self.card, bank=bank, amount=amount,
+                date=date(2025, 3, 1), receipt_type=self.receipt_type,
+            )
+        Pay.objects.create(source_type=self.card, bank=self.bank, amount=300, date=date(2025, 3, 2), pay_type=self.pay_type)
+        build_balance_checkpoints(until=date(2025, 3, 3))
+
+        self.bank.delete()
+        other_bank.delete()
+
+        # اسناد با SET_NULL بدون بانک شده‌اند؛ جداول خلاصه هم باید همان را نشان دهند
+        self.assertEqual(list(BalanceSnapshot.objects.filter(source_type=self.card).values_list("bank_id", "balance")), [(None, 1150)])
+        self.assertEqual(self.snapshot(self.card).last_tx_date, date(2025, 3, 2))
+        self.assertEqual(
+            list(BalanceCheckpoint.objects.filter(source_type=self.card).order_by("day").values_list("day", "bank_id", "closing_balance")),
+            [(date(2025, 3, 1), None, 1450), (date(2025, 3, 2), None, 1150), (date(2025, 3, 3), None, 1150)],
+        )
+        self.assertFalse(DailyCashFlow.objects.filter(bank__isnull=False).exists())
+        incremental = set(BalanceSnapshot.objects.values_list("source_type_id", "bank_id", "balance", "last_tx_date"))
+        rebuild_balance_snapshots()
+        self.assertEqual(incremental, set(BalanceSnapshot.objects.values_list("source_type_id", "bank_id", "balance", "last_tx_date")))
+
+        # تراکنش بعدی روی همان ردیف بدون بانک جمع می‌شود
+        Receipt.objects.create(source_type=self.card, amount=10, date=date(2025, 3, 4), receipt_type=self.receipt_type)
+        self.assertEqual(self.snapshot(self.card).balance, 1160)
+
+    def test_dashboard_lists_zero_balance_accounts(self):
+        Receipt.objects.create(source_type=self.card, bank=self.bank, amount=500, date=date(2025, 1, 1), receipt_type=self.receipt_type)
+        other_bank = Bank.objects.create(name="بانک بدون تراکنش")
+        self.client.force_login(User.objects.create_superuser(username="treasury_admin", password="pass"))
+
+        methods = self.client.get(reverse("treasury_dashboard")).context["methods"]
+        balances = {(row["payment_method_id"], row["bank_id"]): row["balance"] for row in methods}
+        self.assertEqual(balances[(self.card.id, self.bank.id)], 500)
+        self.assertEqual(balances[(self.card.id, other_bank.id)], 0)
+        self.assertEqual(balances[(self.cash.id, None)], 0)
+        self.assertNotIn((self.cash.id, self.bank.id), balances)
+
+
+class OpeningBalanceTest(TestCase):
+    def setUp(self):
+        self.method = PaymentMethod.objects.create(name="بانکی تست", requires_bank=True)
+        self.bank = Bank.objects.create(name="بانک تست")
+        self.other_bank = Bank.objects.create(name="بانک دوم")
+        self.pay_type = PayType.objects.create(name="هزینه تست")
+        self.receipt_type = ReceiptType.objects.create(name="سایر تست")
+        for day in range(1, 21):
+            for bank in (self.bank, self.other_bank):
+                Receipt.objects.create(
+                    source_type=self.method, bank=bank, amount=1000,
+                    date=date(2025, 4, day), receipt_type=self.receipt_type,
+                )
+                Pay.objects.create(
+                    source_type=self.method, bank=bank, amount=day,
+                    date=date(2025, 4, day), pay_type=self.pay_type,
+                )
+
+    def naive_opening(self, start, bank=None):
+        receipts = Receipt.objects.filter(date__lt=start)
+        pays = Pay.objects.filter(date__lt=start)
+        if bank:
+            receipts = receipts.filter(bank=bank)
+            pays = pays.filter(bank=bank)
+        return sum(r.amount for r in receipts) - sum(p.amount for p in pays)
+
+    def test_checkpoints_match_naive_sum(self):
+        build_balance_checkpoints(until=date(2025, 4, 10))
+        for start in (date(2025, 3, 1), date(2025, 4, 5), date(2025, 4, 11), date(2025, 4, 25)):
+            self.assertEqual(opening_balance(start), self.naive_opening(start))
+            self.assertEqual(opening_balance(start, bank_id=self.bank.id), self.naive_opening(start, self.bank))
+
+    def test_backdated_writes_shift_checkpoints(self):
+        build_balance_checkpoints(until=date(2025, 4, 15))
+        new_bank = Bank.objects.create(name="بانک جدید")
+        Receipt.objects.create(
+            source_type=self.method, bank=new_bank, amount=777,
+            date=date(2025, 4, 3), receipt_type=self.receipt_type,
+        )
+        pay = Pay.objects.filter(bank=self.bank, date=date(2025, 4, 2)).get()
+        pay.amount = 50000
+        pay.save()
+        Receipt.objects.filter(bank=self.other_bank, date=date(2025, 4, 4)).get().delete()
+
+        for start in (date(2025, 4, 3), date(2025, 4, 10), date(2025, 4, 18)):
+            self.assertEqual(opening_balance(start), self.naive_opening(start))
+            self.assertEqual(opening_balance(start, bank_id=new_bank.id), self.naive_opening(start, new_bank))
+
+
+    def test_unbanked_checkpoints_are_not_duplicated(self):
+        build_balance_checkpoints(until=date(2025, 4, 10))
+        cash = PaymentMethod.objects.create(name="نقد تست", requires_bank=False)
+        for amount in (300, 200):
+            Receipt.objects.create(source_type=cash, amount=amount, date=date(2025, 4, 5), receipt_type=self.receipt_type)
+
+        rows = BalanceCheckpoint.objects.filter(source_type=cash).order_by("day")
+        self.assertEqual(list(rows.values_list("day", "bank_key", "closing_balance"))[0], (date(2025, 4, 5), 0, 500))
+        self.assertEqual(rows.count(), 6)
+        self.assertEqual(opening_balance(date(2025, 4, 11)), self.naive_opening(date(2025, 4, 11)))
+
+
+class DailyCashFlowTest(TestCase):
+    def setUp(self):
+        self.method = PaymentMethod.objects.create(name="بانکی تست", requires_bank=True)
+        self.bank = Bank.objects.create(name="بانک تست")
+        self.personnel = Personnel.objects.create(fname="پرسنل", lname="تست", mobile="09120000000")
+        self.pay_type = PayType.objects.create(name="پرسنل تست", is_personnel=True)
+        self.receipt_type = ReceiptType.objects.create(name="سایر تست")
+
+    def flows(self):
+        return set(
+            DailyCashFlow.objects.exclude(pay_total=0, receipt_total=0)
+            .values_list("day", "source_type_id", "bank_id", "personnel_id", "pay_total", "receipt_total")
+        )
+
+    def test_writes_match_rebuild(self):
+        today = timezone.now().date()
+        pay = Pay.objects.create(
+            source_type=self.method, bank=self.bank, amount=500, date=today,
+            pay_type=self.pay_type, personnel=self.personnel,
+        )
+        Pay.objects.create(
+            source_type=self.method, bank=self.bank, amount=250, date=today,
+            pay_type=self.pay_type, personnel=self.personnel,
+        )
+        receipt = Receipt.objects.create(
+            source_type=self.method, bank=self.bank, amount=900, date=today,
+            receipt_type=self.receipt_type,
+        )
+        pay.date = date(2025, 1, 1)
+        pay.save()
+        receipt.delete()
+
+        incremental = self.flows()
+        rebuild_daily_cash_flow()
+        self.assertEqual(incremental, self.flows())
+
+    def test_personnel_is_protected_while_flows_remain(self):
+        flow = DailyCashFlow.objects.create(
+            day=date(2024, 1, 1), source_type=self.method, bank=self.bank, personnel=self.personnel,
+            bank_key=self.bank.id, personnel_key=self.personnel.id, pay_total=10,
+        )
+        with self.assertRaises(ProtectedError):
+            self.personnel.delete()
+        flow.delete()
+
+        Pay.objects.create(
+            source_type=self.method, bank=self.bank, amount=500, date=date(2025, 1, 1),
+            pay_type=self.pay_type, personnel=self.personnel,
+        ).delete()
+        # ردیف صفرشده حذف می‌شود و پرسنل بدون پرداخت قابل حذف است
+        self.assertFalse(DailyCashFlow.objects.filter(personnel=self.personnel).exists())
+        self.personnel.delete()
+
+    def test_rows_without_bank_or_personnel_are_shared(self):
+        cash = PaymentMethod.objects.create(name="نقد تست", requires_bank=False)
+        receipts = [
+            Receipt.objects.create(source_type=cash, amount=amount, date=date(2025, 1, 1), receipt_type=self.receipt_type)
+            for amount in (100, 200)
+        ]
+        self.assertEqual(
+            list(DailyCashFlow.objects.values_list("bank_key", "personnel_key", "receipt_total")), [(0, 0, 300)],
+        )
+        for receipt in receipts:
+            receipt.delete()
+        self.assertFalse(DailyCashFlow.objects.exists())
+
+    def test_dashboard_series_from_daily_totals(self):
+        today = timezone.now().date()
+        Pay.objects.create(
+            source_type=self.method, bank=self.bank, amount=700, date=today,
+            pay_type=self.pay_type, personnel=self.personnel,
+        )
+        self.client.force_login(User.objects.create_superuser(username="dash_admin", password="pass"))
+        response = self.client.get(reverse("home"))
+        self.assertEqual(response.status_code, 200)
+
+        series = {item["name"]: item["data"] for item in response.context["balances_chart"]}
+        data = series[f"{self.method.name} - {self.bank.name}"]
+        self.assertEqual(len(data), 30)
+        self.assertEqual(data[-1]["balance"], 700)
+        self.assertEqual(sum(point["balance"] for point in data), 700)
@@ -0,0 +1,364 @@
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Min, Sum
+from django.utils import timezone
+
+from app.models import BalanceCheckpoint, BalanceSnapshot, DailyCashFlow, Pay, Receipt
+
+# اثر هر نوع سند روی موجودی: دریافت افزایش و پرداخت کاهش
+LEDGER_SIGN = {
+    Receipt: 1,
+    Pay: -1,
+}
+
+# ستون جمع روزانه هر نوع سند در DailyCashFlow
+DAILY_TOTAL_FIELD = {
+    Receipt: "receipt_total",
+    Pay: "pay_total",
+}
+
+LedgerEntry = namedtuple("LedgerEntry", ["source_type_id", "bank_id", "amount", "date", "personnel_id"])
+
+
+def _as_date(value):
+    # save_receipts تاریخ فروش (datetime) را در فیلد date ذخیره می‌کند
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _as_amount(value):
+    if value is None:
+        return Decimal(0)
+    return Decimal(str(value))
+
+
+def ledger_entry(instance):
+    return LedgerEntry(
+        source_type_id=instance.source_type_id,
+        bank_id=instance.bank_id,
+        amount=_as_amount(instance.amount),
+        date=_as_date(instance.date),
+        # دریافت‌ها پرسنل ندارند
+        personnel_id=getattr(instance, "personnel_id", None),
+    )
+
+
+def stored_ledger_entry(model, pk):
+    fields = ["source_type_id", "bank_id", "amount", "date"]
+    if model is Pay:
+        fields.append("personnel_id")
+    row = model.objects.filter(pk=pk).values(*fields).first()
+    if row is None:
+        return None
+    return LedgerEntry(
+        source_type_id=row["source_type_id"],
+        bank_id=row["bank_id"],
+        amount=_as_amount(row["amount"]),
+        date=_as_date(row["date"]),
+        personnel_id=row.get("personnel_id"),
+    )
+
+
+def _locked_snapshot(source_type_id, bank_id):
+    # اگر دو تراکنش همزمان اولین ردیف را بسازند، get_or_create با IntegrityError دوباره همان ردیف را (با قفل) می‌خواند
+    snapshot, _ = BalanceSnapshot.objects.select_for_update().get_or_create(
+        source_type_id=source_type_id, bank_key=bank_id or 0, defaults={"bank_id": bank_id},
+    )
+    return snapshot
+
+
+def _last_tx_date(source_type_id, bank_id):
+    dates = [
+        model.objects.filter(source_type_id=source_type_id, bank_id=bank_id).aggregate(last=Max("date"))["last"]
+        for model in (Receipt, Pay)
+    ]
+    return max(filter(None, dates), default=None)
+
+
+def _add_to_snapshot(entry, amount):
+    snapshot = _locked_snapshot(entry.source_type_id, entry.bank_id)
+    snapshot.balance = F("balance") + amount
+    if snapshot.last_tx_date is None or entry.date > snapshot.last_tx_date:
+        snapshot.last_tx_date = entry.date
+    snapshot.save(update_fields=["balance", "last_tx_date", "updated_at"])
+
+
+def _remove_from_snapshot(entry, amount):
+    snapshot = _locked_snapshot(entry.source_type_id, entry.bank_id)
+    snapshot.balance = F("balance") - amount
+    # اگر آخرین تراکنش حذف یا جابه‌جا شده باشد، تاریخ آخرین تراکنش دوباره محاسبه می‌شود
+    if snapshot.last_tx_date is not None and entry.date >= snapshot.last_tx_date:
+        snapshot.last_tx_date = _last_tx_date(entry.source_type_id, entry.bank_id)
+    snapshot.save(update_fields=["balance", "last_tx_date", "updated_at"])
+
+
+def _shift_checkpoints(entry, amount):
+    # سند با تاریخ گذشته: مانده همه نقاط کنترل از آن روز به بعد جابه‌جا می‌شود
+    days = list(
+        BalanceCheckpoint.objects.filter(day__gte=entry.date)
+        .values_list("day", flat=True)
+        .distinct()
+    )
+    if not days:
+        return
+
+    # نوشتن‌های همزمان یک حساب پشت قفل ردیف BalanceSnapshot همان حساب (_locked_snapshot) صف می‌شوند
+    key = {"source_type_id": entry.source_type_id, "bank_key": entry.bank_id or 0}
+    existing = set(
+        BalanceCheckpoint.objects.filter(day__gte=entry.date, **key).values_list("day", flat=True)
+    )
+    BalanceCheckpoint.objects.filter(day__gte=entry.date, **key).update(
+        closing_balance=F("closing_balance") + amount
+    )
+    # نبود ردیف برای یک حساب یعنی مانده آن حساب در آن روز صفر بوده است
+    BalanceCheckpoint.objects.bulk_create([
+        BalanceCheckpoint(day=day, closing_balance=amount, bank_id=entry.bank_id, **key)
+        for day in set(days) - existing
+    ])
+
+
+def _add_to_daily_cash_flow(entry, field, amount):
+    # مثل _locked_snapshot: ساخت همزمان اولین ردیف به IntegrityError و خواندن دوباره همان ردیف (با قفل) می‌رسد
+    flow, created = DailyCashFlow.objects.select_for_update().get_or_create(
+        day=entry.date,
+        source_type_id=entry.source_type_id,
+        bank_key=entry.bank_id or 0,
+        personnel_key=entry.personnel_id or 0,
+        defaults={"bank_id": entry.bank_id, "personnel_id": entry.personnel_id, field: amount},
+    )
+    if created:
+        return
+    DailyCashFlow.objects.filter(pk=flow.pk).update(**{field: F(field) + amount})
+    if amount < 0:
+        # ردیف خالی مانده حذف می‌شود تا حذف پرسنل (PROTECT مثل Pay.personnel) را بی‌دلیل مسدود نکند
+        DailyCashFlow.objects.filter(pk=flow.pk, pay_total=0, receipt_total=0).delete()
+
+
+def apply_ledger_change(model, old=None, new=None):
+    """
+    اعمال تغییر یک سند پرداخت/دریافت روی جداول خلاصه موجودی.
+    old: وضعیت قبلی سند (برای ویرایش و حذف) و new: وضعیت جدید (برای ثبت و ویرایش)
+    """
+    sign = LEDGER_SIGN[model]
+    with transaction.atomic():
+        if old is not None:
+            _remove_from_snapshot(old, sign * old.amount)
+            _shift_checkpoints(old, -sign * old.amount)
+            _add_to_daily_cash_flow(old, DAILY_TOTAL_FIELD[model], -old.amount)
+        if new is not None:
+            _add_to_snapshot(new, sign * new.amount)
+            _shift_checkpoints(new, sign * new.amount)
+            _add_to_daily_cash_flow(new, DAILY_TOTAL_FIELD[model], new.amount)
+
+
+def _merge_value(field, current, other):
+    if field == "last_tx_date":
+        return max(filter(None, [current, other]), default=None)
+    return current + other
+
+
+def _fold_rows(model, bank_id, key_fields, merge_fields, batch_size=500, **unbanked):
+    rows = list(model.objects.filter(bank_id=bank_id))
+    if not rows:
+        return
+    targets = {
+        tuple(getattr(target, field) for field in key_fields): target
+        for target in model.objects.filter(bank__isnull=True, source_type_id__in={row.source_type_id for row in rows})
+    }
+    merged, folded = {}, []
+    for row in rows:
+        target = targets.get(tuple(getattr(row, field) for field in key_fields))
+        if target is None:
+            continue
+        for field in merge_fields:
+            setattr(target, field, _merge_value(field, getattr(target, field), getattr(row, field)))
+        merged[target.pk] = target
+        folded.append(row.pk)
+
+    model.objects.bulk_update(list(merged.values()), merge_fields, batch_size=batch_size)
+    for start in range(0, len(folded), batch_size):
+        model.objects.filter(pk__in=folded[start:start + batch_size]).delete()
+    # ردیف‌هایی که همتای بدون بانک ندارند خودشان بدون بانک می‌شوند
+    model.objects.filter(bank_id=bank_id).update(bank=None, **unbanked)
+
+
+def fold_bank_into_unbanked(bank_id):
+    """
+    حذف بانک: اسناد آن با SET_NULL (یک update گروهی، بدون سیگنال) به «بدون بانک» منتقل می‌شوند؛
+    ردیف‌های خلاصه بانک هم به همان شکل روی ردیف بدون بانک هم‌کلید جمع می‌شوند.
+    """
+    with transaction.atomic():
+        _fold_rows(BalanceSnapshot, bank_id, ["source_type_id"], ["balance", "last_tx_date"], bank_key=0)
+        _fold_rows(BalanceCheckpoint, bank_id, ["day", "source_type_id"], ["closing_balance"], bank_key=0)
+        _fold_rows(
+            DailyCashFlow, bank_id, ["day", "source_type_id", "personnel_key"], ["pay_total", "receipt_total"], bank_key=0,
+        )
+
+
+def rebuild_balance_snapshots():
+    """ساخت دوباره همه مانده‌ها از روی جداول پرداخت و دریافت"""
+    totals = {}
+    for model, sign in LEDGER_SIGN.items():
+        rows = (
+            model.objects.values("source_type_id", "bank_id")
+            .annotate(total=Sum("amount"), last=Max("date"))
+            .order_by()
+        )
+        for row in rows:
+            key = (row["source_type_id"], row["bank_id"])
+            balance, last = totals.get(key, (Decimal(0), None))
+            balance += sign * _as_amount(row["total"])
+            last = max(filter(None, [last, _as_date(row["last"])]), default=None)
+            totals[key] = (balance, last)
+
+    snapshots = [
+        BalanceSnapshot(
+            source_type_id=source_type_id, bank_id=bank_id, bank_key=bank_id or 0, balance=balance, last_tx_date=last,
+        )
+        for (source_type_id, bank_id), (balance, last) in totals.items()
+    ]
+    with transaction.atomic():
+        BalanceSnapshot.objects.all().delete()
+        BalanceSnapshot.objects.bulk_create(snapshots)
+    return len(snapshots)
+
+
+def _daily_net(start, until):
+    net = defaultdict(lambda: defaultdict(Decimal))
+    for model, sign in LEDGER_SIGN.items():
+        rows = (
+            model.objects.filter(date__gte=start, date__lte=until)
+            .values("date", "source_type_id", "bank_id")
+            .annotate(total=Sum("amount"))
+            .order_by()
+        )
+        for row in rows:
+            net[_as_date(row["date"])][(row["source_type_id"], row["bank_id"])] += sign * _as_amount(row["total"])
+    return net
+
+
+def build_balance_checkpoints(until=None, full=False, batch_size=1000):
+    """
+    ساخت نقاط کنترل مانده پایان روز از روز بعد از آخرین نقطه موجود تا until (پیش‌فرض: دیروز).
+    برای هر روز، یک ردیف برای هر حسابی که تا آن روز تراکنش داشته ثبت می‌شود.
+    """
+    until = until or timezone.localdate() - timedelta(days=1)
+
+    with transaction.atomic():
+        if full:
+            BalanceCheckpoint.objects.all().delete()
+
+        last_day = BalanceCheckpoint.objects.aggregate(last=Max("day"))["last"]
+        running = {}
+        if last_day is None:
+            first_dates = [model.objects.aggregate(first=Min("date"))["first"] for model in LEDGER_SIGN]
+            start = min(filter(None, map(_as_date, first_dates)), default=None)
+            if start is None:
+                return 0
+        else:
+            start = last_day + timedelta(days=1)
+            for checkpoint in BalanceCheckpoint.objects.filter(day=last_day):
+                running[(checkpoint.source_type_id, checkpoint.bank_id)] = checkpoint.closing_balance
+
+        net = _daily_net(start, until)
+        created = 0
+        batch = []
+        day = start
+        while day <= until:
+            for key, amount in net.get(day, {}).items():
+                running[key] = running.get(key, Decimal(0)) + amount
+            batch.extend(
+                BalanceCheckpoint(
+                    day=day, source_type_id=source_type_id, bank_id=bank_id, bank_key=bank_id or 0,
+                    closing_balance=balance,
+                )
+                for (source_type_id, bank_id), balance in running.items()
+            )
+            if len(batch) >= batch_size:
+                BalanceCheckpoint.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+            day += timedelta(days=1)
+
+        BalanceCheckpoint.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def opening_balance(start_date, bank_id=None, payment_method_id=None):
+    """
+    مانده ابتدای روز start_date (دریافت‌ها منهای پرداخت‌ها).
+    مانده نزدیک‌ترین نقطه کنترل قبل از start_date خوانده می‌شود و فقط تراکنش‌های
+    روزهای بعد از آن جمع زده می‌شوند؛ پس هزینه با بزرگ شدن تاریخچه ثابت می‌ماند.
+    """
+    key_filters = {}
+    if bank_id:
+        key_filters["bank_id"] = bank_id
+    if payment_method_id:
+        key_filters["source_type_id"] = payment_method_id
+
+    checkpoint_day = (
+        BalanceCheckpoint.objects.filter(day__lt=start_date)
+        .aggregate(day=Max("day"))["day"]
+    )
+
+    balance = Decimal(0)
+    tx_filters = dict(key_filters, date__lt=start_date)
+    if checkpoint_day is not None:
+        balance += (
+            BalanceCheckpoint.objects.filter(day=checkpoint_day, **key_filters)
+            .aggregate(total=Sum("closing_balance"))["total"]
+            or 0
+        )
+        tx_filters["date__gt"] = checkpoint_day
+
+    for model, sign in LEDGER_SIGN.items():
+        total = model.objects.filter(**tx_filters).aggregate(total=Sum("amount"))["total"]
+        balance += sign * _as_amount(total)
+    return balance
+
+
+def rebuild_daily_cash_flow(batch_size=1000):
+    """ساخت دوباره جدول گردش روزانه از روی پرداخت‌ها و دریافت‌ها"""
+    totals = defaultdict(lambda: {"pay_total": Decimal(0), "receipt_total": Decimal(0)})
+    for model, field in DAILY_TOTAL_FIELD.items():
+        group = ["date", "source_type_id", "bank_id"]
+        if model is Pay:
+            group.append("personnel_id")
+        rows = model.objects.values(*group).annotate(total=Sum("amount")).order_by()
+        for row in rows:
+            key = (_as_date(row["date"]), row["source_type_id"], row["bank_id"], row.get("personnel_id"))
+            totals[key][field] += _as_amount(row["total"])
+
+    flows = [
+        DailyCashFlow(
+            day=day, source_type_id=source_type_id, bank_id=bank_id, personnel_id=personnel_id,
+            bank_key=bank_id or 0, personnel_key=personnel_id or 0, **values,
+        )
+        for (day, source_type_id, bank_id, personnel_id), values in totals.items()
+    ]
+    with transaction.atomic():
+        DailyCashFlow.objects.all().delete()
+        DailyCashFlow.objects.bulk_create(flows, batch_size=batch_size)
+    return len(flows)
+
+
+def daily_pay_totals(start_date, end_date, personnel_id=None):
+    """
+    جمع پرداخت‌های هر روز بازه با یک کوئری GROUP BY روی DailyCashFlow.
+    خروجی: {(source_type_id, bank_id): {day: total}} یا برای پرسنل {day: total}
+    """
+    flows = DailyCashFlow.objects.filter(day__gte=start_date, day__lte=end_date)
+    if personnel_id is not None:
+        rows = flows.filter(personnel_id=personnel_id).values("day").annotate(total=Sum("pay_total")).order_by()
+        return {row["day"]: row["total"] or 0 for row in rows}
+
+    totals = defaultdict(dict)
+    rows = flows.values("day", "source_type_id", "bank_id").annotate(total=Sum("pay_total")).order_by()
+    for row in rows:
+        totals[(row["source_type_id"], row["bank_id"])][row["day"]] = row["total"] or 0
+    return totals
@@ -8,6 +8,7 @@ urlpatterns = [
     path("sale/new/", SaleCreateView.as_view(), name="create_sale"),
     path("sale/<int:pk>/update", SaleUpdateView.as_view(), name="update_sale"),
     path("sale/<int:pk>/delete", SaleDeleteView.as_view(), name="delete_sale"),
+    path("sale/import/", import_sales, name="import_sales"),
     path("customers", CustomerListView.as_view(), name="customers"),
     path("customer/new/", CustomerCreateView.as_view(), name="new_customer"),
     path("customer/<int:pk>/update", CustomerUpdateView.as_view(), name="update_customer"),
@@ -26,6 +27,8 @@ urlpatterns = [
     path('booking/', CalendarView.as_view(), name='booking_calendar'),
     path('booking/create/', create_appointment, name='create_appointment'),
     path('booking/get_slots/', get_available_time_slots, name='get_time_slots'),
+    path('booking/free_personnel/', free_personnel_view, name='free_personnel'),
+    path('metrics/', metrics_view, name='metrics'),
     path('booking/appointments/', appointment_list, name='appointment_list'),
     path('booking/update/<int:pk>/', update_appointment, name='update_appointment'),
     path('booking/delete/<int:pk>/', delete_appointment, name='delete_appointment'),
@@ -35,11 +38,14 @@ urlpatterns = [
     path('treasury-dashboard/', TreasuryDashboardView.as_view(), name='treasury_dashboard'),
     path('sale_image/delete/', delete_sale_image, name='delete_sale_image'),
     path('gallery/', gallery_view, name='gallery'),
+    path('gallery/images/', gallery_images_api, name='gallery_images'),
+    path('customers/search/', customer_search, name='customer_search'),
     path('pay/<int:pk>/update/', PayUpdateView.as_view(), name='update_pay'),
     path('pay/<int:pk>/delete/', PayUpdateView.as_view(), name='delete_pay'),
     path('receipt/<int:pk>/update/', ReceiptUpdateView.as_view(), name='update_receipt'),
     path('receipt/<int:pk>/delete/', PayUpdateView.as_view(), name='delete_receipt'),
     path('sale/<int:sale_id>/images/', sale_images_view, name='sale_images'),
+    path('sale/<int:sale_id>/images/status/', sale_image_status, name='sale_image_status'),
     path("finance/", finance_menu, name="finance_menu"),
     path("settings/", settings_menu, name="settings_menu"),
     path("personnels/", PersonnelListView.as_view(), name="personnel_list"),
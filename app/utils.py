@@ -1,7 +1,8 @@
-from datetime import date
+from datetime import date, datetime
 from io import BytesIO
 from PIL import Image
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.utils import timezone
 import jdatetime
 
 def is_admin(user):
@@ -16,14 +17,30 @@ def is_admin(user):
 MAX_SIZE = (1024, 1024)
 JPEG_QUALITY = 75
 
-def compress_image(file):
-    image = Image.open(file)
+# اندازه‌های نسخه‌های هر تصویر (بیشترین طول یا عرض) که در هر دو فرمت ساخته می‌شوند
+IMAGE_VARIANT_SIZES = {"thumb": 320, "medium": 640, "full": MAX_SIZE[0]}
+IMAGE_VARIANT_FORMATS = {"jpeg": "JPEG", "webp": "WEBP"}
+
+def build_image_variants(data):
+    """
+    ساخت همه نسخه‌های یک تصویر؛ خروجی لیست (اندازه، فرمت، بایت‌ها، عرض، ارتفاع).
+    بدون وابستگی به جنگو تا در پروسس‌های worker هم قابل اجرا باشد.
+    """
+    image = Image.open(BytesIO(data))
     if image.mode in ("RGBA", "P"):
         image = image.convert("RGB")
-    image.thumbnail(MAX_SIZE, Image.Resampling.LANCZOS)
-    buffer = BytesIO()
-    image.save(buffer, format="JPEG", quality=JPEG_QUALITY)
-    return ContentFile(buffer.getvalue(), name=file.name.split('.')[0] + ".jpg")
+    variants = []
+    for size, limit in sorted(IMAGE_VARIANT_SIZES.items(), key=lambda item: -item[1]):
+        # تصویری که از این اندازه کوچک‌تر است نسخه‌ای با همان عرض تکراری می‌دهد؛ full همیشه ساخته می‌شود
+        if variants and max(image.size) <= limit:
+            continue
+        # هر اندازه از اندازه بزرگ‌تر قبلی ساخته می‌شود تا resize ارزان‌تر باشد
+        image.thumbnail((limit, limit), Image.Resampling.LANCZOS)
+        for fmt, pil_format in IMAGE_VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, format=pil_format, quality=JPEG_QUALITY)
+            variants.append((size, fmt, buffer.getvalue(), image.width, image.height))
+    return variants
 
 def gregorian_to_jalali_parts(gdatetime):
     jalali_dt = jdatetime.datetime.fromgregorian(datetime=gdatetime)
@@ -69,4 +86,10 @@ def jalali_to_gregorian(jalali_str: str) -> date:
     parts = list(map(int, jalali_str.split("-")))
     date_val = jdatetime.date(parts[0], parts[1], parts[2]).togregorian()
     
-    return date_val
\ No newline at end of file
+    return date_val
+
+
+def day_start(day):
+    """ابتدای روز (۰۰:۰۰ به وقت محلی) برای فیلتر بازه‌ای روی فیلدهای datetime"""
+    start = datetime.combine(day, datetime.min.time())
+    return timezone.make_aware(start) if settings.USE_TZ else start
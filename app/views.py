@@ -1,5 +1,6 @@
 import json
 from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse_lazy, NoReverseMatch, reverse
 from app.models import *
@@ -9,19 +10,34 @@ from django.utils import timezone
 from jalali_date import datetime2jalali
 from django.db.models import Sum, F, Q, Count, Max, Min, DateField
 from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
 from datetime import datetime as gdatetime, timedelta
 from app.forms import *
 from django.contrib.auth.decorators import login_required,user_passes_test
 from django.utils.decorators import method_decorator
-from .utils import is_admin,compress_image, persian_to_english, english_to_persian, jalali_to_gregorian
+from .utils import day_start, is_admin, persian_to_english, english_to_persian, jalali_to_gregorian
 import jdatetime
 import pandas as pd
 from app.mixins import UserTrackMixin
 from django.db.models.functions import TruncDate
 from .sms import customer_sms, personnel_sms, send_sms
+from . import treasury
+from .sale_import import SaleImporter, SaleImportError
+from .image_jobs import queue_sale_image
+from .gallery import decode_cursor as decode_gallery_cursor, gallery_page
+from .slots import DEFAULT_DURATION_MINUTES, free_slots
+from .availability import free_personnel
+from .booking import BookingConflict, save_appointment
+from .customer_search import search_customers, search_page
+from .refdata import reference_data
+from .log_utils import lazy
+from .metrics import registry as metrics_registry
+from .ledger import LEDGER_PAGE_SIZE, decode_cursor, encode_cursor, ledger_page, ledger_totals
 import logging
 from django.db.models.functions import Cast
-from django.utils.dateparse import parse_date
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 
 
 
@@ -134,10 +150,7 @@ class SaleUpdateView(UserTrackMixin, UpdateView):
         # تصاویر قبل
         before_images = self.request.FILES.getlist("images_before")
         for img in before_images[:1]:
-            compressed = compress_image(img)
-            SaleImage.objects.create(
-                sale=self.object, image=compressed, image_type=SaleImage.BEFORE
-            )
+            queue_sale_image(self.object, img, SaleImage.BEFORE)
             logger.info(
                 "Before image added to sale",
                 extra={"sale_id": self.object.id, "filename": img.name},
@@ -146,10 +159,7 @@ class SaleUpdateView(UserTrackMixin, UpdateView):
         # تصاویر بعد
         after_images = self.request.FILES.getlist("images_after")
         for img in after_images[:3]:
-            compressed = compress_image(img)
-            SaleImage.objects.create(
-                sale=self.object, image=compressed, image_type=SaleImage.AFTER
-            )
+            queue_sale_image(self.object, img, SaleImage.AFTER)
             logger.info(
                 "After image added to sale",
                 extra={"sale_id": self.object.id, "filename": img.name},
@@ -184,7 +194,7 @@ class SaleListView(ListView):
     context_object_name = "sales"
 
     def get_queryset(self):
-        qs = Sale.objects.all()
+        qs = Sale.objects.select_related("customer", "personnel", "work")
         request = self.request
 
         # گرفتن تاریخ از فرم فیلتر
@@ -198,7 +208,7 @@ class SaleListView(ListView):
             else:
                 target_date = timezone.now().date()
 
-            start_dt = gdatetime.combine(target_date, gdatetime.min.time())
+            start_dt = day_start(target_date)
             end_dt = start_dt + timedelta(days=1)
 
             # دسترسی مدیر
@@ -210,7 +220,7 @@ class SaleListView(ListView):
                     extra={
                         "user": request.user.id,
                         "date": str(target_date),
-                        "count": qs.count(),
+                        "count": lazy(qs.count),
                     },
                 )
 
@@ -236,7 +246,7 @@ class SaleListView(ListView):
                             "user": request.user.id,
                             "personnel": personnel.id,
                             "date": str(target_date),
-                            "count": qs.count(),
+                            "count": lazy(qs.count),
                         },
                     )
 
@@ -273,10 +283,9 @@ class SaleListView(ListView):
         sales = context["sales"]
 
         # مجموع‌ها
-        context["total_price"] = sales.aggregate(total=Sum("price"))["total"] or 0
-        context["total_commission"] = (
-            sales.aggregate(total=Sum("commission_amount"))["total"] or 0
-        )
+        totals = sales.aggregate(price=Sum("price"), commission=Sum("commission_amount"))
+        context["total_price"] = totals["price"] or 0
+        context["total_commission"] = totals["commission"] or 0
 
         return context
 
@@ -308,6 +317,8 @@ def delete_sale_image(request):
             )
             return JsonResponse({'status': 'error'})
 
+    return JsonResponse({'status': 'error', 'message': 'متد غیرمجاز'}, status=405)
+
 class SaleDeleteView(DeleteView):
     template_name = "app/delete_sale.html"
     model = Sale
@@ -329,6 +340,27 @@ class SaleDeleteView(DeleteView):
         )
         return response
 
+@login_required
+@user_passes_test(is_admin)
+def import_sales(request):
+    result = None
+    if request.method == "POST":
+        form = SaleImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            importer = SaleImporter(user=request.user, dry_run=form.cleaned_data["dry_run"])
+            try:
+                result = importer.run(upload, upload.name)
+            except SaleImportError as e:
+                form.add_error("file", str(e))
+            else:
+                if result.created:
+                    messages.success(request, f"{result.created} فاکتور ثبت شد.")
+    else:
+        form = SaleImportForm()
+
+    return render(request, "app/import_sales.html", {"form": form, "result": result})
+
 class CustomerCreateView(CreateView):
     template_name = "app/new_customer.html"
     form_class = CustomerForm
@@ -449,22 +481,18 @@ class CustomerDeleteView(DeleteView):
 
 def get_payment_data(request):
     try:
-        payment_methods = list(PaymentMethod.objects.all().values("id", "name", "requires_bank"))
-        banks = list(Bank.objects.all().values("id", "name"))
+        data = reference_data()
 
         logger.info(
             "Payment data retrieved successfully",
             extra={
                 "user": getattr(request.user, "id", None),
-                "payment_methods_count": len(payment_methods),
-                "banks_count": len(banks),
+                "payment_methods_count": len(data.payment_methods),
+                "banks_count": len(data.banks),
             },
         )
 
-        return JsonResponse({
-            "payment_methods": payment_methods,
-            "banks": banks
-        })
+        return JsonResponse({"payment_methods": data.payment_methods, "banks": data.banks})
 
     except Exception as e:
         logger.error(
@@ -545,6 +573,8 @@ def save_receipts(request):
             )
             return JsonResponse({"status": "error", "message": "خطا در ثبت دریافت‌ها"}, status=500)
 
+    return JsonResponse({"status": "error", "message": "متد غیرمجاز"}, status=405)
+
 
 # class TransactionCreateView(CreateView):
 #     template_name = "app/new_transaction.html"
@@ -733,7 +763,7 @@ class PayListView(ListView):
                 )
 
 
-        qs = qs.filter(date__range=[from_date, to_date])
+        qs = qs.filter(date__range=[from_date, to_date]).select_related("pay_type", "personnel", "bank")
         self.from_date = from_date
         self.to_date = to_date
 
@@ -743,7 +773,7 @@ class PayListView(ListView):
                 "user": getattr(self.request.user, "id", None),
                 "from_date": str(from_date),
                 "to_date": str(to_date),
-                "count": qs.count(),
+                "count": lazy(qs.count),
             },
         )
 
@@ -759,19 +789,12 @@ class PayListView(ListView):
             jdatetime.date.fromgregorian(date=self.to_date).strftime("%Y/%m/%d")
         )
 
-        # Select2 JSON data
-        context["pay_types_json"] = json.dumps(
-            [{"id": pt.id, "name": pt.name, "is_personnel": pt.is_personnel} for pt in PayType.objects.all()]
-        )
-        context["personnel_json"] = json.dumps(
-            [{"id": p.id, "name": f"{p.fname}-{p.lname}"} for p in Personnel.objects.all()]
-        )
-        context["source_types_json"] = json.dumps(
-            [{"id": st.id, "name": st.name, "requires_bank": st.requires_bank} for st in PaymentMethod.objects.all()]
-        )
-        context["banks_json"] = json.dumps(
-            [{"id": b.id, "name": b.name} for b in Bank.objects.all()]
-        )
+        # Select2 JSON data از کش داده‌های پایه
+        refs = reference_data()
+        context["pay_types_json"] = refs.json["pay_types"]
+        context["personnel_json"] = refs.json["personnel"]
+        context["source_types_json"] = refs.json["payment_methods"]
+        context["banks_json"] = refs.json["banks"]
         
         return context
 
@@ -825,7 +848,7 @@ class ReceiptListView(ListView):
                     },
                 )
 
-        qs = qs.filter(date__range=[from_date, to_date])
+        qs = qs.filter(date__range=[from_date, to_date]).select_related("receipt_type", "customer", "bank")
 
         self.from_date = from_date
         self.to_date = to_date
@@ -836,7 +859,7 @@ class ReceiptListView(ListView):
                 "user": getattr(self.request.user, "id", None),
                 "from_date": str(from_date),
                 "to_date": str(to_date),
-                "count": qs.count(),
+                "count": lazy(qs.count),
             },
         )
 
@@ -867,7 +890,7 @@ logger = logging.getLogger(__name__)
 class LedgerReportView(ListView):
     template_name = "app/ledger_report.html"
     context_object_name = "transactions"
-    paginate_by = 50
+    page_size = LEDGER_PAGE_SIZE
 
     def get_default_dates(self):
         end_date = timezone.now().date()
@@ -879,162 +902,156 @@ class LedgerReportView(ListView):
             'default_end_date_str': end_date.strftime('%Y-%m-%d')
         }
 
-    def get_queryset(self):
-        bank_id = self.request.GET.get("bank")
-        start_date_str = self.request.GET.get("start_date")
-        end_date_str = self.request.GET.get("end_date")
-        payment_method_id = self.request.GET.get("payment_method")
-
-        default_dates = self.get_default_dates()
+    def parse_report_date(self, value, default):
+        # فرم تاریخ جلالی (1404/06/05) می‌فرستد؛ تاریخ میلادی ISO هم پذیرفته می‌شود
+        if not value:
+            return default
         try:
-            start_date = parse_date(start_date_str) if start_date_str else default_dates['default_start_date']
-            end_date = parse_date(end_date_str) if end_date_str else default_dates['default_end_date']
+            year, month, day = map(int, persian_to_english(value).replace('/', '-').split('-'))
+            if year < 1700:
+                return jdatetime.date(year, month, day).togregorian()
+            return gdatetime(year, month, day).date()
         except Exception as e:
             logger.warning(
-                "LedgerReportView: Failed to parse start/end date",
+                "LedgerReportView: Failed to parse date",
                 extra={
                     "user": getattr(self.request.user, "id", None),
-                    "start_date_str": start_date_str,
-                    "end_date_str": end_date_str,
+                    "input_date": value,
                     "error": str(e)
                 }
             )
-            start_date = default_dates['default_start_date']
-            end_date = default_dates['default_end_date']
-
-        pay_qs = Pay.objects.select_related('pay_type', 'source_type', 'bank').all()
-        receipt_qs = Receipt.objects.select_related('receipt_type', 'source_type', 'bank').all()
-
-        # فیلتر تاریخ
-        pay_qs = pay_qs.filter(date__gte=start_date, date__lte=end_date)
-        receipt_qs = receipt_qs.filter(date__gte=start_date, date__lte=end_date)
-
-        # فیلتر بانک
-        if bank_id:
-            pay_qs = pay_qs.filter(bank_id=bank_id)
-            receipt_qs = receipt_qs.filter(bank_id=bank_id)
-
-        # فیلتر روش پرداخت
-        if payment_method_id:
-            pay_qs = pay_qs.filter(source_type_id=payment_method_id)
-            receipt_qs = receipt_qs.filter(source_type_id=payment_method_id)
-
-        pay_list = [{'obj': p, 'type': 'pay', 'amount': -p.amount} for p in pay_qs]
-        receipt_list = [{'obj': r, 'type': 'receipt', 'amount': r.amount} for r in receipt_qs]
+            return default
+
+    def get_filters(self):
+        if not hasattr(self, "_filters"):
+            default_dates = self.get_default_dates()
+            self._filters = {
+                "start_date": self.parse_report_date(self.request.GET.get("start_date"), default_dates['default_start_date']),
+                "end_date": self.parse_report_date(self.request.GET.get("end_date"), default_dates['default_end_date']),
+                "bank_id": self.request.GET.get("bank") or None,
+                "payment_method_id": self.request.GET.get("payment_method") or None,
+            }
+        return self._filters
+
+    def get_opening_balance(self):
+        # مانده ابتدای بازه از نزدیک‌ترین مانده پایان روز ذخیره‌شده (app/treasury.py)
+        filters = self.get_filters()
+        return treasury.opening_balance(
+            filters["start_date"],
+            bank_id=filters["bank_id"],
+            payment_method_id=filters["payment_method_id"],
+        )
 
-        all_tx = sorted(pay_list + receipt_list, key=lambda x: (x['obj'].date, getattr(x['obj'], 'id', 0)))
+    def get_queryset(self):
+        filters = self.get_filters()
+        self.cursor = decode_cursor(self.request.GET.get("after"))
+        self.opening_balance = self.get_opening_balance()
+
+        # صفحه اول از مانده اولیه شروع می‌شود و صفحات بعد از مانده‌ای که ledger_page برای کرسر حساب می‌کند
+        rows, self.next_cursor = ledger_page(
+            filters["start_date"],
+            filters["end_date"],
+            bank_id=filters["bank_id"],
+            payment_method_id=filters["payment_method_id"],
+            after=self.cursor,
+            opening=self.opening_balance,
+            limit=self.page_size,
+        )
 
         logger.info(
-            "Ledger report queryset prepared",
+            "Ledger report page prepared",
             extra={
                 "user": getattr(self.request.user, "id", None),
-                "bank_id": bank_id,
-                "payment_method_id": payment_method_id,
-                "start_date": str(start_date),
-                "end_date": str(end_date),
-                "total_transactions": len(all_tx),
+                "bank_id": filters["bank_id"],
+                "payment_method_id": filters["payment_method_id"],
+                "start_date": str(filters["start_date"]),
+                "end_date": str(filters["end_date"]),
+                "page_transactions": len(rows),
             }
         )
 
-        return all_tx
+        return rows
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         default_dates = self.get_default_dates()
-        bank_id = self.request.GET.get("bank")
-        start_date_str = self.request.GET.get("start_date", default_dates['default_start_date_str'])
-        end_date_str = self.request.GET.get("end_date", default_dates['default_end_date_str'])
-
-        try:
-            start_date_j = jdatetime.date.fromisoformat(start_date_str.replace('/','-'))
-            start_date = start_date_j.togregorian()
-            end_date_j = jdatetime.date.fromisoformat(end_date_str.replace('/','-'))
-            end_date = end_date_j.togregorian()
-        except Exception as e:
-            logger.warning(
-                "LedgerReportView: Failed to convert start/end dates to Gregorian",
-                extra={
-                    "user": getattr(self.request.user, "id", None),
-                    "start_date_str": start_date_str,
-                    "end_date_str": end_date_str,
-                    "error": str(e)
-                }
-            )
-            start_date = default_dates['default_start_date']
-            end_date = default_dates['default_end_date']
-
-        # موجودی اولیه
-        opening_balance = 0
-        if bank_id:
-            opening_balance += sum(p.amount for p in Pay.objects.filter(bank_id=bank_id, date__lt=start_date))
-            opening_balance -= sum(r.amount for r in Receipt.objects.filter(bank_id=bank_id, date__lt=start_date))
-        else:
-            opening_balance += sum(p.amount for p in Pay.objects.filter(date__lt=start_date))
-            opening_balance -= sum(r.amount for r in Receipt.objects.filter(date__lt=start_date))
+        filters = self.get_filters()
+        start_date = filters["start_date"]
+        end_date = filters["end_date"]
+        opening_balance = self.opening_balance
+
+        totals = ledger_totals(
+            start_date,
+            end_date,
+            bank_id=filters["bank_id"],
+            payment_method_id=filters["payment_method_id"],
+        )
+        closing_balance = opening_balance + totals["receipt_total"] - totals["pay_total"]
 
-        running_balance = opening_balance
-        total_amount = opening_balance
-        increase_count = 0
-        decrease_count = 0
         rows = []
-
-        if opening_balance != 0:
+        if opening_balance != 0 and self.cursor is None:
             rows.append({
-                "tx": type("Tx", (), {
+                "tx": {
                     "date": start_date,
-                    "transaction_type": type("TType", (), {"name": "مانده اولیه"})(),
+                    "transaction_type": {"name": "مانده اولیه"},
                     "amount": opening_balance,
                     "description": ""
-                })(),
+                },
                 "balance": opening_balance,
                 "amount_with_effect": None,
                 "is_opening": True
             })
 
         for item in context["transactions"]:
-            tx = item['obj']
-            amount_with_effect = item['amount']
-            running_balance += amount_with_effect
-            total_amount += amount_with_effect
-
-            if item['type'] == 'receipt':
-                increase_count += 1
-            else:
-                decrease_count += 1
-
             rows.append({
-                "tx": tx,
-                "balance": running_balance,
-                "amount_with_effect": amount_with_effect,
-                "type": item['type'],
+                "tx": item,
+                "balance": item["balance"],
+                "amount_with_effect": item["signed_amount"],
+                "type": item["kind"],
                 "is_opening": False
             })
 
-        payment_methods = PaymentMethod.objects.all()
-        default_payment_method = payment_methods.filter(requires_bank=False).first() or payment_methods.first()
+        # پیوند صفحات با حفظ فیلترهای فعلی
+        query = self.request.GET.copy()
+        query.pop("after", None)
+        first_page_query = query.urlencode()
+        next_page_query = None
+        if self.next_cursor is not None:
+            query["after"] = encode_cursor(self.next_cursor)
+            next_page_query = query.urlencode()
+
+        refs = reference_data()
+        payment_methods = refs.payment_methods
+        default_payment_method = next(
+            (method for method in payment_methods if not method["requires_bank"]),
+            payment_methods[0] if payment_methods else None,
+        )
 
         context.update({
             "opening_balance": opening_balance,
-            "closing_balance": running_balance,
+            "closing_balance": closing_balance,
             "rows": rows,
-            "total_amount": total_amount,
-            "increase_count": increase_count,
-            "decrease_count": decrease_count,
+            "total_amount": closing_balance,
+            "increase_count": totals["receipt_count"],
+            "decrease_count": totals["pay_count"],
             "payment_methods": payment_methods,
             "default_payment_method": default_payment_method,
-            "banks": Bank.objects.all(),
-            "default_start_date": start_date_str,
-            "default_end_date": end_date_str,
+            "banks": refs.banks,
+            "default_start_date": self.request.GET.get("start_date", default_dates['default_start_date_str']),
+            "default_end_date": self.request.GET.get("end_date", default_dates['default_end_date_str']),
             "selected_start_date": start_date,
             "selected_end_date": end_date,
-            "bank_id": bank_id,
+            "bank_id": filters["bank_id"],
+            "is_first_page": self.cursor is None,
+            "first_page_query": first_page_query,
+            "next_page_query": next_page_query,
         })
 
         logger.info(
             "Ledger report context prepared",
             extra={
                 "user": getattr(self.request.user, "id", None),
-                "bank_id": bank_id,
+                "bank_id": filters["bank_id"],
                 "start_date": str(start_date),
                 "end_date": str(end_date),
                 "rows_count": len(rows)
@@ -1049,80 +1066,36 @@ class TreasuryDashboardView(ListView):
     context_object_name = "methods"
 
     def get_queryset(self):
-        methods = []
-
-        payment_methods = PaymentMethod.objects.all()
-        logger.info(f"TreasuryDashboard: calculating for {payment_methods.count()} payment methods",
-                    extra={"user": getattr(self.request.user, "id", None)})
-
-        for method in payment_methods:
-            if method.requires_bank:
-                for bank in Bank.objects.all():
-                    try:
-                        total_receipt = Receipt.objects.filter(source_type=method, bank=bank).aggregate(
-                            total=models.Sum('amount'))['total'] or 0
-                        total_pay = Pay.objects.filter(source_type=method, bank=bank).aggregate(
-                            total=models.Sum('amount'))['total'] or 0
-                        balance = total_receipt - total_pay
-
-                        last_tx_date_receipt = Receipt.objects.filter(source_type=method, bank=bank).order_by('-date').first()
-                        last_tx_date_pay = Pay.objects.filter(source_type=method, bank=bank).order_by('-date').first()
-                        last_tx_date = max(filter(None, [
-                            last_tx_date_receipt.date if last_tx_date_receipt else None,
-                            last_tx_date_pay.date if last_tx_date_pay else None
-                        ]), default=None)
-
-                        methods.append({
-                            "name": f"{method.name} - {bank.name}",
-                            "balance": balance,
-                            "last_tx_date": last_tx_date,
-                            "payment_method_id": method.id,
-                            "bank_id": bank.id,
-                        })
+        # مانده‌ها توسط سیگنال‌های Pay/Receipt به‌روز نگه داشته می‌شوند (app/treasury.py)
+        snapshots = {
+            (snapshot.source_type_id, snapshot.bank_id): snapshot
+            for snapshot in BalanceSnapshot.objects.all()
+        }
+        data = reference_data()
+        banks = {bank["id"]: bank for bank in data.banks}
+
+        def entry(method, bank, snapshot):
+            return {
+                "name": f"{method['name']} - {bank['name']}" if bank else method["name"],
+                "balance": snapshot.balance if snapshot else 0,
+                "last_tx_date": snapshot.last_tx_date if snapshot else None,
+                "payment_method_id": method["id"],
+                "bank_id": bank["id"] if bank else None,
+            }
 
-                        logger.debug(
-                            f"TreasuryDashboard: {method.name} - {bank.name}, balance={balance}, last_tx={last_tx_date}",
-                            extra={"user": getattr(self.request.user, "id", None)}
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"TreasuryDashboard: Failed to process {method.name} - {bank.name}: {e}",
-                            extra={"user": getattr(self.request.user, "id", None)}
-                        )
-            else:
-                try:
-                    total_receipt = Receipt.objects.filter(source_type=method, bank__isnull=True).aggregate(
-                        total=models.Sum('amount'))['total'] or 0
-                    total_pay = Pay.objects.filter(source_type=method, bank__isnull=True).aggregate(
-                        total=models.Sum('amount'))['total'] or 0
-                    balance = total_receipt - total_pay
-
-                    last_tx_date_receipt = Receipt.objects.filter(source_type=method, bank__isnull=True).order_by('-date').first()
-                    last_tx_date_pay = Pay.objects.filter(source_type=method, bank__isnull=True).order_by('-date').first()
-                    last_tx_date = max(filter(None, [
-                        last_tx_date_receipt.date if last_tx_date_receipt else None,
-                        last_tx_date_pay.date if last_tx_date_pay else None
-                    ]), default=None)
-
-                    methods.append({
-                        "name": method.name,
-                        "balance": balance,
-                        "last_tx_date": last_tx_date,
-                        "payment_method_id": method.id,
-                        "bank_id": None,
-                    })
+        # مثل قبل همه ترکیب‌های روش × بانک، حتی با موجودی صفر
+        methods = []
+        for method in data.payment_methods:
+            for bank in data.banks if method["requires_bank"] else [None]:
+                methods.append(entry(method, bank, snapshots.pop((method["id"], bank["id"] if bank else None), None)))
 
-                    logger.debug(
-                        f"TreasuryDashboard: {method.name}, balance={balance}, last_tx={last_tx_date}",
-                        extra={"user": getattr(self.request.user, "id", None)}
-                    )
-                except Exception as e:
-                    logger.warning(
-                        f"TreasuryDashboard: Failed to process {method.name}: {e}",
-                        extra={"user": getattr(self.request.user, "id", None)}
-                    )
+        # مانده‌های خارج از این چیدمان، مثلاً روش بانکی بعد از حذف بانک، هم نمایش داده می‌شوند
+        method_by_id = {method["id"]: method for method in data.payment_methods}
+        for (method_id, bank_id), snapshot in snapshots.items():
+            if snapshot.balance and method_id in method_by_id:
+                methods.append(entry(method_by_id[method_id], banks.get(bank_id), snapshot))
 
-        logger.info(f"TreasuryDashboard: completed, total entries={len(methods)}",
+        logger.info("TreasuryDashboard: completed, total entries=%s", len(methods),
                     extra={"user": getattr(self.request.user, "id", None)})
 
         return methods
@@ -1158,7 +1131,7 @@ def create_user_view(request):
 @user_passes_test(is_admin)
 def user_list_view(request):
     users = User.objects.all()
-    logger.info(f"user_list_view accessed, total users: {users.count()}", extra={"user": getattr(request.user, "id", None)})
+    logger.info("user_list_view accessed, total users: %s", lazy(users.count), extra={"user": getattr(request.user, "id", None)})
     return render(request, 'app/user_list.html', {'users': users})
 
 
@@ -1169,48 +1142,29 @@ class CalendarView(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
+        refs = reference_data()
         personnel_user = getattr(self.request.user, "personnel_profile", None)
         if self.request.user.is_superuser:
-            personnel_list = Personnel.objects.all()
+            personnel_list = refs.personnel
         else:
-
-            personnel_user = getattr(self.request.user, "personnel_profile", None)
-            personnel_list = Personnel.objects.filter(id=personnel_user.personnel.id if personnel_user else None)
-        customer_list = Customer.objects.all()
-        work_list = Work.objects.all()
-        appointments = Appointment.objects.select_related('customer', 'personnel', 'work').all()
-
+            own_id = personnel_user.personnel_id if personnel_user else None
+            personnel_list = [personnel for personnel in refs.personnel if personnel["id"] == own_id]
+        # مشتریان در فرم رزرو با جستجوی customer_search بارگذاری می‌شوند و رزروها با appointment_list
         context.update({
             'personnel_list': personnel_list,
-            'customer_list': customer_list,
-            'work_list': work_list,
-            'appointments': appointments,
+            'work_list': refs.works,
         })
 
-        logger.info(
-            f"CalendarView context prepared, personnel: {personnel_list.count()}, customers: {customer_list.count()}, appointments: {appointments.count()}",
-            extra={"user": getattr(self.request.user, "id", None)}
-        )
-
-
-            
-        
-        
         if personnel_user:
             # context['personnel_list'] = Personnel.objects.filter(id=personnel_user.personnel.id)
-            context['selected_personnel'] = personnel_user.personnel.id
+            context['selected_personnel'] = personnel_user.personnel_id
         else:
 
             personnel_filter_id = self.request.GET.get('personnel')
-            if not personnel_filter_id :
-                personnel_filter = Personnel.objects.first()
-                personnel_filter_id = personnel_filter.id
+            if not personnel_filter_id and refs.personnel:
+                personnel_filter_id = refs.personnel[0]["id"]
             context['selected_personnel'] = personnel_filter_id
 
-        context['customer_list'] = Customer.objects.all()
-        context['work_list'] = Work.objects.all()
-        context['appointments'] = Appointment.objects.select_related('customer', 'personnel', 'work').all()
-
         return context
 
 
@@ -1248,28 +1202,22 @@ def create_appointment(request):
                     'error_details': str(e)
                 }, status=400)
 
-            # بررسی تداخل فقط برای همان پرسنل
-            conflict = Appointment.objects.filter(
-                personnel_id=personnel_id,
-                start_time__lt=end_time,
-                end_time__gt=start_time
-            ).exists()
-
-            if conflict:
+            # بررسی تداخل و ثبت زیر قفل همان پرسنل
+            try:
+                appointment = save_appointment(Appointment(
+                    customer_id=customer_id,
+                    work_id=work_id,
+                    personnel_id=personnel_id,
+                    start_time=start_time,
+                    end_time=end_time
+                ))
+            except BookingConflict as e:
                 logger.warning("Appointment conflict detected", extra={"personnel_id": personnel_id, "start_time": start_time, "end_time": end_time, "user": getattr(request.user, "id", None)})
                 return JsonResponse({
                     'status': 'error',
-                    'message': 'این بازه زمانی قبلاً برای این پرسنل رزرو شده است.'
+                    'message': str(e)
                 }, status=400)
 
-            # اگر تداخلی نبود، ایجاد رزرو
-            appointment = Appointment.objects.create(
-                customer_id=customer_id,
-                work_id=work_id,
-                personnel_id=personnel_id,
-                start_time=start_time,
-                end_time=end_time
-            )
             logger.info("Appointment created successfully", extra={"appointment_id": appointment.id, "user": getattr(request.user, "id", None)})
 
             # ارسال پیامک به مشتری
@@ -1310,33 +1258,119 @@ def create_appointment(request):
         'message': 'متد غیرمجاز'
     }, status=405)
 
+MAX_SLOT_DAYS = 31
+
+
+def parse_slot_date(value):
+    """
+    تاریخ میلادی (2025-09-22) یا جلالی (۱۴۰۴/۰۶/۳۱)؛ سال کمتر از ۱۷۰۰ جلالی در نظر گرفته می‌شود.
+    تاریخ جلالی پیش از تبدیل با تقویم میلادی سنجیده نمی‌شود (۳۱ شهریور در میلادی روز نامعتبری است).
+    """
+    value = persian_to_english(value).strip().replace("/", "-")
+    if int(value.split("-", 1)[0]) < 1700:
+        return jalali_to_gregorian(value)
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f"invalid date: {value}")
+    return day
+
+
 @login_required
 def get_available_time_slots(request):
-    personnel_id = request.GET.get('personnel_id')
+    """
+    نوبت‌های آزاد یک یا چند پرسنل (personnel_id=1,2) از روز date به مدت days روز
+    برای خدمتی به مدت duration دقیقه؛ همه رزروها با یک کوئری خوانده می‌شوند.
+    """
+    personnel_param = ",".join(request.GET.getlist('personnel_id'))
     date = request.GET.get('date')
-    logger.info("Accessed get_available_time_slots", extra={"user": getattr(request.user, "id", None), "personnel_id": personnel_id, "date": date})
+    logger.info("Accessed get_available_time_slots", extra={"user": getattr(request.user, "id", None), "personnel_id": personnel_param, "date": date})
 
-    if not personnel_id or not date:
+    if not personnel_param or not date:
         logger.warning("Missing required parameters", extra={"user": getattr(request.user, "id", None)})
         return JsonResponse({'status': 'error', 'message': 'پارامترهای ضروری ارسال نشده'}, status=400)
-    
+
     try:
-        appointments = Appointment.objects.filter(
-            personnel_id=personnel_id,
-            start_time__date=date
-        ).order_by('start_time')
-        logger.info(f"Found {appointments.count()} appointments for personnel {personnel_id} on {date}", extra={"user": getattr(request.user, "id", None)})
+        personnel_ids = [int(pk) for pk in personnel_param.split(",") if pk.strip()]
+        first_day = parse_slot_date(date)
+        days = min(max(int(request.GET.get('days', 1)), 1), MAX_SLOT_DAYS)
+        duration = int(request.GET.get('duration', 0)) or None
+    except (TypeError, ValueError):
+        logger.warning("Invalid slot parameters", extra={"user": getattr(request.user, "id", None), "params": request.GET.dict()})
+        return JsonResponse({'status': 'error', 'message': 'پارامترها نامعتبر است'}, status=400)
 
-        # اینجا منطق محاسبه زمان‌های خالی را پیاده‌سازی کنید
-        slots = ['08:00', '10:00', '12:00', '14:00', '16:00', '18:00', '20:00']
-        
-        return JsonResponse({'status': 'success', 'slots': slots})
+    try:
+        day_list = [first_day + timedelta(days=offset) for offset in range(days)]
+        availability = free_slots(personnel_ids, day_list, duration_minutes=duration, now=timezone.now())
+
+        data = {
+            str(personnel_id): {
+                day.isoformat(): [timezone.localtime(slot).strftime("%H:%M") if settings.USE_TZ else slot.strftime("%H:%M") for slot in slots]
+                for day, slots in by_day.items()
+            }
+            for personnel_id, by_day in availability.items()
+        }
+        # سازگاری با پاسخ قبلی: slots برای اولین پرسنل در روز date
+        first = data.get(str(personnel_ids[0]), {}).get(first_day.isoformat(), []) if personnel_ids else []
+        return JsonResponse({'status': 'success', 'slots': first, 'availability': data})
     except Exception as e:
-        logger.error("Failed to get available time slots", exc_info=True, extra={"user": getattr(request.user, "id", None), "personnel_id": personnel_id, "date": date})
+        logger.error("Failed to get available time slots", exc_info=True, extra={"user": getattr(request.user, "id", None), "personnel_id": personnel_param, "date": date})
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 
+@login_required
+def free_personnel_view(request):
+    """
+    پرسنلی که از start به مدت duration دقیقه آزادند (مثلاً «چه کسی ساعت ۱۷:۳۰ برای ۹۰ دقیقه آزاد است؟»)؛
+    پاسخ از نقشه بیتی روزانه و بدون پیمایش رزروها ساخته می‌شود.
+    """
+    logger.info("Accessed free_personnel", extra={"user": getattr(request.user, "id", None), "params": request.GET.dict()})
+    try:
+        start = parse_feed_datetime(request.GET.get('start'))
+        duration = int(request.GET.get('duration', 0)) or DEFAULT_DURATION_MINUTES
+        personnel_param = ",".join(request.GET.getlist('personnel_id'))
+        personnel_ids = [int(pk) for pk in personnel_param.split(",") if pk.strip()] or None
+    except (TypeError, ValueError):
+        start = None
+    if start is None or duration <= 0:
+        logger.warning("Invalid free personnel parameters", extra={"user": getattr(request.user, "id", None), "params": request.GET.dict()})
+        return JsonResponse({'status': 'error', 'message': 'پارامترها نامعتبر است'}, status=400)
+
+    free_ids = free_personnel(start, duration, personnel_ids)
+    names = dict(
+        (row["id"], f"{row['fname']} {row['lname']}")
+        for row in Personnel.objects.filter(id__in=free_ids).values("id", "fname", "lname")
+    ) if free_ids else {}
+    return JsonResponse({
+        'status': 'success',
+        'personnel': [{'id': personnel_id, 'name': names.get(personnel_id, '')} for personnel_id in free_ids],
+    })
+
+
+APPOINTMENT_FEED_DEFAULT_DAYS = (7, 42)
+
+
+def parse_feed_datetime(value):
+    """تاریخ start/end ارسالی FullCalendar (ISO با یا بدون ساعت و منطقه زمانی)"""
+    if not value:
+        return None
+    value = value.replace(" ", "+")  # '+' در query string به فاصله تبدیل می‌شود
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        return day_start(day)
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+@login_required
 def appointment_list(request):
+    """
+    رزروهای یک پرسنل در بازه start/end تقویم. پاسخ ETag و Last-Modified دارد و
+    اگر رزروهای بازه تغییری نکرده باشند، 304 برمی‌گردد.
+    """
     personnel_id = request.GET.get('personnel_id')
     logger.info("Accessed appointment_list", extra={"user": getattr(request.user, "id", None), "personnel_id": personnel_id})
 
@@ -1344,32 +1378,63 @@ def appointment_list(request):
         logger.warning("Missing personnel_id parameter", extra={"user": getattr(request.user, "id", None)})
         return JsonResponse([], safe=False)
 
+    today = day_start(timezone.localdate())
+    start = parse_feed_datetime(request.GET.get('start')) or today - timedelta(days=APPOINTMENT_FEED_DEFAULT_DAYS[0])
+    end = parse_feed_datetime(request.GET.get('end')) or today + timedelta(days=APPOINTMENT_FEED_DEFAULT_DAYS[1])
+
     try:
-        appointments = Appointment.objects.filter(personnel_id=personnel_id)
-        logger.info(f"Found {appointments.count()} appointments for personnel {personnel_id}", extra={"user": getattr(request.user, "id", None)})
-
-        data = []
-        for app in appointments:
-            data.append({
-                'id': app.id,
-                'title': f"{app.customer.name} - {app.work.work_name}",
-                'start': app.start_time.isoformat(),
-                'end': app.end_time.isoformat(),
-                'customerId': app.customer.id,
-                'customerName': app.customer.name,
-                'workId': app.work.id,
-                'workName': app.work.work_name,
-                'personnelId': app.personnel.id,
-                'personnelName': f"{app.personnel.fname} {app.personnel.lname}",
-                'isPaid': app.is_paid,
-            })
-        return JsonResponse(data, safe=False)
+        appointments = Appointment.objects.filter(
+            personnel_id=personnel_id, start_time__lt=end, end_time__gt=start,
+        )
+
+        # یک کوئری سبک برای اعتبارسنجی کش؛ حذف یا جابه‌جایی رزرو تعداد یا جمع شناسه‌ها را تغییر می‌دهد
+        # و ویرایش نام مشتری یا خدمت (عنوان رویدادها) آخرین زمان ویرایش آن‌ها را
+        state = appointments.aggregate(
+            last=Max("updated_at"), count=Count("id"), ids=Sum("id"),
+            customer_last=Max("customer__updated_at"), work_last=Max("work__updated_at"),
+        )
+        changed = [state[key] for key in ("last", "customer_last", "work_last") if state[key]]
+        last_modified = int(max(changed).timestamp()) if changed else None
+        etag = '"{}"'.format("-".join(str(part) for part in (
+            personnel_id, int(start.timestamp()), int(end.timestamp()), state["count"], state["ids"] or 0,
+            *(state[key].timestamp() if state[key] else 0 for key in ("last", "customer_last", "work_last")),
+        )))
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        rows = appointments.order_by("start_time").values(
+            "id", "start_time", "end_time", "is_paid", "customer_id", "work_id", "personnel_id",
+            "customer__fname", "customer__lname", "work__work_name",
+        )
+        data = [
+            {
+                'id': row["id"],
+                'title': f'{row["customer__fname"]}-{row["customer__lname"]} - {row["work__work_name"]}',
+                'start': row["start_time"].isoformat(),
+                'end': row["end_time"].isoformat(),
+                'customerId': row["customer_id"],
+                'customerName': f'{row["customer__fname"]}-{row["customer__lname"]}',
+                'workId': row["work_id"],
+                'personnelId': row["personnel_id"],
+                'isPaid': row["is_paid"],
+            }
+            for row in rows
+        ]
+        logger.info("Found %s appointments for personnel %s", len(data), personnel_id, extra={"user": getattr(request.user, "id", None)})
+
+        response = JsonResponse(data, safe=False)
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        # مرورگر پاسخ را نگه دارد ولی هر بار با ETag اعتبارسنجی کند
+        response["Cache-Control"] = "private, no-cache"
+        return response
     except Exception as e:
         logger.error("Failed to fetch appointment list", exc_info=True, extra={"user": getattr(request.user, "id", None), "personnel_id": personnel_id})
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 
-
 logger = logging.getLogger(__name__)
 
 @login_required
@@ -1402,18 +1467,12 @@ def update_appointment(request, pk):
             logger.warning("Invalid date format", extra={"user": getattr(request.user, "id", None), "error": str(e)})
             return JsonResponse({'status': 'error', 'message': 'فرمت تاریخ نامعتبر است'}, status=400)
 
-        # بررسی تداخل
-        conflict = Appointment.objects.filter(
-            personnel_id=appointment.personnel_id,
-            start_time__lt=appointment.end_time,
-            end_time__gt=appointment.start_time,
-        ).exclude(pk=appointment.pk).exists()
-
-        if conflict:
+        try:
+            save_appointment(appointment)
+        except BookingConflict as e:
             logger.warning("Appointment conflict detected", extra={"user": getattr(request.user, "id", None), "appointment_id": pk})
-            return JsonResponse({'status': 'error', 'message': 'این بازه زمانی قبلاً برای این پرسنل رزرو شده است.'}, status=400)
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
-        appointment.save()
         logger.info("Appointment updated successfully", extra={"user": getattr(request.user, "id", None), "appointment_id": pk})
 
         return JsonResponse({'status': 'success', 'message': 'رزرو با موفقیت ویرایش شد'})
@@ -1452,12 +1511,8 @@ def personnel_works(request):
         return JsonResponse([], safe=False)
 
     try:
-        commissions = PersonnelCommission.objects.filter(
-            personnel_id=personnel_id
-        ).select_related('work')
-
-        data = [{"id": c.work.id, "work_name": c.work.work_name} for c in commissions]
-        logger.info(f"Returned {len(data)} works for personnel {personnel_id}", extra={"user": getattr(request.user, "id", None)})
+        data = reference_data().personnel_works.get(int(personnel_id), [])
+        logger.info("Returned personnel works", extra={"user": getattr(request.user, "id", None), "personnel_id": personnel_id, "count": len(data)})
 
         return JsonResponse(data, safe=False)
 
@@ -1469,66 +1524,116 @@ def personnel_works(request):
 
 logger = logging.getLogger(__name__)
 
-@login_required
-def gallery_view(request):
-    logger.info("Accessed gallery_view", extra={"user": getattr(request.user, "id", None)})
-
-    images = SaleImage.objects.all()
+def gallery_images(request):
+    """تصاویر «بعد» قابل مشاهده برای کاربر با فیلترهای مشتری و پرسنل"""
+    images = SaleImage.objects.filter(image_type=SaleImage.AFTER)
 
     # فیلتر بر اساس پرسنل اگر کاربر ادمین نیست
     if not request.user.is_superuser:
-        try:
-            personnel_user = PersonnelUser.objects.get(user=request.user)
-            personnel = personnel_user.personnel
-            images = images.filter(sale__personnel=personnel)
-            logger.info(f"Filtered images for personnel {personnel.id}", extra={"user": getattr(request.user, "id", None)})
-        except PersonnelUser.DoesNotExist:
-            images = SaleImage.objects.none()
+        personnel_user = PersonnelUser.objects.filter(user=request.user).first()
+        if personnel_user is None:
             logger.warning("PersonnelUser does not exist for user", extra={"user": getattr(request.user, "id", None)})
+            return images.none()
+        images = images.filter(sale__personnel_id=personnel_user.personnel_id)
 
     # فیلتر بر اساس مشتری
-    customer_filter = request.GET.get('customer')
-    if customer_filter:
-        images = images.filter(sale__customer__id=customer_filter)
-        logger.info(f"Filtered images by customer {customer_filter}", extra={"user": getattr(request.user, "id", None)})
+    customer_filter = request.GET.get('customer', '')
+    if customer_filter.isdigit():
+        images = images.filter(sale__customer_id=customer_filter)
 
     # فیلتر بر اساس پرسنل (برای ادمین)
-    personnel_filter = request.GET.get('personnel')
-    
-    
-    if personnel_filter and request.user.is_superuser:
-        images = images.filter(sale__personnel__id=personnel_filter)
+    personnel_filter = request.GET.get('personnel', '')
+    if personnel_filter.isdigit() and request.user.is_superuser:
+        images = images.filter(sale__personnel_id=personnel_filter)
 
-        logger.info(f"Filtered images by personnel {personnel_filter}", extra={"user": getattr(request.user, "id", None)})
+    return images
 
-    # فقط عکس‌های "بعد"
-        personnel_filter = Personnel.objects.filter(id=personnel_filter).first()
-    else:
-    # اگر انتخابی نبود، اولین پرسنل موجود رو بیاور
-        personnel_filter = Personnel.objects.first()
-    
 
+@login_required
+def gallery_view(request):
+    logger.info("Accessed gallery_view", extra={"user": getattr(request.user, "id", None)})
 
-    # در نهایت فقط عکس‌های "بعد"
-    images = images.filter(image_type=SaleImage.AFTER)
+    images, next_cursor = gallery_page(gallery_images(request))
 
-    # دریافت لیست مشتریان و پرسنل برای فیلترها
-    customers = Customer.objects.all()
+    # فقط مشتری انتخاب‌شده در لیست می‌آید؛ بقیه با جستجوی customer_search
+    customer_filter = request.GET.get('customer', '')
+    selected_customer = Customer.objects.filter(id=customer_filter).first() if customer_filter.isdigit() else None
     personnel_list = Personnel.objects.all() if request.user.is_superuser else []
 
-    logger.info(f"Returning {images.count()} images", extra={"user": getattr(request.user, "id", None)})
-
     context = {
         'images': images,
-        'customers': customers,
+        'next_cursor': next_cursor,
         'personnel_list': personnel_list,
-        'selected_customer': customer_filter,
-        'selected_personnel': personnel_filter,
+        'selected_customer': selected_customer,
+        'selected_personnel': request.GET.get('personnel', ''),
     }
 
     return render(request, 'app/gallery.html', context)
+
+
+@login_required
+def gallery_images_api(request):
+    """صفحه بعد گالری برای اسکرول بی‌پایان"""
+    after = decode_gallery_cursor(request.GET.get("after"), aware=settings.USE_TZ)
+    images, next_cursor = gallery_page(gallery_images(request), after=after)
+    html = render_to_string("app/partials/gallery_cards.html", {"images": images}, request=request)
+    return JsonResponse({"html": html, "next": next_cursor})
+
+
+CUSTOMER_SEARCH_LIMIT = 20
+CUSTOMER_SEARCH_MAX_LIMIT = 50
+
+
+@login_required
+def customer_search(request):
+    """
+    جستجوی پیشوندی مشتری با نام، نام خانوادگی، ابتدا یا انتهای موبایل در قالب نتایج select2؛
+    تعداد نتایج محدود است تا فرم‌ها به جای همه مشتریان فقط همین‌ها را بگیرند.
+    """
+    query = persian_to_english(request.GET.get("q", "")).strip()
+    if not query:
+        return JsonResponse({"results": []})
+    try:
+        limit = min(max(int(request.GET.get("limit", CUSTOMER_SEARCH_LIMIT)), 1), CUSTOMER_SEARCH_MAX_LIMIT)
+    except ValueError:
+        limit = CUSTOMER_SEARCH_LIMIT
+
+    results = [
+        {"id": customer["id"], "text": f"{customer['fname']}-{customer['lname']} ({customer['mobile']})"}
+        for customer in search_page(query, limit)
+    ]
+    return JsonResponse({"results": results})
+
+
 class HomeDashboardView(TemplateView):
     template_name = "app/home_dashboard.html"
+    sales_window_days = 90
+    max_sales_window_days = 731
+
+    def get_sales_window(self, today):
+        """
+        بازه نمودار فروش روزانه: یک ماه جلالی (?sales_month=1404-06) یا
+        n روز اخیر (?sales_days=30)، پیش‌فرض ۹۰ روز اخیر
+        """
+        month = self.request.GET.get("sales_month")
+        if month:
+            try:
+                year, month_no = map(int, persian_to_english(month).replace("/", "-").split("-")[:2])
+                first = jdatetime.date(year, month_no, 1)
+                following = jdatetime.date(year + month_no // 12, month_no % 12 + 1, 1)
+                self.sales_month = f"{year:04d}-{month_no:02d}"
+                return first.togregorian(), following.togregorian() - timedelta(days=1)
+            except Exception:
+                logger.warning("Invalid sales_month on dashboard", extra={"sales_month": month})
+
+        self.sales_month = ""
+        try:
+            days = int(self.request.GET.get("sales_days", self.sales_window_days))
+        except ValueError:
+            days = self.sales_window_days
+        days = min(max(days, 1), self.max_sales_window_days)
+        self.sales_days = days
+        return today - timedelta(days=days - 1), today
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -1541,7 +1646,7 @@ class HomeDashboardView(TemplateView):
         if not is_super:
             try:
                 personnel = user.personnel_profile.personnel
-                logger.info(f"Personnel user detected: {personnel.id}", extra={"user_id": user.id})
+                logger.info("Personnel user detected: %s", personnel.id, extra={"user_id": user.id})
             except Exception:
                 personnel = None
                 logger.warning("No personnel profile found for non-superuser", extra={"user_id": user.id})
@@ -1550,92 +1655,77 @@ class HomeDashboardView(TemplateView):
         last_30_days = [today - timezone.timedelta(days=i) for i in range(29, -1, -1)]
 
         # ===== 1. مانده پرداخت‌ها =====
+        # همه سری‌ها با یک کوئری GROUP BY روی جدول گردش روزانه؛ روزهای بدون پرداخت صفر می‌شوند
         balances_chart = []
+        jalali_days = [jdatetime.date.fromgregorian(date=d).strftime("%Y-%m-%d") for d in last_30_days]
+
+        def fill_days(day_totals):
+            return [
+                {"date": jalali_day, "balance": int(day_totals.get(d, 0))}
+                for d, jalali_day in zip(last_30_days, jalali_days)
+            ]
 
         if is_super:
-            payment_methods = PaymentMethod.objects.all()
-            balances = {}
-            for method in payment_methods:
-                if method.requires_bank:
-                    for bank in Bank.objects.all():
-                        line_data = []
-                        for d in last_30_days:
-                            pays = Pay.objects.filter(date=d, source_type=method, bank=bank)
-                            total = pays.aggregate(total=Sum("amount"))["total"] or 0
-                            line_data.append({
-                                "date": jdatetime.date.fromgregorian(date=d).strftime("%Y-%m-%d"),
-                                "balance": int(total)
-                            })
-                        balances[method.name + " - " + bank.name] = line_data
-                else:
-                    line_data = []
-                    for d in last_30_days:
-                        pays = Pay.objects.filter(date=d, source_type=method, bank__isnull=True)
-                        total = pays.aggregate(total=Sum("amount"))["total"] or 0
-                        line_data.append({
-                            "date": jdatetime.date.fromgregorian(date=d).strftime("%Y-%m-%d"),
-                            "balance": int(total)
+            pay_totals = treasury.daily_pay_totals(last_30_days[0], today)
+            refs = reference_data()
+            for method in refs.payment_methods:
+                if method["requires_bank"]:
+                    for bank in refs.banks:
+                        balances_chart.append({
+                            "name": method["name"] + " - " + bank["name"],
+                            "data": fill_days(pay_totals.get((method["id"], bank["id"]), {})),
                         })
-                    balances[method.name] = line_data
-
-            for key, data in balances.items():
-                balances_chart.append({"name": key, "data": data})
+                else:
+                    balances_chart.append({
+                        "name": method["name"],
+                        "data": fill_days(pay_totals.get((method["id"], None), {})),
+                    })
         else:
-            line_data = []
-            for d in last_30_days:
-                pays = Pay.objects.filter(date=d, personnel=personnel)
-                total = pays.aggregate(total=Sum("amount"))["total"] or 0
-                total = int(total)
-                line_data.append({
-                    "date": jdatetime.date.fromgregorian(date=d).strftime("%Y-%m-%d"),
-                    "balance": total
-                })
-            balances_chart = [{"name": "پرداخت‌ها", "data": line_data}]
+            pay_totals = treasury.daily_pay_totals(last_30_days[0], today, personnel_id=personnel.id) if personnel else {}
+            balances_chart = [{"name": "پرداخت‌ها", "data": fill_days(pay_totals)}]
 
         context["balances_chart"] = balances_chart
-        logger.info(f"Prepared balances_chart with {len(balances_chart)} series", extra={"user_id": user.id})
+        logger.info("Prepared balances_chart with %s series", len(balances_chart), extra={"user_id": user.id})
 
         # ===== 2. فروش روزانه =====
         sales = Sale.objects.all()
         if not is_super and personnel:
             sales = sales.filter(personnel=personnel)
 
-        min_date = sales.aggregate(min_date=Min('date'))['min_date']
-        max_date = sales.aggregate(max_date=Max('date'))['max_date']
-
-        daily_sales = []
-        if min_date and max_date:
-            current = min_date.date()
-            last = max_date.date()
-            while current <= last:
-                start = gdatetime.combine(current, gdatetime.min.time())
-                end = start + timedelta(days=1)
-                day_sales = sales.filter(date__gte=start, date__lt=end).aggregate(
-                    commission=Sum('commission_amount'),
-                    total=Sum('price')
-                )
-                daily_sales.append({
-                    'day': current,
-                    'commission': day_sales['commission'] or 0,
-                    'total': day_sales['total'] or 0
-                })
-                current += timedelta(days=1)
-                
-
-
-        sales_chart = []
-        for row in daily_sales:
-            day_str = str(row["day"])
+        window_start, window_end = self.get_sales_window(today)
+        daily_sales = (
+            sales.filter(date__gte=day_start(window_start), date__lt=day_start(window_end + timedelta(days=1)))
+            .annotate(day=TruncDate("date"))
+            .values("day")
+            .annotate(commission=Sum("commission_amount"), total=Sum("price"))
+            .order_by("day")
+        )
 
-            day_date = gdatetime.strptime(day_str, "%Y-%m-%d").date()
-            
-            sales_chart.append({
-                "date": jdatetime.date.fromgregorian(date=day_date).strftime("%Y-%m-%d"),
-                "commission": int(row["commission"]) or 0,
-                "remainder": ((int(row["total"]) or 0) - (int(row["commission"]) or 0)) if is_super else 0
-            })
+        # پر کردن روزهای بدون فروش با صفر
+        days = pd.date_range(window_start, window_end, freq="D")
+        daily_frame = (
+            pd.DataFrame.from_records(list(daily_sales), columns=["day", "commission", "total"])
+            .assign(day=lambda df: pd.to_datetime(df["day"]))
+            .set_index("day")
+            .reindex(days, fill_value=0)
+            # Sum ستون Decimal (object) برمی‌گرداند؛ تبدیل صریح پیش از fillna تا pandas خودش downcast نکند
+            .astype("float64")
+            .fillna(0)
+            .astype("int64")
+        )
+        commissions = daily_frame["commission"]
+        remainders = daily_frame["total"] - commissions if is_super else commissions * 0
+
+        sales_chart = [
+            {
+                "date": jdatetime.date.fromgregorian(date=day.date()).strftime("%Y-%m-%d"),
+                "commission": int(commission),
+                "remainder": int(remainder),
+            }
+            for day, commission, remainder in zip(days, commissions, remainders)
+        ]
         context["sales_chart"] = sales_chart
-        logger.info(f"Prepared sales_chart with {len(sales_chart)} points", extra={"user_id": user.id})
+        logger.info("Prepared sales_chart with %s points", len(sales_chart), extra={"user_id": user.id})
 
         # ===== 3. رزروها =====
         appointments = Appointment.objects.all()
@@ -1660,7 +1750,7 @@ class HomeDashboardView(TemplateView):
                 "count": row["count"]
             })
         context["appt_chart"] = appt_chart
-        logger.info(f"Prepared appt_chart with {len(appt_chart)} points", extra={"user_id": user.id})
+        logger.info("Prepared appt_chart with %s points", len(appt_chart), extra={"user_id": user.id})
 
         # ===== 4. تعداد فاکتورها =====
         sales_count = (
@@ -1678,14 +1768,17 @@ class HomeDashboardView(TemplateView):
                 "count": row["count"]
             })
         context["sales_count_chart"] = sales_count_chart
-        logger.info(f"Prepared sales_count_chart with {len(sales_count_chart)} points", extra={"user_id": user.id})
+        logger.info("Prepared sales_count_chart with %s points", len(sales_count_chart), extra={"user_id": user.id})
 
         context["is_super"] = is_super
+        context["sales_month"] = self.sales_month
+        context["sales_days"] = getattr(self, "sales_days", None)
         return context
 
 
 class PayUpdateView(UpdateView):
-    template_name = "app/edit_pay.html"
+    # فرم ویرایش همان فرم ثبت است
+    template_name = "app/new_pay.html"
     form_class = PayForm
     model = Pay
     success_url = reverse_lazy("pay_list")
@@ -1693,7 +1786,7 @@ class PayUpdateView(UpdateView):
     def form_valid(self, form):
         pay = form.save()
         # لاگ عملیات موفق
-        logger.info(f"Pay updated: {pay.id}", extra={"user_id": self.request.user.id})
+        logger.info("Pay updated: %s", pay.id, extra={"user_id": self.request.user.id})
 
         # اگر درخواست Ajax بود، خروجی JSON بده
         if self.request.headers.get("x-requested-with") == "XMLHttpRequest":
@@ -1739,15 +1832,15 @@ class PayUpdateView(UpdateView):
 logger = logging.getLogger(__name__)
 
 class ReceiptUpdateView(UpdateView):
-    template_name = "app/edit_receipt.html"
+    template_name = "app/new_receipt.html"
     form_class = ReceiptForm
     model = Receipt
-    success_url = reverse_lazy("Receipt_list")
+    success_url = reverse_lazy("receipt_list")
 
     def form_valid(self, form):
         receipt = form.save()
         # لاگ عملیات موفق
-        logger.info(f"Receipt updated: {receipt.id}", extra={"user_id": self.request.user.id})
+        logger.info("Receipt updated: %s", receipt.id, extra={"user_id": self.request.user.id})
 
         # اگر درخواست Ajax بود، خروجی JSON بده
         if self.request.headers.get("x-requested-with") == "XMLHttpRequest":
@@ -1795,7 +1888,7 @@ def sale_images_view(request, sale_id):
         sale = get_object_or_404(Sale, id=sale_id)
 
         # فیلتر تصاویر بر اساس دسترسی کاربر
-        images = sale.images.all()
+        images = sale.images.prefetch_related("variants")
         if not request.user.is_superuser:
             try:
                 personnel_user = request.user.personnel_profile
@@ -1809,7 +1902,7 @@ def sale_images_view(request, sale_id):
             'images': images
         }
 
-        logger.info(f"User {request.user.id} viewed images for Sale {sale.id}")
+        logger.info("User %s viewed images for Sale %s", request.user.id, sale.id)
         return render(request, 'app/sale_images.html', context)
 
     except Exception as e:
@@ -1817,6 +1910,26 @@ def sale_images_view(request, sale_id):
         return render(request, 'app/sale_images.html', {'sale': None, 'images': []})
 
 
+@login_required
+def sale_image_status(request, sale_id):
+    """وضعیت پردازش تصاویر یک فاکتور برای polling صفحه تصاویر"""
+    sale = get_object_or_404(Sale, id=sale_id)
+    images = sale.images.all()
+    if not request.user.is_superuser:
+        personnel_user = getattr(request.user, "personnel_profile", None)
+        if personnel_user is None or sale.personnel_id != personnel_user.personnel_id:
+            images = images.none()
+
+    data = [
+        {"id": image.id, "status": image.status, "url": image.image.url}
+        for image in images.only("id", "status", "image")
+    ]
+    return JsonResponse({
+        "images": data,
+        "pending": any(item["status"] in (SaleImage.PENDING, SaleImage.PROCESSING) for item in data),
+    })
+
+
 @login_required
 def finance_menu(request):
     return render(request, "app/finance_menu.html")
@@ -1850,6 +1963,7 @@ def settings_menu(request):
 
     # add_item("کمیسیون جدید", "fas fa-plus-circle", "new_commission")
     add_item("کمیسیون پرسنل", "fas fa-percent", "commissions")
+    add_item("ورود فروش از اکسل", "fas fa-file-import", "import_sales")
 
     add_item("تغییر رمز عبور", "fas fa-key", "password_change")
     add_item("خروج", "fas fa-sign-out-alt", "logout")
@@ -1864,7 +1978,7 @@ class PersonnelListView(ListView):
 
     def get_queryset(self):
         qs = super().get_queryset()
-        logger.info(f"User {self.request.user.id} accessed Personnel list. Count: {qs.count()}")
+        logger.info("User %s accessed Personnel list. Count: %s", self.request.user.id, lazy(qs.count))
         return qs
 
 @method_decorator(login_required, name='dispatch')
@@ -1877,7 +1991,7 @@ class PersonnelCreateView(CreateView):
 
     def form_valid(self, form):
         personnel = form.save()
-        logger.info(f"Personnel {personnel.id} created by user {self.request.user.id}")
+        logger.info("Personnel %s created by user %s", personnel.id, self.request.user.id)
         # پشتیبانی از Ajax
         if self.request.headers.get("x-requested-with") == "XMLHttpRequest":
             return JsonResponse({
@@ -1892,7 +2006,7 @@ class PersonnelCreateView(CreateView):
         return super().form_valid(form)
 
     def form_invalid(self, form):
-        logger.warning(f"Failed attempt to create Personnel by user {self.request.user.id}: {form.errors}")
+        logger.warning("Failed attempt to create Personnel by user %s: %s", self.request.user.id, form.errors)
         if self.request.headers.get("x-requested-with") == "XMLHttpRequest":
             return JsonResponse({
                 "success": False,
@@ -1910,7 +2024,7 @@ class PersonnelUpdateView(UpdateView):
 
     def form_valid(self, form):
         personnel = form.save()
-        logger.info(f"Personnel {personnel.id} updated by user {self.request.user.id}")
+        logger.info("Personnel %s updated by user %s", personnel.id, self.request.user.id)
         if self.request.headers.get("x-requested-with") == "XMLHttpRequest":
             return JsonResponse({
                 "success": True,
@@ -1924,7 +2038,7 @@ class PersonnelUpdateView(UpdateView):
         return super().form_valid(form)
 
     def form_invalid(self, form):
-        logger.warning(f"Failed attempt to update Personnel by user {self.request.user.id}: {form.errors}")
+        logger.warning("Failed attempt to update Personnel by user %s: %s", self.request.user.id, form.errors)
         if self.request.headers.get("x-requested-with") == "XMLHttpRequest":
             return JsonResponse({
                 "success": False,
@@ -1946,7 +2060,7 @@ class PersonnelDeleteView(DeleteView):
         personnel_id = self.object.id
         try:
             response = super().delete(request, *args, **kwargs)
-            logger.info(f"Personnel {personnel_id} deleted by user {request.user.id}")
+            logger.info("Personnel %s deleted by user %s", personnel_id, request.user.id)
             if request.headers.get("x-requested-with") == "XMLHttpRequest":
                 return JsonResponse({"success": True, "id": personnel_id})
             return response
@@ -1967,7 +2081,7 @@ class WorkListView(ListView):
     def get_queryset(self):
         try:
             qs = super().get_queryset()
-            logger.info(f"Work list accessed by user {self.request.user.id}")
+            logger.info("Work list accessed by user %s", self.request.user.id)
             return qs
         except Exception as e:
             logger.error(f"Error fetching Work list for user {self.request.user.id}: {e}")
@@ -1984,7 +2098,7 @@ class WorkCreateView(CreateView):
     def form_valid(self, form):
         try:
             response = super().form_valid(form)
-            logger.info(f"Work '{self.object.work_name}' created by user {self.request.user.id}")
+            logger.info("Work '%s' created by user %s", self.object.work_name, self.request.user.id)
             return response
         except Exception as e:
             logger.error(f"Error creating Work by user {self.request.user.id}: {e}")
@@ -2003,7 +2117,7 @@ class WorkUpdateView(UpdateView):
     def form_valid(self, form):
         try:
             response = super().form_valid(form)
-            logger.info(f"Work '{self.object.work_name}' updated by user {self.request.user.id}")
+            logger.info("Work '%s' updated by user %s", self.object.work_name, self.request.user.id)
             return response
         except Exception as e:
             logger.error(f"Error updating Work '{self.object.id}' by user {self.request.user.id}: {e}")
@@ -2021,7 +2135,7 @@ class WorkDeleteView(DeleteView):
         try:
             work_name = self.object.work_name
             response = super().delete(request, *args, **kwargs)
-            logger.info(f"Work '{work_name}' deleted by user {request.user.id}")
+            logger.info("Work '%s' deleted by user %s", work_name, request.user.id)
             return response
         except Exception as e:
             logger.error(f"Error deleting Work '{self.object.id}' by user {request.user.id}: {e}")
@@ -2042,8 +2156,8 @@ class PersonnelCommissionListView(ListView):
             show_history = self.request.GET.get("history") == "1"
 
             if show_history:
-                qs = PersonnelCommission.objects.all().order_by("-start_date")
-                logger.info(f"User {self.request.user.id} requested full commission history")
+                qs = PersonnelCommission.objects.select_related("personnel", "work").order_by("-start_date")
+                logger.info("User %s requested full commission history", self.request.user.id)
                 return qs
 
             # فقط آخرین رکورد برای هر پرسنل و خدمت
@@ -2053,8 +2167,12 @@ class PersonnelCommissionListView(ListView):
                 .annotate(max_id=Max("id"))
                 .values_list("max_id", flat=True)
             )
-            qs = PersonnelCommission.objects.filter(id__in=latest_ids).order_by("personnel__lname", "work__work_name")
-            logger.info(f"User {self.request.user.id} requested latest commissions only")
+            qs = (
+                PersonnelCommission.objects.filter(id__in=latest_ids)
+                .select_related("personnel", "work")
+                .order_by("personnel__lname", "work__work_name")
+            )
+            logger.info("User %s requested latest commissions only", self.request.user.id)
             return qs
 
         except Exception as e:
@@ -2073,7 +2191,7 @@ class PersonnelCommissionCreateView(CreateView):
     def form_valid(self, form):
         try:
             response = super().form_valid(form)
-            logger.info(f"User {self.request.user.id} created commission {self.object.id}")
+            logger.info("User %s created commission %s", self.request.user.id, self.object.id)
             return response
         except Exception as e:
             logger.error(f"Error creating commission by user {self.request.user.id}: {e}")
@@ -2091,7 +2209,7 @@ class PersonnelCommissionUpdateView(UpdateView):
     def form_valid(self, form):
         try:
             response = super().form_valid(form)
-            logger.info(f"User {self.request.user.id} updated commission {self.object.id}")
+            logger.info("User %s updated commission %s", self.request.user.id, self.object.id)
             return response
         except Exception as e:
             logger.error(f"Error updating commission {self.object.id} by user {self.request.user.id}: {e}")
@@ -2110,9 +2228,9 @@ class PersonnelCommissionDeleteView(DeleteView):
     def delete(self, request, *args, **kwargs):
         self.object = self.get_object()
         try:
-            logger.info(f"User {request.user.id} is deleting commission {self.object.id}")
+            logger.info("User %s is deleting commission %s", request.user.id, self.object.id)
             response = super().delete(request, *args, **kwargs)
-            logger.info(f"Commission {self.object.id} deleted successfully")
+            logger.info("Commission %s deleted successfully", self.object.id)
             return response
         except Exception as e:
             logger.error(f"Error deleting commission {self.object.id} by user {request.user.id}: {e}")
@@ -2123,20 +2241,19 @@ class CustomerListView(ListView):
     template_name = "app/customer_list.html"
     model = Customer
     context_object_name = "customers"
+    paginate_by = 50
 
     def get_queryset(self):
         filter_value = self.request.GET.get("filter")
         queryset = super().get_queryset()
 
         if filter_value:
-            queryset = queryset.filter(
-                Q(name__search=filter_value) | Q(mobile__search=filter_value)
-            )
-            logger.info(f"Customer search applied: filter='{filter_value}', results={queryset.count()}")
+            queryset = search_customers(filter_value, queryset)
+            logger.info("Customer search applied", extra={"filter": filter_value})
         else:
             logger.info("Customer list viewed without filter")
 
-        return queryset
+        return queryset.with_sale_stats().order_by("id")
     
 
 def edit_user(request, user_id):
@@ -2168,4 +2285,11 @@ def delete_user(request, user_id):
         messages.success(request, "کاربر با موفقیت حذف شد.")
         return redirect('users')
     
-    return render(request, "accounts/delete_user_confirm.html", {"user": user})
\ No newline at end of file
+    return render(request, "accounts/delete_user_confirm.html", {"user": user})
+
+
+@login_required
+@user_passes_test(lambda user: user.is_staff)
+def metrics_view(request):
+    """متریک‌های درخواست‌های همین پروسس در قالب متنی Prometheus"""
+    return HttpResponse(metrics_registry.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
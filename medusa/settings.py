@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "app.middleware.LogErrorsMiddleware",
+    "app.middleware.RequestMetricsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,7 +59,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'app.middleware.LoginRequiredMiddleware', 
-    "app.middleware.PreventDoubleSubmitMiddleware",
+    "app.middleware.IdempotencyMiddleware",
 ]
 
 ROOT_URLCONF = 'medusa.urls'
@@ -97,6 +98,16 @@ DATABASES = {
 }
 
 
+# ===================== CACHE =====================
+# کش باید بین همه workerهای Passenger مشترک باشد (نسخه داده‌های پایه در app/refdata.py)؛
+# جدول آن با python manage.py createcachetable ساخته می‌شود
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache",
+    }
+}
+
 # ===================== AUTH PASSWORD VALIDATION =====================
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -1,3 +1,4 @@
 #! /bin/bash
 poetry run python manage.py migrate
+poetry run python manage.py createcachetable
 poetry run python manage.py runserver 0.0.0.0:8000
@@ -1,16 +1,49 @@
 // main.js
-document.addEventListener("DOMContentLoaded", function () {
-  
-  $("select").select2({
+
+// تنظیمات select2؛ selectهایی که data-ajax-url دارند (مثل انتخاب مشتری) گزینه‌ها را هنگام تایپ از سرور می‌گیرند
+function select2Options(element, options) {
+  options = Object.assign({
     theme: "tailwindcss-3",
     width: "100%",
     placeholder: "انتخاب کنید...",
     allowClear: true,
+  }, options || {});
+  const url = element.dataset && element.dataset.ajaxUrl;
+  if (url) {
+    options.minimumInputLength = 1;
+    options.ajax = {
+      url: url,
+      dataType: "json",
+      delay: 250,
+      data: params => ({ q: params.term }),
+    };
+  }
+  return options;
+}
+window.select2Options = select2Options;
+
+document.addEventListener("DOMContentLoaded", function () {
+  
+  $("select").each(function () {
+    $(this).select2(select2Options(this));
   });
 
   
   if (typeof feather !== "undefined") feather.replace();
 
+  // کلید idempotency هر فرم POST؛ ارسال دوباره همان فرم پاسخ اول را از سرور می‌گیرد (IdempotencyMiddleware)
+  document.querySelectorAll("form").forEach(function (form) {
+    if ((form.getAttribute("method") || "").toLowerCase() !== "post") return;
+    if (form.querySelector("input[name='idempotency_key']")) return;
+    const input = document.createElement("input");
+    input.type = "hidden";
+    input.name = "idempotency_key";
+    input.value = window.crypto && crypto.randomUUID
+      ? crypto.randomUUID()
+      : Date.now().toString(36) + Math.random().toString(36).slice(2);
+    form.appendChild(input);
+  });
+
   
   if (typeof Calendar !== "undefined") {
     $(".datepicker").each(function () {